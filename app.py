@@ -1,9 +1,9 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_from_directory, jsonify, g, send_file, flash, abort
+from flask import (Flask, render_template, request, redirect, url_for, session, send_from_directory, jsonify, g,
+                   send_file, flash, abort, Response, stream_with_context)
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from docx import Document
-from openai import AzureOpenAI
 from dotenv import load_dotenv
 import os
 import time
@@ -18,6 +18,7 @@ from io import BytesIO
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 import re
+import unicodedata
 from docx.oxml.shared import OxmlElement
 from docx.oxml.ns import qn
 import hashlib
@@ -29,8 +30,9 @@ import base64
 import io
 from PIL import Image
 import uuid
-from urllib.parse import unquote
+from urllib.parse import unquote, quote
 import asyncio
+import click
 import httpx
 import random
 import aiohttp
@@ -39,6 +41,26 @@ from logging.handlers import RotatingFileHandler
 from html import escape
 from typing import Optional, Tuple, Dict, Any, List
 from utils.validation import validate_email, validate_password, validate_text_input, sanitize_input
+from function_app.shared.llm import chat_completion, image_generation
+from function_app.shared.resilience import CircuitOpenError, is_transient_error
+from function_app.shared.metrics import edit_counters
+from function_app.shared.clients import get_text_client, get_image_client
+from function_app.shared.conversations import conversation_store
+from function_app.shared.edit_patches import PATCH_SYSTEM_PROMPT, PatchError, patch_article
+from function_app.shared.image_cache import ImageCache, PROMPT_INPUT_CHARS
+from utils.text_diff import change_metrics, MIN_CHANGE_PERCENTAGE
+from utils.markdown_normalizer import normalize_markdown
+from utils.image_variants import VariantPipeline, image_sources, remove_variants
+from utils.background_jobs import JobManager, JOB_DONE, JOB_ERROR
+from utils.asset_store import AssetStore, LocalAssetBackend, create_asset_backend
+from utils.article_catalog import ArticleCatalog
+from utils.article_projections import ProjectionCache, build_projections, is_current
+from utils.search_index import SearchIndex
+from utils.section_splice import (split_sections, get_section, section_context,
+                                  clean_section_output, splice_section)
+from utils.article_sections import (SECTION_MARKERS as DEFAULT_SECTION_MARKERS, compute_section_offsets,
+                                    extract_sections, sections_from_offsets, markdown_to_source_text,
+                                    markers_version, usable_sections)
 
 # Configure logging
 logging.basicConfig(
@@ -102,6 +124,10 @@ limiter = Limiter(
     strategy="fixed-window"
 )
 
+# Budgets counted across several routes
+content_editing_limit = limiter.shared_limit("30 per hour", scope="content_editing")
+image_generation_limit = limiter.shared_limit("20 per hour", scope="image_generation")
+
 # Database configuration
 app.config['AZURE_SQL_SERVER'] = os.getenv('AZURE_SQL_SERVER')
 app.config['AZURE_SQL_DATABASE'] = os.getenv('AZURE_SQL_DATABASE')
@@ -146,6 +172,23 @@ async def make_async_request(url, payload):
             raise
 
 
+class ServiceBusyError(Exception):
+    """Raised when an Azure Function reports it is saturated (HTTP 429/503)."""
+
+    def __init__(self, status, retry_after=None):
+        self.status = status
+        try:
+            self.retry_after = max(1, int(float(retry_after))) if retry_after else None
+        except ValueError:
+            self.retry_after = None
+        super().__init__(f"Function busy (status {status})")
+
+    @property
+    def user_message(self):
+        wait = f"{self.retry_after} seconds" if self.retry_after else "a minute"
+        return f"The AI service is busy right now. Please try again in {wait}."
+
+
 def get_db(max_retries=3, retry_delay=1):
     """
     Get database connection with retry logic and timeout configuration.
@@ -399,6 +442,44 @@ def init_db():
         except pyodbc.Error:
             pass
         
+        # Token usage totals attached to each activity event
+        for column, column_type in (('prompt_tokens', 'INT'), ('completion_tokens', 'INT'),
+                                    ('total_tokens', 'INT'), ('model_deployment', 'NVARCHAR(255)')):
+            try:
+                cursor.execute(f'''
+                IF NOT EXISTS (SELECT * FROM sys.columns WHERE object_id = OBJECT_ID('user_activity') AND name = '{column}')
+                ALTER TABLE user_activity ADD {column} {column_type}
+                ''')
+            except pyodbc.Error:
+                pass
+        
+        # Create llm_usage table for per-stage token accounting
+        cursor.execute('''
+        IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'llm_usage')
+        CREATE TABLE llm_usage (
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            user_id INT NOT NULL,
+            activity_type NVARCHAR(100) NOT NULL,
+            stage NVARCHAR(50) NOT NULL,
+            deployment NVARCHAR(255),
+            prompt_tokens INT DEFAULT 0,
+            completion_tokens INT DEFAULT 0,
+            total_tokens INT DEFAULT 0,
+            image_count INT DEFAULT 0,
+            latency_ms INT,
+            created_at DATETIME DEFAULT GETDATE(),
+            CONSTRAINT FK_llm_usage_user FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+        ''')
+        
+        try:
+            cursor.execute('''
+            IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_llm_usage_date_user')
+            CREATE INDEX IX_llm_usage_date_user ON llm_usage(created_at, user_id)
+            ''')
+        except pyodbc.Error:
+            pass
+        
         # Create articles table if it doesn't exist
         cursor.execute('''
         IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'articles')
@@ -425,6 +506,18 @@ def init_db():
         except pyodbc.Error:
             pass
         
+        # Preserved section offsets and article projections computed at upload time
+        # (see utils.article_sections and utils.article_projections)
+        for column, column_type in (('section_offsets', 'NVARCHAR(MAX)'), ('section_markers_version', 'NVARCHAR(20)'),
+                                    ('projections', 'NVARCHAR(MAX)')):
+            try:
+                cursor.execute(f'''
+                IF NOT EXISTS (SELECT * FROM sys.columns WHERE object_id = OBJECT_ID('articles') AND name = '{column}')
+                ALTER TABLE articles ADD {column} {column_type}
+                ''')
+            except pyodbc.Error:
+                pass
+        
         db.commit()
 
 # Initialize database
@@ -441,21 +534,45 @@ class UserActivityTracker:
     def log_activity(user_id, activity_type, feature_name, api_endpoint=None, 
                     request_payload_size=None, response_status=None, response_size=None,
                     processing_time_ms=None, success=True, error_message=None, 
-                    additional_data=None, ip_address=None, user_agent=None):
-        """Log user activity to the database"""
+                    additional_data=None, ip_address=None, user_agent=None, token_usage=None):
+        """
+        Log user activity to the database.
+        
+        token_usage is the "usage" dict returned by the Azure Functions
+        (see function_app/shared/usage.py); its totals are stored on the
+        activity row and each stage is written to llm_usage for roll-ups.
+        """
         try:
             db = get_db()
             cursor = db.cursor()
             
+            token_usage = token_usage or {}
+            deployments = token_usage.get('deployments') or []
+            
             cursor.execute('''
             INSERT INTO user_activity 
             (user_id, activity_type, feature_name, api_endpoint, request_payload_size, 
              response_status, response_size, processing_time_ms, success, error_message, 
-             additional_data, ip_address, user_agent)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             additional_data, ip_address, user_agent, prompt_tokens, completion_tokens,
+             total_tokens, model_deployment)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (user_id, activity_type, feature_name, api_endpoint, request_payload_size,
                   response_status, response_size, processing_time_ms, success, error_message,
-                  additional_data, ip_address, user_agent))
+                  additional_data, ip_address, user_agent, token_usage.get('prompt_tokens'),
+                  token_usage.get('completion_tokens'), token_usage.get('total_tokens'),
+                  ','.join(deployments) if deployments else None))
+            
+            stages = token_usage.get('stages') or []
+            if stages:
+                cursor.executemany('''
+                INSERT INTO llm_usage
+                (user_id, activity_type, stage, deployment, prompt_tokens, completion_tokens,
+                 total_tokens, image_count, latency_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(user_id, activity_type, stage.get('stage'), stage.get('deployment'),
+                       stage.get('prompt_tokens', 0), stage.get('completion_tokens', 0),
+                       stage.get('total_tokens', 0), stage.get('images', 0), stage.get('latency_ms'))
+                      for stage in stages])
             
             db.commit()
             return True
@@ -533,6 +650,45 @@ class UserActivityTracker:
         except Exception as e:
             logger.error(f"Error getting feature usage stats: {str(e)}", exc_info=True)
             return []
+    
+    @staticmethod
+    def get_token_usage_rollup(user_id=None, days=30):
+        """Get token usage rolled up per day, user, firm, stage and deployment"""
+        try:
+            db = get_db()
+            cursor = db.cursor()
+            
+            query = '''
+            SELECT 
+                CAST(lu.created_at AS DATE) as usage_date,
+                u.username,
+                u.firm,
+                lu.stage,
+                lu.deployment,
+                COUNT(*) as call_count,
+                SUM(lu.prompt_tokens) as prompt_tokens,
+                SUM(lu.completion_tokens) as completion_tokens,
+                SUM(lu.total_tokens) as total_tokens,
+                SUM(lu.image_count) as image_count,
+                AVG(lu.latency_ms) as avg_latency_ms
+            FROM llm_usage lu
+            JOIN users u ON lu.user_id = u.id
+            WHERE lu.created_at >= DATEADD(day, -?, GETDATE())
+            '''
+            params = [days]
+            if user_id:
+                query += ' AND lu.user_id = ?'
+                params.append(user_id)
+            query += '''
+            GROUP BY CAST(lu.created_at AS DATE), u.username, u.firm, lu.stage, lu.deployment
+            ORDER BY usage_date DESC, total_tokens DESC
+            '''
+            
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error getting token usage rollup: {str(e)}", exc_info=True)
+            return []
 
 class UserSession:
     """
@@ -845,22 +1001,25 @@ class Config:
     GENERATED_DIR = "generated"
     os.makedirs(ARTICLES_DIR, exist_ok=True)
     os.makedirs(GENERATED_DIR, exist_ok=True)
+    # Reference index of generated assets (use shared storage when ASSET_STORE=blob runs on several instances)
+    ASSET_INDEX_PATH = os.getenv("ASSET_INDEX_PATH", os.path.join(GENERATED_DIR, ".index", "assets.db"))
 
-    # Default section markers (can be updated based on client requirements)
-    SECTION_MARKERS = {
-        'hook': {
-            'start': 0,  # First paragraph
-            'end': 1     # End of first paragraph
-        },
-        'summary': {
-            'start': 1,  # Second paragraph (2-3 lines ending with "read more...")
-            'end': 2     # End of second paragraph
-        },
-        'disclaimer': {
-            'start': -1,  # Last paragraph (disclaimer)
-            'end': None   # End of content
-        }
-    }
+    # Default section markers (defined in utils.article_sections so the docx
+    # sync script indexes articles with the same markers). Run
+    # `flask reindex-sections` after changing them.
+    SECTION_MARKERS = DEFAULT_SECTION_MARKERS
+
+    # Final markdown formatting is done locally; set to true to use the model instead
+    LLM_MARKDOWN_FORMATTING = os.getenv("LLM_MARKDOWN_FORMATTING", "false").lower() == "true"
+    # Edits ask for a JSON list of changes applied locally (full regeneration is the fallback)
+    EDIT_PATCH_MODE = os.getenv("EDIT_PATCH_MODE", "true").lower() == "true"
+    # Start image work while the article is generated: off, prompt (safe prompt only) or image
+    IMAGE_PREFETCH = os.getenv("IMAGE_PREFETCH", "off").lower()
+    # Prefetch from the rewritten article (after generation) or the source article (alongside it)
+    IMAGE_PREFETCH_FROM = os.getenv("IMAGE_PREFETCH_FROM", "article").lower()
+    # Load the first ARTICLE_PROJECTION_CACHE_SIZE article projections (preview HTML) in the
+    # background once the app serves its first request, and again after uploads
+    ARTICLE_PREVIEW_WARM = os.getenv("ARTICLE_PREVIEW_WARM", "true").lower() == "true"
 
 class AzureServices:
     """
@@ -870,53 +1029,18 @@ class AzureServices:
     """
     
     def __init__(self):
-        self.text_client = AzureOpenAI(
-            api_key=os.getenv("AZURE_OPENAI_KEY"),
-            api_version="2024-02-15-preview",
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
+        self.text_client = get_text_client()
         
-        self.conversations = {}
+        self.conversations = conversation_store
 
     def _extract_sections(self, content):
         """Extract and preserve specific sections from the content."""
         try:
-            paragraphs = content.split('\n\n')
-            preserved_sections = {}
-            
-            logger.debug(f"Extracting sections - Total paragraphs found: {len(paragraphs)}")
-            
-            # Extract Hook (first paragraph)
-            hook_start = Config.SECTION_MARKERS['hook']['start']
-            hook_end = Config.SECTION_MARKERS['hook']['end']
-            if hook_start < len(paragraphs):
-                preserved_sections['hook'] = paragraphs[hook_start:hook_end][0] if hook_end - hook_start == 1 else '\n\n'.join(paragraphs[hook_start:hook_end])
-                logger.debug(f"Extracted Hook (paragraph 1): {preserved_sections['hook'][:100]}...")
-            else:
-                logger.warning("Hook section not found in content")
-                preserved_sections['hook'] = ""
-            
-            # Extract Summary (second paragraph - should be 2-3 lines ending with "read more...")
-            summary_start = Config.SECTION_MARKERS['summary']['start']
-            summary_end = Config.SECTION_MARKERS['summary']['end']
-            if summary_start < len(paragraphs):
-                preserved_sections['summary'] = paragraphs[summary_start:summary_end][0] if summary_end - summary_start == 1 else '\n\n'.join(paragraphs[summary_start:summary_end])
-                logger.debug(f"Extracted Summary (paragraph 2): {preserved_sections['summary'][:100]}...")
-            else:
-                logger.warning("Summary section not found in content")
-                preserved_sections['summary'] = ""
-            
-
-            
-            # Extract Disclaimer (last paragraph)
-            disclaimer_start = Config.SECTION_MARKERS['disclaimer']['start']
-            if len(paragraphs) > 0:
-                preserved_sections['disclaimer'] = paragraphs[disclaimer_start]
-                logger.debug(f"Extracted Disclaimer (paragraph {len(paragraphs)}): {preserved_sections['disclaimer'][:100]}...")
-            else:
-                logger.warning("Disclaimer section not found in content")
-                preserved_sections['disclaimer'] = ""
+            preserved_sections = extract_sections(content, Config.SECTION_MARKERS)
             
+            logger.debug(f"Extracted Hook: {preserved_sections.get('hook', '')[:100]}...")
+            logger.debug(f"Extracted Summary: {preserved_sections.get('summary', '')[:100]}...")
+            logger.debug(f"Extracted Disclaimer: {preserved_sections.get('disclaimer', '')[:100]}...")
             logger.debug("Section extraction complete")
             
             return preserved_sections
@@ -992,7 +1116,7 @@ class AzureServices:
             logger.error(f"Error preserving sections: {str(e)}", exc_info=True)
             return new_content
 
-    def _validate_with_gpt(self, original_text, new_content, components):
+    def _validate_with_gpt(self, original_text, new_content, components, usage=None):
         """Validate article components using GPT for better semantic understanding."""
         validation_prompt = f"""
             You are an expert content validator. Analyze these two articles and provide a detailed validation.
@@ -1060,8 +1184,10 @@ class AzureServices:
         """
 
         try:
-            response = self.text_client.chat.completions.create(
-                model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+            response = chat_completion(
+                self.text_client,
+                'validation',
+                usage=usage,
                 messages=[
                     {"role": "system", "content": "You are a JSON-only response validator. Always respond with valid JSON matching the exact structure provided."},
                     {"role": "user", "content": validation_prompt}
@@ -1119,11 +1245,13 @@ class AzureServices:
             logger.warning("Unable to validate article components. Please check the generated content manually.")
             return None
 
-    def rewrite_content(self, original_text, tone, tone_description, keywords, firm_name, location, lawyer_name, city, state, discovery_call_link, planning_session_name="15-minute discovery call"):
+    def rewrite_content(self, original_text, tone, tone_description, keywords, firm_name, location, lawyer_name, city, state, discovery_call_link, planning_session_name="15-minute discovery call", usage=None, preserved_sections=None):
         try:
-            # Extract sections to preserve
-            logger.debug("Extracting sections to preserve...")
-            preserved_sections = self._extract_sections(original_text)
+            # Use the sections indexed at upload time when the caller has them
+            # (see FileManager.read_preserved_sections), otherwise extract them now
+            if preserved_sections is None:
+                logger.debug("Extracting sections to preserve...")
+                preserved_sections = self._extract_sections(original_text)
             
             # CRITICAL: DO NOT MODIFY THESE SECTIONS {preserved_sections}:
             # 1. The first paragraph (Hook) - which is this
@@ -1207,8 +1335,10 @@ class AzureServices:
             """
             
             logger.debug("Generating rewritten content...")
-            response = self.text_client.chat.completions.create(
-                model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+            response = chat_completion(
+                self.text_client,
+                'rewrite',
+                usage=usage,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": original_text}
@@ -1221,7 +1351,7 @@ class AzureServices:
             
             # Generate summary (2-3 sentences ending with "Read more...")
             logger.debug("Generating summary...")
-            summary = self._generate_summary(rewritten_content, preserved_sections['hook'])
+            summary = self._generate_summary(rewritten_content, preserved_sections['hook'], usage=usage)
             
             # Final assembly with template
             logger.debug("Assembling final article with template...")
@@ -1239,7 +1369,11 @@ class AzureServices:
                 'discovery_call_link': discovery_call_link
             }
             
-            validation_results = self._validate_with_gpt(original_text, final_content, components)
+            validation_results = self._validate_with_gpt(original_text, final_content, components, usage=usage)
+            
+            local_metrics = change_metrics(original_text, final_content)
+            logger.info(f"Local change analysis: {local_metrics['change_percentage']}% changed, "
+                        f"{local_metrics['retained_sentences']} retained sentences ({local_metrics['elapsed_ms']}ms)")
             
             if validation_results is None:
                 logger.warning("Article validation failed. Please review the content manually.")
@@ -1248,13 +1382,33 @@ class AzureServices:
             return final_content
             
         except Exception as e:
+            if isinstance(e, CircuitOpenError) or is_transient_error(e):
+                # Surface saturation to the caller rather than passing off the original as a rewrite
+                logger.warning(f"Azure OpenAI unavailable during rewrite_content: {str(e)}")
+                raise
             logger.error(f"Error in rewrite_content: {str(e)}", exc_info=True)
             return original_text
 
-    def edit_content(self, session_id, user_message, current_content=None):
-        if session_id not in self.conversations:
-            self.conversations[session_id] = [
-                {"role": "system", "content": """
+    def edit_content(self, session_id, user_message, current_content=None, usage=None):
+        article = current_content or self.conversations.get_article(session_id)
+        if Config.EDIT_PATCH_MODE and article:
+            response = chat_completion(
+                self.text_client,
+                'edit_patch',
+                usage=usage,
+                messages=self.conversations.build_messages(session_id, PATCH_SYSTEM_PROMPT, user_message, article),
+                temperature=0.2
+            )
+            try:
+                edited = patch_article(article, response.choices[0].message.content)
+                edit_counters.increment('patch_applied')
+                self.conversations.record_reply(session_id, user_message, edited)
+                return edited
+            except PatchError as e:
+                logger.warning(f"Patch edit failed, falling back to full regeneration: {str(e)}")
+                edit_counters.increment('patch_failed')
+        
+        messages = self.conversations.build_messages(session_id, """
                     You are a legal blog post editor. When the user requests changes:
                     1. The first paragraph should not be repeating and be the same as the original
                     2. The second paragraph should not be extending and be the same as the original
@@ -1264,28 +1418,19 @@ class AzureServices:
                     3. Don't include any commentary or explanations
                     4. Preserve all formatting and structure
                     5. Don't repeat any paragraph meaning no same paragraph should be present.
-                """}
-            ]
-        
-        if current_content:
-            self.conversations[session_id].append(
-                {"role": "assistant", "content": current_content}
-            )
+                """, user_message, current_content)
         
-        self.conversations[session_id].append(
-            {"role": "user", "content": user_message}
-        )
-        
-        response = self.text_client.chat.completions.create(
-            model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
-            messages=self.conversations[session_id],
+        response = chat_completion(
+            self.text_client,
+            'edit',
+            usage=usage,
+            messages=messages,
             temperature=0.5
         )
         
         ai_response = response.choices[0].message.content
-        self.conversations[session_id].append(
-            {"role": "assistant", "content": ai_response}
-        )
+        edit_counters.increment('full_regeneration')
+        self.conversations.record_reply(session_id, user_message, ai_response)
         
         return ai_response
     
@@ -1410,7 +1555,7 @@ class AzureServices:
             logger.error(f"Error in structure validation: {str(e)}", exc_info=True)
             return content
 
-    def _generate_summary(self, article_content, hook):
+    def _generate_summary(self, article_content, hook, usage=None):
         """Generate a 2-3 sentence summary ending with 'Read more...'"""
         try:
             logger.debug("Generating summary")
@@ -1430,8 +1575,10 @@ class AzureServices:
                 Generate ONLY the summary (2-3 sentences ending with "Read more..."). Do not include any other text.
             """
             
-            response = self.text_client.chat.completions.create(
-                model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+            response = chat_completion(
+                self.text_client,
+                'summary',
+                usage=usage,
                 messages=[
                     {"role": "system", "content": "You are a summary generation expert. Always return concise, engaging summaries."},
                     {"role": "user", "content": summary_prompt}
@@ -1592,13 +1739,24 @@ The content is sourced from Personal Family Lawyer® for use by Personal Family
             logger.error(f"Error assembling final article: {str(e)}", exc_info=True)
             return article_content
 
-    def _format_markdown(self, content):
-        """Apply final markdown formatting to ensure proper structure and formatting."""
+    def _format_markdown(self, content, usage=None, preserved_sections=None, use_llm=None):
+        """
+        Apply final markdown formatting to ensure proper structure and formatting.
+        
+        Formatting is done by the local normalizer (utils.markdown_normalizer);
+        the model is only used when use_llm is set or Config.LLM_MARKDOWN_FORMATTING is enabled.
+        """
         try:
             logger.debug("Applying final markdown formatting")
             
-            # Extract the preserved sections first
-            preserved_sections = self._extract_sections(content)
+            # Extract the preserved sections first (unless already known)
+            if preserved_sections is None:
+                preserved_sections = self._extract_sections(content)
+            
+            if not (Config.LLM_MARKDOWN_FORMATTING if use_llm is None else use_llm):
+                final_content = normalize_markdown(content, preserved_sections)
+                logger.debug("Markdown normalized locally")
+                return final_content
             
             formatting_prompt = f"""
                 You are a markdown formatting expert. Format the following article content to ensure proper markdown structure and formatting.
@@ -1630,8 +1788,10 @@ The content is sourced from Personal Family Lawyer® for use by Personal Family
                 Return ONLY the formatted content with proper markdown formatting. Do not add any explanations or additional text.
             """
             
-            response = self.text_client.chat.completions.create(
-                model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+            response = chat_completion(
+                self.text_client,
+                'formatting',
+                usage=usage,
                 messages=[
                     {"role": "system", "content": "You are a markdown formatting expert. Always return properly formatted markdown content."},
                     {"role": "user", "content": formatting_prompt}
@@ -1657,48 +1817,50 @@ The content is sourced from Personal Family Lawyer® for use by Personal Family
 
 class ImageGenerator:
     def __init__(self):
-        self.image_client = AzureOpenAI(
-            api_key=os.getenv("AZURE_DALLE_KEY"),
-            api_version="2024-02-01",
-            azure_endpoint=os.getenv("AZURE_DALLE_ENDPOINT")
-        )
-        self.text_client = AzureOpenAI(
-            api_key=os.getenv("AZURE_OPENAI_KEY"),
-            api_version="2024-02-15-preview",
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
+        self.image_client = get_image_client()
+        self.text_client = get_text_client()
+        # Post -> safe prompt -> image cache, shared with the /generate_image route
+        generated_dir = os.path.join(app.static_folder, 'generated')
+        self.cache = ImageCache(generated_dir, on_evict=lambda name: remove_variants(generated_dir, name),
+                                is_pinned=lambda name: image_assets.referenced(name))
 
-    def generate_image(self, text_prompt):
+    def generate_image(self, text_prompt, usage=None):
         try:
-            safe_prompt = self._get_safe_image_prompt(text_prompt)
-            
-            response = self.image_client.images.generate(
-                model=os.getenv("AZURE_DALLE_DEPLOYMENT"),
-                prompt=safe_prompt,
+            safe_prompt = self.cache.get_prompt(text_prompt)
+            if safe_prompt is None:
+                safe_prompt = self._get_safe_image_prompt(text_prompt, usage=usage)
+                self.cache.put_prompt(text_prompt, safe_prompt)
+            
+            cached_image = self.cache.get_image(safe_prompt)
+            if cached_image:
+                logger.info(f"Reusing cached image {cached_image}")
+                return cached_image
+            
+            response = image_generation(
+                self.image_client,
+                safe_prompt,
+                usage=usage,
                 size="1024x1024",
                 quality="standard",
                 n=1,
             )
             image_url = response.data[0].url
-            os.makedirs(os.path.join(app.static_folder, 'generated'), exist_ok=True)
-            
-            timestamp = int(time.time())
-            image_filename = f"image_{timestamp}.png"
-            image_path = os.path.join(app.static_folder, 'generated', image_filename)
             
             response = requests.get(image_url)
-            with open(image_path, 'wb') as f:
-                f.write(response.content)
-            
-            return image_filename
+            return self.cache.put_image(safe_prompt, response.content)
             
         except Exception as e:
+            if isinstance(e, CircuitOpenError) or is_transient_error(e):
+                logger.warning(f"Azure OpenAI unavailable during image generation: {e}")
+                raise
             logger.error(f"Image generation failed: {e}", exc_info=True)
             return None
         
-    def _get_safe_image_prompt(self, text_prompt):
-        response = self.text_client.chat.completions.create(
-            model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+    def _get_safe_image_prompt(self, text_prompt, usage=None):
+        response = chat_completion(
+            self.text_client,
+            'image_prompt',
+            usage=usage,
             messages=[
                 {"role": "system", "content": """
                     You are a creative prompt engineer for legal blog images. Create safe and professional image prompts that:
@@ -1716,7 +1878,7 @@ class ImageGenerator:
                         - Mood/tone
                     - Is based on this blog content:
                 """},
-                {"role": "user", "content": text_prompt[:1000]}
+                {"role": "user", "content": text_prompt[:PROMPT_INPUT_CHARS]}
             ],
             temperature=1
         )
@@ -1849,125 +2011,161 @@ class FileManager:
     @staticmethod
     def read_docx(filename):
         """
-        Read content from a DOCX file (database first, then file system fallback)
+        Read the plain text of an article (database first, then file system fallback)
         Args:
             filename: Name of the DOCX file (may be URL-encoded)
         Returns:
             Extracted text content
         """
-        # URL-decode the filename first
+        return FileManager.get_projections(filename)['plain_text']
+
+    @staticmethod
+    def read_markdown(filename):
+        """
+        Read the markdown of an article (database first, then file system fallback)
+        Args:
+            filename: Name of the DOCX or markdown file (may be URL-encoded)
+        Returns:
+            Markdown content
+        """
         decoded_filename = unquote(filename)
-        
+        if decoded_filename.endswith('.md'):
+            decoded_filename = decoded_filename[:-3] + '.docx'
+        markdown_content = FileManager.get_projections(decoded_filename)['markdown']
+        if markdown_content is None:
+            raise FileNotFoundError(f"Markdown file not found: {decoded_filename}")
+        return markdown_content
+
+    @staticmethod
+    def read_article_html(filename):
+        """
+        Sanitized HTML of an article for the review and preview panes
+        Args:
+            filename: Name of the DOCX file (may be URL-encoded)
+        Returns:
+            HTML rendered once when the article was ingested
+        """
+        return FileManager.get_projections(filename)['html']
+
+    @staticmethod
+    def get_projections(filename):
+        """
+        Get the materialized projections of an article from the per-process cache
+        Args:
+            filename: Name of the DOCX file (may be URL-encoded)
+        Returns:
+            Dict of projections (see utils.article_projections); treat as read-only
+        """
+        # Uploads and file edits clear the cache through the catalog's version stamp
+        article_catalog.check()
+        return article_projections.get(unquote(filename))
+
+    @staticmethod
+    def load_projections(filename):
+        """
+        Load the stored projections of an article (database first, then DOCX files).
+        Articles that predate projections get them built and stored on first read.
+        Args:
+            filename: Decoded article filename
+        Returns:
+            Dict of projections
+        """
         try:
-            # Try to read from database first
             db = get_db()
             cursor = db.cursor()
             cursor.execute("""
-                SELECT markdown_content, docx_content
+                SELECT markdown_content, section_offsets, projections
                 FROM articles 
                 WHERE filename = ? AND is_active = 1 AND status = 'active'
-            """, (decoded_filename,))
+            """, (filename,))
             article = cursor.fetchone()
-            
-            if article and (article[0] if not hasattr(article, 'keys') else article['markdown_content']):
-                # Convert markdown to plain text for consistency
-                import re
-                # Get markdown content
-                markdown_content = article[0] if not hasattr(article, 'keys') else article['markdown_content']
-                # Remove markdown formatting
-                text = re.sub(r'#+\s*', '', markdown_content)  # Remove headers
-                text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Remove bold
-                text = re.sub(r'\*(.*?)\*', r'\1', text)  # Remove italic
-                return text.strip()
+            if article is not None and not hasattr(article, 'keys'):
+                article = dict(zip(('markdown_content', 'section_offsets', 'projections'), article))
+            
+            if article and article['markdown_content']:
+                projections = json.loads(article['projections']) if article['projections'] else None
+                if not is_current(projections):
+                    projections = build_projections(article['markdown_content'],
+                                                    section_offsets=article['section_offsets'],
+                                                    markers=Config.SECTION_MARKERS)
+                    cursor.execute("UPDATE articles SET projections = ? WHERE filename = ?",
+                                   (FileManager.projections_column(projections), filename))
+                    db.commit()
+                # Markdown and offsets have their own columns (kept current by uploads and reindex-sections)
+                projections['markdown'] = article['markdown_content']
+                projections['section_offsets'] = article['section_offsets']
+                return projections
             
         except Exception as e:
-            logger.error(f"Error reading from database: {str(e)}", exc_info=True)
+            logger.error(f"Error reading projections from database: {str(e)}", exc_info=True)
         
         # Fallback to file system
+        from content.articles.docx_to_markdown import load_docx_projections
         try:
-            filepath = os.path.join(Config.ARTICLES_DIR, 'docx', decoded_filename)
-            normalized_path = os.path.normpath(filepath)
-            
-            if '..' in normalized_path:
-                raise ValueError("Path traversal detected")
-            
-            if not os.path.exists(normalized_path):
-                raise FileNotFoundError(f"Article file not found: {decoded_filename}")
-            
-            doc = Document(normalized_path)
-            return "\n".join([para.text for para in doc.paragraphs])
-            
-        except Exception as e:
-            logger.error(f"Error reading from file system: {str(e)}", exc_info=True)
-            raise FileNotFoundError(f"Article file not found: {decoded_filename}")
+            return load_docx_projections(filename)
+        except ValueError as e:
+            raise FileNotFoundError(f"Article file not found: {filename}") from e
 
     @staticmethod
-    def read_markdown(filename):
+    def projections_column(projections):
+        """JSON for the articles.projections column (markdown and offsets are stored separately)"""
+        return json.dumps({key: value for key, value in projections.items()
+                           if key not in ('markdown', 'section_offsets')})
+
+    @staticmethod
+    def read_preserved_sections(filename, text):
         """
-        Read content from a markdown file (database first, then file system fallback)
+        Get the preserved sections indexed for an article (database first, then sections.json)
         Args:
-            filename: Name of the markdown file (may be URL-encoded)
+            filename: Name of the DOCX file (may be URL-encoded)
+            text: Article text as returned by read_docx
         Returns:
-            Markdown content
+            Dict of hook/summary/disclaimer, or None if the article has no current index
+            or the indexed sections are not short paragraphs (see usable_sections)
         """
-        # URL-decode the filename first
         decoded_filename = unquote(filename)
         
+        # Offsets materialized with the article's projections
+        try:
+            sections = sections_from_offsets(text, FileManager.get_projections(decoded_filename)['section_offsets'],
+                                             Config.SECTION_MARKERS)
+            if sections is not None:
+                return usable_sections(text, sections)
+        except (ValueError, FileNotFoundError):
+            pass
+        
+        offsets = None
         try:
-            # Try to read from database first
             db = get_db()
             cursor = db.cursor()
             cursor.execute("""
-                SELECT markdown_content
+                SELECT section_offsets
                 FROM articles 
                 WHERE filename = ? AND is_active = 1 AND status = 'active'
             """, (decoded_filename,))
             article = cursor.fetchone()
-            
-            if article and (article[0] if not hasattr(article, 'keys') else article['markdown_content']):
-                return article[0] if not hasattr(article, 'keys') else article['markdown_content']
-            
+            if article:
+                offsets = article[0]
         except Exception as e:
-            logger.error(f"Error reading markdown from database: {str(e)}", exc_info=True)
+            logger.error(f"Error reading section offsets from database: {str(e)}", exc_info=True)
         
-        # Fallback to file system
-        try:
-            # Convert .docx extension to .md extension
-            if decoded_filename.endswith('.docx'):
-                markdown_filename = decoded_filename.replace('.docx', '.md')
-            else:
-                markdown_filename = decoded_filename
-            
-            filepath = os.path.join(Config.ARTICLES_DIR, 'markdown', markdown_filename)
-            normalized_path = os.path.normpath(filepath)
-            
-            if '..' in normalized_path:
-                raise ValueError("Path traversal detected")
-            
-            if not os.path.exists(normalized_path):
-                raise FileNotFoundError(f"Markdown file not found: {markdown_filename}")
-            
-            with open(normalized_path, 'r', encoding='utf-8') as f:
-                return f.read()
-                
-        except Exception as e:
-            logger.error(f"Error reading markdown from file system: {str(e)}", exc_info=True)
-            raise FileNotFoundError(f"Markdown file not found: {decoded_filename}")
-    
+        if not offsets:
+            from content.articles.docx_to_markdown import load_section_index
+            offsets = load_section_index().get(decoded_filename)
+        
+        return usable_sections(text, sections_from_offsets(text, offsets, Config.SECTION_MARKERS))
+
     @staticmethod
-    def save_content(content):
+    def save_content(content, owner=None):
         """
-        Save generated content to a file
+        Save generated content as a content-addressed text asset
         Args:
             content: Content to save
+            owner: User the asset is referenced for
         Returns:
             Filename of the saved content
         """
-        filename = f"blog_{int(time.time())}.txt"
-        path = os.path.join(Config.GENERATED_DIR, filename)
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return filename
+        return text_assets.put(owner if owner is not None else 'anonymous', content.encode('utf-8'), 'blog', 'txt')
 
     @staticmethod
     def generate_formatted_docx(content, title="Legal Blog"):
@@ -2041,8 +2239,116 @@ class FileManager:
         file_stream.seek(0)
         return file_stream
 
+# Generated post text and images, referenced per user (see utils.asset_store)
+text_assets = AssetStore('text', create_asset_backend(Config.GENERATED_DIR), Config.ASSET_INDEX_PATH)
+image_assets = AssetStore(
+    'image',
+    LocalAssetBackend(os.path.join(app.static_folder, 'generated')),
+    Config.ASSET_INDEX_PATH,
+    on_delete=lambda name: remove_variants(os.path.join(app.static_folder, 'generated'), name)
+)
+
+# Dashboard article listing, rebuilt only when uploads or article files change
+article_catalog = ArticleCatalog(
+    loader=lambda: (FileManager.list_articles(), FileManager.get_article_metadata()),
+    version_path=os.path.join(Config.ARTICLES_DIR, '.catalog_version'),
+    watched_paths=[os.path.join(Config.ARTICLES_DIR, 'docx'), os.path.join(Config.ARTICLES_DIR, 'markdown'),
+                   os.path.join(Config.ARTICLES_DIR, 'metadata.json')]
+)
+# Plain text, markdown, HTML and stats of each article, built once at ingest
+article_projections = ProjectionCache(FileManager.load_projections)
+article_catalog.add_listener(article_projections.clear)
+# Warming runs one job at a time; a change while it runs is covered by the running job
+projection_warmer = JobManager(max_workers=1)
+
+def warm_article_projections():
+    """
+    Load the projections of the first listed articles (up to the cache size) in the
+    background so their previews are served from memory. Skipped under testing.
+    """
+    if app.testing:
+        return
+    def warm():
+        with app.app_context():
+            articles, _ = article_catalog.get()
+            loaded = article_projections.warm(articles)
+            logger.info(f"Warmed projections for {loaded} article(s)")
+            return loaded
+    projection_warmer.submit('system', 'warm-projections', warm)
+
+_projections_warm_started = False
+
+@app.before_request
+def start_projection_warming():
+    """Warm the article projections once the app is serving (never at import time)"""
+    global _projections_warm_started
+    if _projections_warm_started or not Config.ARTICLE_PREVIEW_WARM:
+        return
+    _projections_warm_started = True
+    warm_article_projections()
+
+if Config.ARTICLE_PREVIEW_WARM:
+    article_catalog.add_listener(warm_article_projections)
+
+# Ranked full-text search over the article library, kept in step with the catalog
+article_search = SearchIndex()
+
 azure_services = AzureServices()
 image_generator = ImageGenerator()
+# Responsive WebP/JPEG variants are created off the request thread
+image_variants = VariantPipeline()
+# Image generation runs as background jobs polled by the review page
+image_jobs = JobManager()
+
+# Generated images and variants have content-addressed names, so they never change
+GENERATED_IMAGE_MAX_AGE = 365 * 24 * 3600
+IMAGE_STREAM_CHUNK_SIZE = 64 * 1024
+
+def generated_image_dir():
+    return os.path.join(app.static_folder, 'generated')
+
+def asset_owner():
+    """Owner of the assets created in this request"""
+    return session.get('user', {}).get('id', 'anonymous')
+
+def save_post_content(post):
+    """
+    Save the post's content, moving the user's reference from the previous version
+    Args:
+        post: The current_post session dict (updated in place)
+    Returns:
+        Filename of the saved content
+    """
+    owner = asset_owner()
+    filename = FileManager.save_content(post['content'], owner=owner)
+    if post.get('filename') and post['filename'] != filename:
+        text_assets.release(owner, post['filename'])
+    post['filename'] = filename
+    return filename
+
+def release_post_assets(post):
+    """Release the user's references to a post's text and image (e.g. when a new post starts)"""
+    owner = asset_owner()
+    text_assets.release(owner, post.get('filename'))
+    image_assets.release(owner, post.get('image'))
+
+def image_context(filename):
+    """
+    URLs for a generated image.
+    
+    Returns:
+        Tuple of (image_url, image_sources); image_sources holds the srcsets
+        of the responsive variants, or None until they have been created
+    """
+    if not filename:
+        return None, None
+    image_url = url_for('generated_image', filename=filename)
+    sources = image_sources(generated_image_dir(), filename,
+                            lambda name: url_for('generated_image', filename=name))
+    if sources is None:
+        # Older images (or a restart before the job ran) get their variants now
+        image_variants.submit(generated_image_dir(), filename)
+    return image_url, sources
 
 @app.template_filter('markdown')
 def markdown_filter(text):
@@ -2317,9 +2623,8 @@ def dashboard():
         session.clear()
         return redirect(url_for('login'))
     
-    # Get articles and their metadata
-    articles = FileManager.list_articles()
-    metadata = FileManager.get_article_metadata()
+    # Get articles and their metadata (cached per process, see utils.article_catalog)
+    articles, metadata = article_catalog.get()
     
     # Get unique series names
     series_list = set()
@@ -2452,8 +2757,9 @@ async def select_article(article):
         logger.debug(f"Content generation request - Article: {article}, Tone: {tone}, Firm: {firm}")
         logger.debug(f"Function URL: {function_url}")
         
+        original_text = FileManager.read_docx(article)
         payload = {
-            "original_text": FileManager.read_docx(article),
+            "original_text": original_text,
             "tone": tone,
             "tone_description": tone_description,
             "keywords": keywords,
@@ -2463,11 +2769,18 @@ async def select_article(article):
             "city": city,
             "state": state,
             "planning_session_name": planning_session_name,
-            "discovery_call_link": discovery_call_link
+            "discovery_call_link": discovery_call_link,
+            # Kept verbatim by the function instead of being rewritten
+            "preserved_sections": FileManager.read_preserved_sections(article, original_text)
         }
         
         logger.debug(f"Payload prepared with {len(payload)} items")
         
+        # Overlap image work with the rewrite (the prompt only needs the topic of the post)
+        image_prefetch = None
+        if Config.IMAGE_PREFETCH_FROM == 'source':
+            image_prefetch = start_image_prefetch(payload['original_text'], user['id'])
+        
         if SIMULATE_OPENAI:
             logger.info("Using SIMULATE_OPENAI mode for content generation")
             await simulate_openai_call()
@@ -2518,11 +2831,15 @@ async def select_article(article):
                                 additional_data=f"Article: {article}, Tone: {tone}, Keywords: {keywords}"
                             )
                             
+                            if response.status in (429, 503):
+                                raise ServiceBusyError(response.status, response.headers.get('Retry-After'))
                             raise Exception(f"Function error: {response_text}")
                         
                         result = await response.json()
                         logger.debug(f"Parsed JSON result keys: {list(result.keys())}")
-                        blog_content = result["content"]
+                        # House formatting, applied locally (no model call); the function already
+                        # placed any preserved sections, so they are not passed again here
+                        blog_content = normalize_markdown(result["content"])
                         logger.info(f"Content generation successful. Generated content length: {len(blog_content)}")
                         
                         # Log successful activity
@@ -2536,9 +2853,14 @@ async def select_article(article):
                             response_size=len(blog_content),
                             processing_time_ms=int((time.time() - start_time) * 1000),
                             success=True,
-                            additional_data=f"Article: {article}, Tone: {tone}, Keywords: {keywords}"
+                            additional_data=f"Article: {article}, Tone: {tone}, Keywords: {keywords}",
+                            token_usage=result.get('usage')
                         )
                         
+            except ServiceBusyError as e:
+                logger.warning(f"Content generation deferred, function busy (status {e.status})")
+                flash(e.user_message, 'warning')
+                return redirect(url_for('dashboard'))
             except Exception as e:
                 logger.error(f"Content generation exception: {str(e)}", exc_info=True)
                 
@@ -2559,18 +2881,32 @@ async def select_article(article):
                 
                 raise
         
-        # Save the generated content to a file
-        filename = FileManager.save_content(blog_content)
+        # Measure how much the rewrite changed from the source (local diff, milliseconds)
+        source_metrics = change_metrics(payload['original_text'], blog_content)
+        source_metrics['content_sha'] = hashlib.sha1(blog_content.encode('utf-8')).hexdigest()
+        logger.info(f"Content generation change from source: {source_metrics['change_percentage']}% "
+                    f"({source_metrics['retained_sentences']} retained sentences)")
+        
+        # Save the generated content; the previous post's assets are no longer needed
+        if 'current_post' in session:
+            release_post_assets(session['current_post'])
+        filename = FileManager.save_content(blog_content, owner=user['id'])
+        
+        if image_prefetch is None:
+            image_prefetch = start_image_prefetch(blog_content, user['id'])
         
         # Set up the session data for the review page (without image initially)
         session['current_post'] = {
             'original': article,
             'content': blog_content,
-            'image': None,  # Image will be generated later when requested
+            'image': None,  # Image will be generated later when requested (or prefetched)
             'created': datetime.now().strftime("%Y-%m-%d %H:%M"),
             'tone': tone,
-            'filename': filename
+            'filename': filename,
+            'change_metrics': source_metrics
         }
+        if image_prefetch:
+            session['current_post']['image_prefetch'] = image_prefetch
         
         # Initialize chat history
         session['chat_history'] = [{
@@ -2622,27 +2958,54 @@ def finalize():
         return redirect(url_for('dashboard'))
     
     post = session['current_post']
-    filename = FileManager.save_content(post['content'])
-    image_url = url_for('static', filename=f'generated/{post["image"]}') if post.get('image') else None
+    filename = save_post_content(post)
+    session.modified = True
+    image_url, image_sources = image_context(post.get('image'))
     
     return render_template('finalize.html', 
                          post=post,
                          filename=filename,
-                         image_url=image_url)
+                         image_url=image_url,
+                         image_sources=image_sources)
+
+def refresh_change_metrics(post):
+    """
+    Recompute the post's change metrics if its content changed since they were computed
+    Args:
+        post: The current_post session dict (updated in place)
+    Returns:
+        Change metrics dict, or None if the source article is not available
+    """
+    if 'original' not in post:
+        return None
+    
+    content_sha = hashlib.sha1(post['content'].encode('utf-8')).hexdigest()
+    metrics = post.get('change_metrics')
+    if metrics and metrics.get('content_sha') == content_sha:
+        return metrics
+    
+    try:
+        original_text = FileManager.read_docx(post['original'])
+    except (ValueError, FileNotFoundError) as e:
+        logger.warning(f"Cannot compute change metrics, source article unavailable: {e}")
+        return None
+    
+    metrics = change_metrics(original_text, post['content'])
+    metrics['content_sha'] = content_sha
+    post['change_metrics'] = metrics
+    return metrics
 
 @app.route('/review', methods=['GET', 'POST'])
-@limiter.limit("30 per hour")  # Limit content editing to 30 per hour per user/IP
+@content_editing_limit  # Limit content editing to 30 per hour per user/IP
 async def review():
     # Check if we have a filename parameter but no current_post in session
     filename = request.args.get('filename')
     if filename and 'current_post' not in session:
         # Try to load the content from the file
         try:
-            # Use safe path validation
-            filepath = get_safe_file_path(Config.GENERATED_DIR, filename)
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
+            # Asset names are validated by the store (flat names only)
+            content = text_assets.read_text(filename)
+            
             # Set up the session data
             session['current_post'] = {
                 'content': content,
@@ -2759,6 +3122,8 @@ async def review():
                                     additional_data=f"User message: {user_message[:100]}..."
                                 )
                                 
+                                if response.status in (429, 503):
+                                    raise ServiceBusyError(response.status, response.headers.get('Retry-After'))
                                 raise Exception(f"Function error: {response_text}")
                             
                             result = await response.json()
@@ -2777,9 +3142,14 @@ async def review():
                                 response_size=len(edited_content),
                                 processing_time_ms=int((time.time() - start_time) * 1000),
                                 success=True,
-                                additional_data=f"User message: {user_message[:100]}..."
+                                additional_data=f"User message: {user_message[:100]}...",
+                                token_usage=result.get('usage')
                             )
                             
+                except ServiceBusyError as e:
+                    logger.warning(f"Content Editor - Function busy (status {e.status})")
+                    flash(e.user_message, 'warning')
+                    return redirect(url_for('review'))
                 except Exception as e:
                     logger.error(f"Content Editor - Exception occurred: {str(e)}", exc_info=True)
                     
@@ -2831,28 +3201,149 @@ async def review():
     
     # Save the current content to a file and get the filename
     if 'filename' not in post:
-        filename = FileManager.save_content(post['content'])
-        post['filename'] = filename
+        save_post_content(post)
         session['current_post'] = post
     
     # Get source article content if available
     source_article_content = None
     if 'original' in post:
         try:
-            markdown_content = FileManager.read_markdown(post['original'])
-            # Convert markdown to HTML for proper display
-            source_article_content = markdown.markdown(markdown_content)
+            # HTML rendered once when the article was ingested
+            source_article_content = FileManager.read_article_html(post['original'])
         except Exception as e:
             logger.error(f"Error reading source article: {e}", exc_info=True)
             source_article_content = "Source article not available"
     
-    image_url = url_for('static', filename=f'generated/{post["image"]}') if post.get('image') else None
+    # A prefetched image may be ready; if it is still running the page polls it
+    prefetch_job = apply_image_prefetch(post)
+    image_url, image_sources = image_context(post.get('image'))
+    
+    # Keep the change-from-source metrics in step with edits
+    metrics = refresh_change_metrics(post)
+    if metrics is not None:
+        session['current_post'] = post
     
     return render_template('review.html', 
                          post=post,
                          chat_history=session['chat_history'],
                          source_article_content=source_article_content,
-                         image_url=image_url)
+                         image_url=image_url,
+                         image_sources=image_sources,
+                         change_metrics=metrics,
+                         min_change_percentage=MIN_CHANGE_PERCENTAGE,
+                         sections=split_sections(post['content']),
+                         image_job_id=prefetch_job.id if prefetch_job else None)
+
+@app.route('/regenerate_section', methods=['POST'])
+@content_editing_limit  # Shares the content editing budget with /review
+async def regenerate_section():
+    """Regenerate one section (title, ## section or CTA) and splice it back into the post"""
+    if 'current_post' not in session or 'user' not in session:
+        return redirect(url_for('dashboard'))
+    
+    post = session['current_post']
+    section_id = request.form.get('section_id', type=int)
+    instructions = request.form.get('instructions', '').strip()
+    
+    section = get_section(post['content'], section_id) if section_id is not None else None
+    if section is None or section['heading'] != request.form.get('section_heading', section['heading']):
+        flash('That section has changed since the page was loaded. Please try again.', 'warning')
+        return redirect(url_for('review'))
+    
+    # Track activity start time
+    start_time = time.time()
+    
+    function_url = f"{FUNCTION_APP_URL}/api/section_editor?code={FUNCTION_KEY}"
+    payload = {
+        "section_kind": section['kind'],
+        "section_text": section['text'],
+        "instructions": instructions,
+        "context": section_context(post['content'], section)
+    }
+    
+    logger.debug(f"Section Editor - Regenerating {section['kind']} '{section['heading'][:50]}' "
+                 f"({len(section['text'])} of {len(post['content'])} characters)")
+    
+    if SIMULATE_OPENAI:
+        logger.info("Section Editor - Using SIMULATE_OPENAI mode")
+        await simulate_openai_call()
+        section_content = section['text']
+        token_usage = None
+    else:
+        try:
+            async with aiohttp.ClientSession() as client_session:
+                async with client_session.post(function_url, json=payload) as response:
+                    response_text = await response.text()
+                    
+                    if response.status != 200:
+                        logger.error(f"Section Editor - Error response (status {response.status}): {response_text[:500]}")
+                        
+                        # Log failed activity
+                        UserActivityTracker.log_activity(
+                            user_id=session['user']['id'],
+                            activity_type="section_regeneration",
+                            feature_name="AI Section Regeneration",
+                            api_endpoint=function_url,
+                            request_payload_size=len(str(payload)),
+                            response_status=response.status,
+                            response_size=len(response_text),
+                            processing_time_ms=int((time.time() - start_time) * 1000),
+                            success=False,
+                            error_message=response_text,
+                            additional_data=f"Section: {section['heading'][:100]}"
+                        )
+                        
+                        if response.status in (429, 503):
+                            raise ServiceBusyError(response.status, response.headers.get('Retry-After'))
+                        raise Exception(f"Function error: {response_text}")
+                    
+                    result = await response.json()
+                    section_content = result["section_content"]
+                    token_usage = result.get('usage')
+        except ServiceBusyError as e:
+            logger.warning(f"Section Editor - Function busy (status {e.status})")
+            flash(e.user_message, 'warning')
+            return redirect(url_for('review'))
+        except Exception as e:
+            logger.error(f"Section Editor - Exception occurred: {str(e)}", exc_info=True)
+            flash('Could not regenerate that section. Please try again.', 'error')
+            return redirect(url_for('review'))
+    
+    new_text = clean_section_output(section, section_content)
+    post['content'] = splice_section(post['content'], section, new_text)
+    
+    UserActivityTracker.log_activity(
+        user_id=session['user']['id'],
+        activity_type="section_regeneration",
+        feature_name="AI Section Regeneration",
+        api_endpoint="SIMULATED" if SIMULATE_OPENAI else function_url,
+        request_payload_size=len(str(payload)),
+        response_status=200,
+        response_size=len(new_text),
+        processing_time_ms=int((time.time() - start_time) * 1000),
+        success=True,
+        additional_data=f"Section: {section['heading'][:100]}",
+        token_usage=token_usage
+    )
+    
+    if 'chat_history' not in session:
+        session['chat_history'] = []
+    session['chat_history'].append({
+        'role': 'user',
+        'content': f"Regenerate \"{section['heading']}\"" + (f": {instructions}" if instructions else ""),
+        'content_is_blog': False,
+        'timestamp': datetime.now().strftime("%H:%M:%S")
+    })
+    session['chat_history'].append({
+        'role': 'assistant',
+        'content': post['content'],
+        'content_is_blog': True,
+        'timestamp': datetime.now().strftime("%H:%M:%S")
+    })
+    
+    session['current_post'] = post
+    session.modified = True
+    return redirect(url_for('review'))
 
 @app.route('/save_changes', methods=['POST'])
 def save_changes():
@@ -2882,23 +3373,13 @@ def download(filename):
         return redirect(url_for('dashboard'))
     
     try:
-        # For generated files, use simple path validation since they're internally generated
-        filepath = os.path.join(Config.GENERATED_DIR, filename)
-        normalized_path = os.path.normpath(filepath)
-        
-        # Simple path traversal check - look for .. in the path
-        if '..' in normalized_path:
-            logger.warning(f"Path traversal detected: {normalized_path}")
-            return redirect(url_for('review'))
-        
-        # Check if file exists
-        if not os.path.exists(normalized_path):
-            logger.warning(f"File not found: {normalized_path}")
+        # Asset names are validated by the store (flat names only, no '..')
+        try:
+            content = text_assets.read_text(filename)
+        except (ValueError, FileNotFoundError) as e:
+            logger.warning(f"Download not available for {filename}: {e}")
             return redirect(url_for('review'))
         
-        with open(normalized_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
         # Get title
         title = session['current_post'].get('original', 'Legal Blog').replace('.docx', '')
         
@@ -2916,20 +3397,35 @@ def download(filename):
         logger.error(f"Download error: {e}", exc_info=True)
         return redirect(url_for('review'))
 
-@app.route('/generate_image')
-@limiter.limit("20 per hour")  # Limit image generation to 20 per hour per user/IP
-async def generate_image():
-    if 'current_post' not in session:
-        return redirect(url_for('dashboard'))
-
+async def produce_image(text_prompt, user_id, safe_prompt=None):
+    """
+    Generate (or reuse) the image for a post via the image function.
+    
+    Shared by /generate_image and background image jobs; runs without a
+    request so it can be awaited from a worker thread.
+    
+    Args:
+        text_prompt: Post content
+        user_id: User the activity is logged for
+        safe_prompt: Prefetched image prompt; the function skips its prompt stage
+    
+    Returns:
+        Image filename in static/generated
+    
+    Raises:
+        ServiceBusyError: If the function reports 429/503
+    """
     # Track activity start time
     start_time = time.time()
     
     # Call Azure Function for image generation
     function_url = f"{FUNCTION_APP_URL}/api/image_generator?code={FUNCTION_KEY}"
     payload = {
-        "text_prompt": session['current_post']['content']
+        "text_prompt": text_prompt,
+        "response_format": "binary"
     }
+    if safe_prompt:
+        payload["safe_prompt"] = safe_prompt
     
     logger.debug(f"Image Generator - Function URL: {function_url}")
     logger.debug(f"Image Generator - Payload keys: {list(payload.keys())}")
@@ -2938,12 +3434,10 @@ async def generate_image():
     if SIMULATE_OPENAI:
         logger.info("Image Generator - Using SIMULATE_OPENAI mode")
         await simulate_openai_call()
-        session['current_post']['image'] = "dummy.png"
-        session.modified = True
         
         # Log simulated activity
         UserActivityTracker.log_activity(
-            user_id=session['user']['id'],
+            user_id=user_id,
             activity_type="image_generation",
             feature_name="AI Image Generation",
             api_endpoint="SIMULATED",
@@ -2955,26 +3449,43 @@ async def generate_image():
             additional_data="Generated dummy image"
         )
         
-        return redirect(url_for('review'))
+        return "dummy.png"
+    
+    # Same post content as a previous request: reuse its image without calling the function
+    cached_image = image_generator.cache.lookup(payload['text_prompt'])
+    if cached_image:
+        logger.info(f"Image Generator - Reusing cached image {cached_image}")
+        
+        UserActivityTracker.log_activity(
+            user_id=user_id,
+            activity_type="image_generation",
+            feature_name="AI Image Generation",
+            api_endpoint="CACHE",
+            request_payload_size=len(str(payload)),
+            response_status=200,
+            response_size=0,
+            processing_time_ms=int((time.time() - start_time) * 1000),
+            success=True,
+            additional_data=f"Reused cached image: {cached_image}"
+        )
+        
+        return cached_image
     
     logger.info("Image Generator - Making HTTP request to Azure Function")
     try:
-        import aiohttp, base64, os
         async with aiohttp.ClientSession() as client_session:
             logger.debug(f"Image Generator - Sending POST request to: {function_url}")
             
             async with client_session.post(function_url, json=payload) as response:
                 logger.debug(f"Image Generator - Response status: {response.status}")
                 
-                response_text = await response.text()
-                logger.debug(f"Image Generator - Response text length: {len(response_text)}")
-                
                 if response.status != 200:
+                    response_text = await response.text()
                     logger.error(f"Image Generator - Error response (status {response.status}): {response_text[:500]}")
                     
                     # Log failed activity
                     UserActivityTracker.log_activity(
-                        user_id=session['user']['id'],
+                        user_id=user_id,
                         activity_type="image_generation",
                         feature_name="AI Image Generation",
                         api_endpoint=function_url,
@@ -2987,32 +3498,45 @@ async def generate_image():
                         additional_data="Image generation failed"
                     )
                     
+                    if response.status in (429, 503):
+                        raise ServiceBusyError(response.status, response.headers.get('Retry-After'))
                     raise Exception(f"Function error: {response_text}")
                 
-                result = await response.json()
-                logger.debug(f"Image Generator - Parsed JSON result keys: {list(result.keys())}")
+                if response.content_type.startswith('image/'):
+                    # Binary mode: the PNG is streamed straight into the image cache
+                    result = await save_streamed_image(response)
+                    response_size = result['size']
+                else:
+                    # Older function deployments answer with base64 JSON
+                    response_text = await response.text()
+                    response_size = len(response_text)
+                    result = json.loads(response_text)
+                logger.debug(f"Image Generator - Result keys: {list(result.keys())}, {response_size} bytes")
                 logger.info(f"Image Generator - Image generation successful. Filename: {result.get('image_filename', 'unknown')}")
                 
                 # Log successful activity
                 UserActivityTracker.log_activity(
-                    user_id=session['user']['id'],
+                    user_id=user_id,
                     activity_type="image_generation",
                     feature_name="AI Image Generation",
                     api_endpoint=function_url,
                     request_payload_size=len(str(payload)),
                     response_status=response.status,
-                    response_size=len(response_text),
+                    response_size=response_size,
                     processing_time_ms=int((time.time() - start_time) * 1000),
                     success=True,
-                    additional_data=f"Generated image: {result.get('image_filename', 'unknown')}"
+                    additional_data=f"Generated image: {result.get('image_filename', 'unknown')}",
+                    token_usage=result.get('usage')
                 )
                 
+    except ServiceBusyError:
+        raise
     except Exception as e:
         logger.error(f"Image Generator - Exception occurred: {str(e)}", exc_info=True)
         
         # Log exception activity
         UserActivityTracker.log_activity(
-            user_id=session['user']['id'],
+            user_id=user_id,
             activity_type="image_generation",
             feature_name="AI Image Generation",
             api_endpoint=function_url,
@@ -3028,60 +3552,295 @@ async def generate_image():
         raise
     
     image_filename = result["image_filename"]
-    os.makedirs(os.path.join(app.static_folder, 'generated'), exist_ok=True)
+    safe_prompt = result.get("safe_prompt")
+    
+    if "image_data" in result:
+        image_bytes = base64.b64decode(result["image_data"])
+        if safe_prompt:
+            image_filename = image_generator.cache.put_image(safe_prompt, image_bytes)
+        else:
+            os.makedirs(os.path.join(app.static_folder, 'generated'), exist_ok=True)
+            image_path = os.path.join(app.static_folder, 'generated', image_filename)
+            with open(image_path, 'wb') as f:
+                f.write(image_bytes)
+    
+    if safe_prompt:
+        # The image is cached under its content-addressed name; the next request for this post is local
+        image_generator.cache.put_prompt(payload['text_prompt'], safe_prompt)
+    
+    return image_filename
+
+async def produce_image_prompt(text_prompt, user_id):
+    """
+    Get the safe image prompt for a post without generating the image.
+    
+    Used by IMAGE_PREFETCH=prompt so the prompt stage is done before the
+    user asks for an image.
+    
+    Args:
+        text_prompt: Post (or source article) content
+        user_id: User the activity is logged for
+    
+    Returns:
+        Safe image prompt
+    """
+    if SIMULATE_OPENAI:
+        await simulate_openai_call()
+        return "Simulated image prompt"
+    
+    safe_prompt = image_generator.cache.get_prompt(text_prompt)
+    if safe_prompt:
+        return safe_prompt
+    
+    start_time = time.time()
+    function_url = f"{FUNCTION_APP_URL}/api/image_generator?code={FUNCTION_KEY}"
+    payload = {
+        "text_prompt": text_prompt,
+        "prompt_only": True
+    }
+    
+    async with aiohttp.ClientSession() as client_session:
+        async with client_session.post(function_url, json=payload) as response:
+            response_text = await response.text()
+            success = response.status == 200
+            result = json.loads(response_text) if success else {}
+            
+            UserActivityTracker.log_activity(
+                user_id=user_id,
+                activity_type="image_generation",
+                feature_name="AI Image Prompt Prefetch",
+                api_endpoint=function_url,
+                request_payload_size=len(str(payload)),
+                response_status=response.status,
+                response_size=len(response_text),
+                processing_time_ms=int((time.time() - start_time) * 1000),
+                success=success,
+                error_message=None if success else response_text,
+                additional_data="Image prompt prefetch",
+                token_usage=result.get('usage')
+            )
+            
+            if response.status in (429, 503):
+                raise ServiceBusyError(response.status, response.headers.get('Retry-After'))
+            if not success:
+                raise Exception(f"Function error: {response_text}")
     
-    # Save the image data to file
-    image_path = os.path.join(app.static_folder, 'generated', image_filename)
-    with open(image_path, 'wb') as f:
-        f.write(base64.b64decode(result["image_data"]))
+    image_generator.cache.put_prompt(text_prompt, result['safe_prompt'])
+    return result['safe_prompt']
 
+def set_post_image(image_filename):
+    """Attach a generated image to the current post and queue its responsive variants"""
+    previous = session['current_post'].get('image')
+    image_assets.add_ref(asset_owner(), image_filename)
+    if previous and previous != image_filename:
+        image_assets.release(asset_owner(), previous)
+    session['current_post']['image'] = image_filename
+    session.modified = True
+    image_variants.submit(generated_image_dir(), image_filename)
+
+@app.route('/generate_image')
+@image_generation_limit  # Limit image generation to 20 per hour per user/IP
+async def generate_image():
+    """Generate an image and redirect back to review (fallback for the background job flow)"""
+    if 'current_post' not in session:
+        return redirect(url_for('dashboard'))
+    
+    post = session['current_post']
+    prefetch_job = apply_image_prefetch(post)
+    if prefetch_job is not None:
+        # The prefetched image is still being generated; the review page polls it
+        return redirect(url_for('review'))
+    
+    try:
+        image_filename = await produce_image(post['content'], session['user']['id'],
+                                             safe_prompt=take_prefetched_prompt(post))
+    except ServiceBusyError as e:
+        logger.warning(f"Image Generator - Function busy (status {e.status})")
+        flash(e.user_message, 'warning')
+        return redirect(url_for('review'))
+    
     if image_filename:
-        session['current_post']['image'] = image_filename
-        session.modified = True
+        set_post_image(image_filename)
     
     return redirect(url_for('review'))
+
+def run_image_job(text_prompt, user_id, safe_prompt=None):
+    """Worker-thread entry point for an image job; the owner references the image as soon as it exists"""
+    with app.app_context():
+        image_filename = asyncio.run(produce_image(text_prompt, user_id, safe_prompt=safe_prompt))
+        if image_filename:
+            # Pinned before anyone polls, so garbage collection cannot remove it in between
+            image_assets.add_ref(user_id, image_filename)
+        return image_filename
+
+def run_image_prompt_job(text_prompt, user_id):
+    """Worker-thread entry point for an image prompt prefetch job"""
+    with app.app_context():
+        return asyncio.run(produce_image_prompt(text_prompt, user_id))
+
+def start_image_prefetch(text_prompt, user_id):
+    """
+    Start the IMAGE_PREFETCH job for a new post.
+    
+    Returns:
+        Dict with the job id and mode to keep on the post, or None when disabled
+    """
+    mode = Config.IMAGE_PREFETCH
+    if mode == 'image':
+        job = image_jobs.submit(owner=user_id, key=ImageCache.content_key(text_prompt),
+                                fn=lambda: run_image_job(text_prompt, user_id))
+    elif mode == 'prompt':
+        job = image_jobs.submit(owner=user_id, key=f"prompt:{ImageCache.content_key(text_prompt)}",
+                                fn=lambda: run_image_prompt_job(text_prompt, user_id))
+    else:
+        return None
+    logger.info(f"Image Generator - Prefetch ({mode}) job {job.id} for user {user_id}")
+    return {'job_id': job.id, 'mode': mode}
+
+def apply_image_prefetch(post):
+    """
+    Move the result of a finished prefetch job onto the post.
+    
+    Args:
+        post: The current_post session dict (updated in place)
+    
+    Returns:
+        The prefetch image job if it is still running, else None
+    """
+    prefetch = post.get('image_prefetch')
+    if not prefetch:
+        return None
+    job = image_jobs.get(prefetch['job_id'])
+    if job is not None and job.active:
+        return job if prefetch['mode'] == 'image' else None
+    
+    post.pop('image_prefetch')
+    session.modified = True
+    if job is None or job.status != JOB_DONE or not job.result:
+        # Expired or failed: the user can still generate the image on demand
+        return None
+    if prefetch['mode'] == 'image':
+        if not post.get('image'):
+            set_post_image(job.result)
+    else:
+        post['image_prompt'] = job.result
+    return None
+
+def take_prefetched_prompt(post):
+    """Prefetched safe prompt for the post's first image (used once)"""
+    prompt = post.pop('image_prompt', None)
+    if prompt:
+        session.modified = True
+    return prompt if not post.get('image') else None
+
+def image_job_response(job):
+    """JSON body describing an image job; a finished job's image is attached to the post"""
+    data = {'job_id': job.id, 'status': job.status}
+    if job.status == JOB_DONE and job.result:
+        if session['current_post'].get('image') != job.result:
+            set_post_image(job.result)
+        data['image_url'], data['image_sources'] = image_context(job.result)
+    elif job.status == JOB_ERROR:
+        if isinstance(job.error, ServiceBusyError):
+            data['error'] = job.error.user_message
+            data['retry_after'] = job.error.retry_after
+        else:
+            data['error'] = 'Image generation failed. Please try again.'
+    return data
+
+@app.route('/image_jobs', methods=['POST'])
+@image_generation_limit  # Same budget as /generate_image
+def create_image_job():
+    """Start image generation in the background and return a job id to poll"""
+    if 'current_post' not in session or 'user' not in session:
+        return jsonify({'error': 'No post in progress'}), 400
+    
+    post = session['current_post']
+    job = apply_image_prefetch(post)
+    if job is not None:
+        # Already generating from the prefetch: poll that job instead
+        return jsonify(image_job_response(job)), 202
+    
+    text_prompt = post['content']
+    user_id = session['user']['id']
+    safe_prompt = take_prefetched_prompt(post)
+    job = image_jobs.submit(
+        owner=user_id,
+        key=ImageCache.content_key(text_prompt),
+        fn=lambda: run_image_job(text_prompt, user_id, safe_prompt=safe_prompt)
+    )
+    logger.info(f"Image Generator - Job {job.id} {job.status} for user {user_id}")
+    return jsonify(image_job_response(job)), 202
+
+@app.route('/image_jobs/<job_id>')
+@limiter.limit("600 per hour")  # Polled every few seconds while a job runs
+def image_job_status(job_id):
+    """Status of an image job; attaches the image to the current post once done"""
+    if 'current_post' not in session or 'user' not in session:
+        return jsonify({'error': 'No post in progress'}), 400
+    
+    job = image_jobs.get(job_id)
+    if job is None or job.owner != session['user']['id']:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(image_job_response(job))
     
 # Database cleanup is handled by close_db() function above
 
+async def save_streamed_image(response):
+    """
+    Stream a binary image response from the image function to disk.
+    
+    The body is written in chunks to a temporary file in the image cache, then
+    moved into place under its content-addressed name.
+    
+    Returns:
+        Dict with image_filename, safe_prompt, usage and size (bytes)
+    """
+    temp_path = image_generator.cache.temp_path()
+    size = 0
+    try:
+        with open(temp_path, 'wb') as f:
+            async for chunk in response.content.iter_chunked(IMAGE_STREAM_CHUNK_SIZE):
+                f.write(chunk)
+                size += len(chunk)
+        
+        safe_prompt = unquote(response.headers.get('X-Safe-Prompt', ''))
+        if safe_prompt:
+            image_filename = image_generator.cache.put_image_file(safe_prompt, temp_path)
+        else:
+            image_filename = os.path.basename(response.headers.get('X-Image-Filename') or f"image_{int(time.time())}.png")
+            os.replace(temp_path, os.path.join(generated_image_dir(), image_filename))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    usage_header = response.headers.get('X-Usage')
+    return {
+        'image_filename': image_filename,
+        'safe_prompt': safe_prompt or None,
+        'usage': json.loads(usage_header) if usage_header else None,
+        'size': size
+    }
+
+@app.route('/generated/<path:filename>')
+def generated_image(filename):
+    """Serve a generated image or variant with long-lived cache headers"""
+    response = send_from_directory(generated_image_dir(), filename, max_age=GENERATED_IMAGE_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={GENERATED_IMAGE_MAX_AGE}, immutable'
+    return response
+
 @app.route('/preview_article/<article>')
 def preview_article(article):
     try:
-        # URL-decode the article filename first
-        decoded_article = unquote(article)
-        
-        # For article filenames, we need to be more permissive
-        # Check if the file exists in the articles directory
-        article_path = os.path.join(Config.ARTICLES_DIR, 'docx', decoded_article)
-        normalized_article_path = os.path.normpath(article_path)
-        
-        # Simple path traversal check - look for .. in the path
-        if '..' in normalized_article_path:
-            return jsonify({'error': 'Invalid article path'}), 400
-        
-        # Try to read markdown file first
-        markdown_filename = decoded_article.replace('.docx', '.md')
-        markdown_path = os.path.join(Config.ARTICLES_DIR, 'markdown', markdown_filename)
-        normalized_markdown_path = os.path.normpath(markdown_path)
-        
-        # Ensure markdown path is also safe
-        if '..' in normalized_markdown_path:
-            return jsonify({'error': 'Invalid markdown path'}), 400
-        
-        if os.path.exists(normalized_markdown_path):
-            # Read the markdown content
-            with open(normalized_markdown_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        else:
-            # If markdown doesn't exist, read from docx
-            if not os.path.exists(normalized_article_path):
-                return jsonify({'error': 'Article not found'}), 404
-                
-            doc = Document(normalized_article_path)
-            content = "\n".join([para.text for para in doc.paragraphs])
-            
-        # Convert the content to HTML for preview
-        html_content = markdown.markdown(content)
-        return jsonify({'content': html_content})
+        # HTML rendered once when the article was ingested (see utils.article_projections)
+        projections = FileManager.get_projections(article)
+        
+        # The content hash identifies the rendered HTML, so browsers revalidate and get a 304 while it is unchanged
+        response = jsonify({'content': projections['html']})
+        response.set_etag(f"{projections['content_hash']}-{projections['version']}")
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except (ValueError, FileNotFoundError) as e:
         logger.error(f"File access error in preview_article: {str(e)}", exc_info=True)
         return jsonify({'error': 'Article not found'}), 404
@@ -3089,6 +3848,64 @@ def preview_article(article):
         logger.error(f"Error in preview_article: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+def article_search_version(filename, meta):
+    """Version of an article for the search index: its listed title and description and the DOCX file time"""
+    try:
+        mtime = os.stat(os.path.join(Config.ARTICLES_DIR, 'docx', filename)).st_mtime_ns
+    except OSError:
+        mtime = None
+    return (meta.get('title') or filename, meta.get('description') or '', mtime)
+
+def sync_article_search():
+    """Re-index the articles that changed since the catalog was last indexed (no-op while it is unchanged)"""
+    # The cached catalog object itself identifies the state; a rebuild returns a new one
+    catalog = article_catalog.get()
+    articles, metadata = catalog
+
+    def load(filename):
+        meta = metadata.get(filename, {})
+        # Read the stored projections directly so indexing doesn't churn the projection cache
+        return {
+            'title': meta.get('title') or filename,
+            'description': meta.get('description') or '',
+            'body': FileManager.load_projections(filename)['plain_text']
+        }
+
+    article_search.sync(
+        catalog,
+        lambda: {filename: article_search_version(filename, metadata.get(filename, {})) for filename in articles},
+        load
+    )
+
+@app.route('/search_articles')
+@limiter.limit("600 per hour")  # Queried while typing
+def search_articles():
+    """Ranked full-text search over article titles, descriptions and bodies"""
+    if not UserSession.get_current_user():
+        return jsonify({'error': 'Not logged in'}), 401
+
+    query = request.args.get('q', '').strip()[:200]
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    sync_article_search()
+
+    start = time.perf_counter()
+    results = article_search.search(query, limit=limit)
+    return jsonify({
+        'query': query,
+        'results': results,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+@app.route('/search_articles/suggest')
+@limiter.limit("600 per hour")  # Queried while typing
+def suggest_articles():
+    """Autocomplete the last word of a search from the indexed vocabulary"""
+    if not UserSession.get_current_user():
+        return jsonify({'error': 'Not logged in'}), 401
+
+    sync_article_search()
+    return jsonify({'suggestions': article_search.suggest(request.args.get('q', '')[:200])})
+
 def is_safe_filename(filename: str) -> bool:
     """
     Check if a filename is safe to use (prevents path traversal attacks).
@@ -3166,6 +3983,10 @@ def refresh_session():
     
     return redirect(url_for('dashboard'))
 
+# Admin article listing page size and DOCX download chunk size
+ADMIN_ARTICLES_PAGE_SIZE = int(os.getenv("ADMIN_ARTICLES_PAGE_SIZE", "50"))
+DOCX_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 @app.route('/admin/articles', methods=['GET', 'POST'])
 @require_admin
 def admin_articles():
@@ -3210,13 +4031,25 @@ def admin_articles():
             # Convert to markdown
             markdown_content = convert_docx_to_markdown(docx_io)
             
+            # Index the preserved sections and build the projections once so no request re-parses the article
+            projections = build_projections(markdown_content, markers=Config.SECTION_MARKERS)
+            section_offsets = projections['section_offsets']
+            
             # Store in database
             cursor.execute("""
-                INSERT INTO articles (title, description, filename, markdown_content, docx_content, created_by)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (title, description, file.filename, markdown_content, file_content, session['user']['id']))
+                INSERT INTO articles (title, description, filename, markdown_content, docx_content, created_by,
+                                      section_offsets, section_markers_version, projections)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (title, description, file.filename, markdown_content, file_content, session['user']['id'],
+                  json.dumps(section_offsets), section_offsets['version'],
+                  FileManager.projections_column(projections)))
             
             db.commit()
+            article_catalog.bump_version()
+            # Index the new article now; other processes pick it up through the catalog version
+            article_search.add_document(file.filename, title, description, projections['plain_text'],
+                                        version=article_search_version(file.filename,
+                                                                       {'title': title, 'description': description}))
             flash(f'Article "{title}" uploaded successfully!', 'success')
             
         except Exception as e:
@@ -3224,16 +4057,248 @@ def admin_articles():
             flash(f'Error uploading article: {str(e)}', 'error')
             logger.error(f"Upload error: {e}", exc_info=True)
     
-    # Get all articles for display
-    cursor.execute("""
-        SELECT a.*, u.username as created_by_name
+    # One page of articles, newest first. Only the listed columns are read: the
+    # markdown and DOCX payloads stay in the table (DOCX is downloaded on demand).
+    before_id = request.args.get('before', type=int)
+    cursor.execute(f"""
+        SELECT TOP ({ADMIN_ARTICLES_PAGE_SIZE + 1})
+            a.id, a.title, LEFT(a.description, 101) AS description, a.filename, a.is_active, a.status,
+            a.created_at, DATALENGTH(a.docx_content) AS docx_size, u.username AS created_by_name
         FROM articles a
         LEFT JOIN users u ON a.created_by = u.id
-        ORDER BY a.created_at DESC
-    """)
+        {'WHERE a.id < ?' if before_id else ''}
+        ORDER BY a.id DESC
+    """, (before_id,) if before_id else ())
     articles = cursor.fetchall()
     
-    return render_template('admin/articles.html', articles=articles)
+    # Keyset pagination: the next page starts below the last id shown
+    next_before = None
+    if len(articles) > ADMIN_ARTICLES_PAGE_SIZE:
+        articles = articles[:ADMIN_ARTICLES_PAGE_SIZE]
+        next_before = articles[-1].id
+    
+    cursor.execute("SELECT COUNT(*) FROM articles")
+    total_articles = cursor.fetchone()[0]
+    
+    return render_template('admin/articles.html',
+                         articles=articles,
+                         total_articles=total_articles,
+                         next_before=next_before,
+                         first_page=before_id is None)
+
+def attachment_disposition(filename):
+    """Content-Disposition for a download: an ASCII filename= for old clients plus the UTF-8 filename*"""
+    ascii_name = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+    ascii_name = re.sub(r'["\\\x00-\x1f\x7f]', '', ascii_name).strip()
+    if not ascii_name.rsplit('.', 1)[0].strip():
+        ascii_name = 'article.docx'
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+@app.route('/admin/articles/<int:article_id>/docx')
+@require_admin
+def admin_article_docx(article_id):
+    """Download an article's DOCX, streamed from the database in chunks"""
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT filename, DATALENGTH(docx_content) FROM articles WHERE id = ?", (article_id,))
+    article = cursor.fetchone()
+    if not article or not article[1]:
+        abort(404)
+    filename, size = article[0], article[1]
+    
+    def chunks():
+        # SUBSTRING reads one slice of the VARBINARY(MAX) per query, so the blob is never held in memory
+        chunk_cursor = get_db().cursor()
+        for offset in range(0, size, DOCX_DOWNLOAD_CHUNK_SIZE):
+            chunk_cursor.execute("SELECT SUBSTRING(docx_content, ?, ?) FROM articles WHERE id = ?",
+                                 (offset + 1, DOCX_DOWNLOAD_CHUNK_SIZE, article_id))
+            yield bytes(chunk_cursor.fetchone()[0])
+    
+    return Response(
+        stream_with_context(chunks()),
+        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+        headers={
+            'Content-Length': str(size),
+            'Content-Disposition': attachment_disposition(filename)
+        }
+    )
+
+@app.cli.command('reindex-sections')
+@click.option('--force', is_flag=True, help='Reindex every article, not just stale ones.')
+def reindex_sections(force):
+    """Recompute preserved section offsets (run after changing SECTION_MARKERS)."""
+    from content.articles.docx_to_markdown import index_docx_sections
+    
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT id, markdown_content, section_markers_version FROM articles")
+    version = markers_version(Config.SECTION_MARKERS)
+    
+    updated = 0
+    for article_id, markdown_content, stored_version in cursor.fetchall():
+        if not markdown_content or (stored_version == version and not force):
+            continue
+        section_offsets = compute_section_offsets(markdown_to_source_text(markdown_content), Config.SECTION_MARKERS)
+        cursor.execute(
+            "UPDATE articles SET section_offsets = ?, section_markers_version = ? WHERE id = ?",
+            (json.dumps(section_offsets), section_offsets['version'], article_id)
+        )
+        updated += 1
+    db.commit()
+    
+    indexed = index_docx_sections(force=force, markers=Config.SECTION_MARKERS)
+    article_catalog.bump_version()
+    click.echo(f"Reindexed {updated} database article(s) and {indexed} DOCX file(s)")
+
+@app.cli.command('build-projections')
+@click.option('--force', is_flag=True, help='Rebuild every article, not just missing or stale ones.')
+def build_article_projections(force):
+    """Build the plain text/HTML/stats projections of every article."""
+    from content.articles.docx_to_markdown import index_docx_projections
+    
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT id, markdown_content, section_offsets, projections FROM articles")
+    
+    built = 0
+    for article_id, markdown_content, section_offsets, stored in cursor.fetchall():
+        if not markdown_content or (not force and stored and is_current(json.loads(stored))):
+            continue
+        projections = build_projections(markdown_content, section_offsets=section_offsets, markers=Config.SECTION_MARKERS)
+        cursor.execute("UPDATE articles SET projections = ? WHERE id = ?",
+                       (FileManager.projections_column(projections), article_id))
+        built += 1
+    db.commit()
+    
+    docx_built = index_docx_projections(force=force)
+    article_catalog.bump_version()
+    click.echo(f"Built projections for {built} database article(s) and {docx_built} DOCX file(s)")
+
+@app.cli.command('sync-articles')
+@click.option('--force', is_flag=True, help='Reconvert every DOCX file, not just changed ones.')
+@click.option('--workers', type=int, default=None, help='Conversion processes (defaults to the CPU count).')
+@click.option('--batch-size', type=int, default=50, show_default=True, help='Database rows written per commit.')
+def sync_articles(force, workers, batch_size):
+    """Convert new and changed DOCX files and upsert them into the articles table."""
+    from content.articles.docx_to_markdown import sync_docx_library
+    
+    start = time.time()
+    written = {'updated': 0, 'inserted': 0}
+    
+    def write_database(report):
+        db = get_db()
+        cursor = db.cursor()
+        cursor.execute("SELECT filename FROM articles WHERE is_active = 1")
+        existing = {row[0] for row in cursor.fetchall()}
+        metadata = FileManager.get_article_metadata()
+        updates = [filename for filename in report['converted'] if filename in existing]
+        inserts = [filename for filename in report['converted'] if filename not in existing]
+        
+        def columns(filename):
+            result = report['converted'][filename]
+            with open(os.path.join(Config.ARTICLES_DIR, 'docx', filename), 'rb') as f:
+                docx_content = f.read()
+            # Offsets into the projections' plain text (markdown-derived), as uploads store them
+            section_offsets = result['projections']['section_offsets']
+            return (result['markdown'], docx_content, json.dumps(section_offsets), section_offsets['version'],
+                    FileManager.projections_column(result['projections']))
+        
+        def insert_row(filename):
+            meta = metadata.get(filename, {})
+            return (meta.get('title') or os.path.splitext(filename)[0], meta.get('description') or '',
+                    filename) + columns(filename)
+        
+        # Written in batches so a large refresh doesn't hold one long transaction; DOCX
+        # files are read per batch, so at most batch_size of them are in memory
+        for statement, filenames, row in (
+            ("""UPDATE articles SET markdown_content = ?, docx_content = ?, section_offsets = ?,
+                                    section_markers_version = ?, projections = ?
+                WHERE filename = ? AND is_active = 1""", updates, lambda filename: columns(filename) + (filename,)),
+            ("""INSERT INTO articles (title, description, filename, markdown_content, docx_content,
+                                      section_offsets, section_markers_version, projections)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", inserts, insert_row),
+            ("UPDATE articles SET is_active = 0 WHERE filename = ? AND is_active = 1",
+             report['removed'], lambda filename: (filename,))
+        ):
+            for i in range(0, len(filenames), batch_size):
+                cursor.executemany(statement, [row(filename) for filename in filenames[i:i + batch_size]])
+                db.commit()
+        written.update(updated=len(updates), inserted=len(inserts))
+    
+    # The sync manifest is only written once the database commit succeeded
+    report = sync_docx_library(force=force, workers=workers, markers=Config.SECTION_MARKERS,
+                               commit=write_database)
+    if report['converted'] or report['removed']:
+        article_catalog.bump_version()
+    
+    for label in ('added', 'changed', 'removed'):
+        for filename in report[label]:
+            click.echo(f"{label.capitalize()}: {filename}")
+    for filename, error in report['failed'].items():
+        click.echo(f"Failed: {filename}: {error}", err=True)
+    click.echo(f"Synced in {time.time() - start:.1f}s: {len(report['added'])} added, {len(report['changed'])} changed, "
+               f"{len(report['removed'])} removed, {len(report['unchanged'])} unchanged, {len(report['failed'])} failed "
+               f"({written['updated']} row(s) updated, {written['inserted']} inserted)")
+
+@app.cli.command('collect-assets')
+def collect_assets():
+    """Delete generated text and images that no post references any more."""
+    text_deleted = text_assets.collect_garbage()
+    image_deleted = image_assets.collect_garbage()
+    click.echo(f"Deleted {len(text_deleted)} text and {len(image_deleted)} image asset(s)")
+
+@app.route('/admin/usage')
+@require_admin
+def admin_usage():
+    """Token usage roll-up per day, user, firm, stage and deployment"""
+    days = request.args.get('days', 30, type=int)
+    user_id = request.args.get('user_id', type=int)
+    rows = UserActivityTracker.get_token_usage_rollup(user_id=user_id, days=days)
+    
+    return jsonify({
+        'days': days,
+        'usage': [{
+            'date': str(row.usage_date),
+            'username': row.username,
+            'firm': row.firm,
+            'stage': row.stage,
+            'deployment': row.deployment,
+            'calls': row.call_count,
+            'prompt_tokens': row.prompt_tokens,
+            'completion_tokens': row.completion_tokens,
+            'total_tokens': row.total_tokens,
+            'images': row.image_count,
+            'avg_latency_ms': row.avg_latency_ms
+        } for row in rows]
+    })
+
+def function_app_metrics():
+    """
+    Model-call metrics from the Function App (routing, per-stage latency and tokens,
+    retries, circuits, conversations, edits). The model calls run there, so the
+    web process has none of its own.
+    """
+    try:
+        response = requests.get(f"{FUNCTION_APP_URL}/api/llm_metrics", params={'code': FUNCTION_KEY}, timeout=10)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        logger.warning(f"Could not fetch Function App metrics: {str(e)}")
+        return {'error': 'Function App metrics unavailable'}
+
+@app.route('/admin/metrics')
+@require_admin
+def admin_metrics():
+    """Function App model-call metrics alongside the web app's caches and jobs"""
+    return jsonify({
+        'function_app': function_app_metrics(),
+        'image_cache': image_generator.cache.snapshot(),
+        'image_jobs': image_jobs.snapshot(),
+        'assets': {'text': text_assets.snapshot(), 'image': image_assets.snapshot()},
+        'article_catalog': article_catalog.snapshot(),
+        'article_projections': article_projections.snapshot(),
+        'search': article_search.snapshot()
+    })
 
 # Error handlers for standardized error handling
 @app.errorhandler(404)
@@ -1,14 +1,29 @@
 import os
-from docx import Document
+import sys
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import re
 from docx.shared import Pt
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 
+# Allow running as a script from this directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from utils.article_sections import compute_section_offsets, markers_version, SECTION_MARKERS
+from utils.article_projections import build_projections, is_current
+from utils.docx_text import iter_paragraphs, heading_level
+
+# Preserved section offsets for the DOCX files in docx/ (see utils.article_sections)
+SECTION_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sections.json')
+# Materialized projections of the DOCX files in docx/ (see utils.article_projections)
+PROJECTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'projections')
+# Content hashes of the DOCX files converted by sync_docx_library
+SYNC_MANIFEST_NAME = 'sync_manifest.json'
+
 def get_heading_level(paragraph):
     """Determine the heading level based on paragraph style and formatting."""
-    if paragraph.style.name.startswith('Heading'):
-        return int(paragraph.style.name[-1])
-    return 0
+    return heading_level(paragraph.style)
 
 def get_text_style(run):
     """Get the text style (bold, italic) for a run."""
@@ -20,11 +35,14 @@ def get_text_style(run):
     return style
 
 def convert_docx_to_markdown(docx_path):
-    """Convert a DOCX file to Markdown format."""
-    doc = Document(docx_path)
+    """Convert a DOCX file (path or file-like object) to Markdown format."""
+    return paragraphs_to_markdown(iter_paragraphs(docx_path))
+
+def paragraphs_to_markdown(paragraphs):
+    """Convert DOCX paragraphs (see utils.docx_text) to Markdown format."""
     markdown_lines = []
     
-    for paragraph in doc.paragraphs:
+    for paragraph in paragraphs:
         if not paragraph.text.strip():
             markdown_lines.append('')
             continue
@@ -85,6 +103,328 @@ def process_all_docx_files(force_overwrite=False):
                 f.write(markdown_content)
             
             print(f"Converted {filename} to {markdown_filename}")
+    
+    index_docx_sections(force=force_overwrite)
+    index_docx_projections(force=force_overwrite)
+
+def docx_source_text(docx_path):
+    """Plain text of a DOCX file as sent for generation (matches FileManager.read_docx)."""
+    return "\n".join(paragraph.text for paragraph in iter_paragraphs(docx_path))
+
+def load_section_index():
+    """Load the section offsets index, keyed by DOCX filename."""
+    try:
+        with open(SECTION_INDEX_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def index_docx_sections(force=False, markers=None):
+    """
+    Compute preserved section offsets for every DOCX file and store them in sections.json.
+    
+    Args:
+        force: Reindex every file, not just new ones or ones indexed with old markers
+        markers: Section markers (defaults to utils.article_sections.SECTION_MARKERS)
+    
+    Returns:
+        Number of files indexed
+    """
+    docx_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docx')
+    if not os.path.isdir(docx_dir):
+        return 0
+    
+    markers = markers or SECTION_MARKERS
+    version = markers_version(markers)
+    index = load_section_index()
+    indexed = 0
+    
+    for filename in os.listdir(docx_dir):
+        if not filename.endswith('.docx'):
+            continue
+        if not force and index.get(filename, {}).get('version') == version:
+            continue
+        index[filename] = compute_section_offsets(docx_source_text(os.path.join(docx_dir, filename)), markers)
+        indexed += 1
+    
+    if indexed:
+        with open(SECTION_INDEX_PATH, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        print(f"Indexed sections for {indexed} article(s)")
+    return indexed
+
+def _source_paths(filename):
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    docx_path = os.path.join(current_dir, 'docx', filename)
+    markdown_path = os.path.join(current_dir, 'markdown', os.path.splitext(filename)[0] + '.md')
+    return docx_path, markdown_path
+
+def _source_stamp(*paths):
+    """Modification times of the source files a projection was built from."""
+    return [os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in paths]
+
+def build_docx_projections(filename):
+    """
+    Build and store the projections of a DOCX file (and its markdown copy, if any).
+    
+    Args:
+        filename: DOCX filename in docx/
+    
+    Returns:
+        The projections
+    """
+    docx_path, markdown_path = _source_paths(filename)
+    if not os.path.exists(docx_path) and not os.path.exists(markdown_path):
+        raise FileNotFoundError(f"Article file not found: {filename}")
+    
+    markdown_content = None
+    if os.path.exists(markdown_path):
+        with open(markdown_path, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
+    plain_text = docx_source_text(docx_path) if os.path.exists(docx_path) else None
+    
+    projections = build_projections(markdown_content, plain_text=plain_text,
+                                    section_offsets=load_section_index().get(filename))
+    projections['source_stamp'] = _source_stamp(docx_path, markdown_path)
+    _write_json(os.path.join(PROJECTION_DIR, filename + '.json'), projections)
+    return projections
+
+def _write_json(path, data, **kwargs):
+    """Write JSON atomically so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **kwargs)
+    os.replace(temp_path, path)
+
+def load_docx_projections(filename):
+    """
+    Stored projections of a DOCX file, rebuilt if missing or older than its sources.
+    
+    Args:
+        filename: DOCX filename in docx/
+    
+    Returns:
+        The projections
+    """
+    if os.path.basename(filename) != filename or filename.startswith('.'):
+        raise ValueError("Invalid article filename")
+    return _stored_projections(filename) or build_docx_projections(filename)
+
+def _stored_projections(filename):
+    """Stored projections of a DOCX file, or None if missing or stale."""
+    try:
+        with open(os.path.join(PROJECTION_DIR, filename + '.json'), 'r', encoding='utf-8') as f:
+            projections = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if is_current(projections) and projections.get('source_stamp') == _source_stamp(*_source_paths(filename)):
+        return projections
+    return None
+
+def index_docx_projections(force=False):
+    """
+    Build projections for every DOCX file that has none or a stale one.
+    
+    Args:
+        force: Rebuild every file
+    
+    Returns:
+        Number of files built
+    """
+    docx_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docx')
+    if not os.path.isdir(docx_dir):
+        return 0
+    
+    built = 0
+    for filename in os.listdir(docx_dir):
+        if not filename.endswith('.docx'):
+            continue
+        if not force and _stored_projections(filename):
+            continue
+        build_docx_projections(filename)
+        built += 1
+    if built:
+        print(f"Built projections for {built} article(s)")
+    return built
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return default
+
+def _metadata_entry(filename, markdown_content):
+    """Dashboard metadata for a new article: its first heading (or filename) and first paragraph."""
+    title, description = None, ''
+    for line in markdown_content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#'):
+            title = title or line.lstrip('#').strip()
+        elif not description:
+            description = re.sub(r'[*_]', '', line)
+        if title and description:
+            break
+    if len(description) > 200:
+        description = description[:200].rsplit(' ', 1)[0] + '...'
+    return {'filename': filename, 'title': title or os.path.splitext(filename)[0], 'description': description}
+
+def _convert_for_sync(docx_path, markdown_path, projection_path, markers):
+    """
+    Convert one DOCX file and build its projections (runs in a worker process).
+    
+    Writes the markdown copy and the file projections, and returns what the
+    caller stores centrally: the markdown, the section offsets into the DOCX
+    text (for sections.json) and the projections for the articles table (built
+    from the markdown, as uploads are, with offsets into their plain text).
+    """
+    paragraphs = list(iter_paragraphs(docx_path))
+    markdown_content = paragraphs_to_markdown(paragraphs)
+    with open(markdown_path, 'w', encoding='utf-8') as f:
+        f.write(markdown_content)
+    
+    plain_text = "\n".join(paragraph.text for paragraph in paragraphs)
+    section_offsets = compute_section_offsets(plain_text, markers)
+    projections = build_projections(markdown_content, plain_text=plain_text, section_offsets=section_offsets)
+    projections['source_stamp'] = _source_stamp(docx_path, markdown_path)
+    _write_json(projection_path, projections)
+    
+    return {
+        'markdown': markdown_content,
+        'section_offsets': section_offsets,
+        'projections': build_projections(markdown_content, markers=markers),
+    }
+
+def sync_docx_library(force=False, workers=None, markers=None, articles_dir=None, commit=None):
+    """
+    Bring the markdown copies, projections, sections.json and metadata.json in
+    step with the DOCX files, converting only files whose content changed.
+    
+    A file is hashed only when its size or modification time differs from the
+    manifest; files whose hash is unchanged are not reconverted. Changed files
+    are converted in a process pool. The manifest is written last, after
+    ``commit`` returns, so files whose results were not stored are converted
+    again on the next sync.
+    
+    Args:
+        force: Reconvert every file
+        workers: Worker processes (defaults to the CPU count; 1 converts in this process)
+        markers: Section markers (defaults to utils.article_sections.SECTION_MARKERS)
+        articles_dir: Directory holding docx/ and markdown/ (defaults to this directory)
+        commit: Optional callable taking the report, to store the results (e.g. in the
+            database); if it raises, the manifest is not updated
+    
+    Returns:
+        Dict with sorted filename lists 'added', 'changed', 'unchanged' and
+        'removed', 'failed' ({filename: error}) and 'converted'
+        ({filename: result of the conversion}) for updating the database
+    """
+    articles_dir = articles_dir or os.path.dirname(os.path.abspath(__file__))
+    docx_dir = os.path.join(articles_dir, 'docx')
+    markdown_dir = os.path.join(articles_dir, 'markdown')
+    projection_dir = os.path.join(articles_dir, 'projections')
+    manifest_path = os.path.join(articles_dir, SYNC_MANIFEST_NAME)
+    os.makedirs(docx_dir, exist_ok=True)
+    os.makedirs(markdown_dir, exist_ok=True)
+    markers = markers or SECTION_MARKERS
+    
+    manifest = _load_json(manifest_path, {})
+    current = {}
+    pending = {}
+    report = {'added': [], 'changed': [], 'unchanged': [], 'removed': [], 'failed': {}, 'converted': {}}
+    
+    for filename in sorted(os.listdir(docx_dir)):
+        if not filename.endswith('.docx'):
+            continue
+        docx_path = os.path.join(docx_dir, filename)
+        markdown_path = os.path.join(markdown_dir, os.path.splitext(filename)[0] + '.md')
+        stat = os.stat(docx_path)
+        entry = manifest.get(filename)
+        converted = not force and entry is not None and os.path.exists(markdown_path)
+        if converted and (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            current[filename] = entry
+            report['unchanged'].append(filename)
+            continue
+        
+        new_entry = {'sha256': file_sha256(docx_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        if converted and entry['sha256'] == new_entry['sha256']:
+            # Touched but not edited
+            current[filename] = new_entry
+            report['unchanged'].append(filename)
+            continue
+        pending[filename] = (new_entry, docx_path, markdown_path, os.path.join(projection_dir, filename + '.json'))
+    
+    def finished(filename, result=None, error=None):
+        if error is not None:
+            report['failed'][filename] = str(error)
+            if filename in manifest:
+                # Retried on the next sync
+                current[filename] = dict(manifest[filename], sha256=None, size=None)
+            return
+        current[filename] = pending[filename][0]
+        report['changed' if filename in manifest else 'added'].append(filename)
+        report['converted'][filename] = result
+    
+    if pending and (workers == 1 or len(pending) == 1):
+        for filename, (_, *paths) in pending.items():
+            try:
+                finished(filename, _convert_for_sync(*paths, markers))
+            except Exception as e:
+                finished(filename, error=e)
+    elif pending:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(pending))) as pool:
+            futures = {pool.submit(_convert_for_sync, *paths, markers): filename
+                       for filename, (_, *paths) in pending.items()}
+            for future in as_completed(futures):
+                try:
+                    finished(futures[future], future.result())
+                except Exception as e:
+                    finished(futures[future], error=e)
+    
+    report['removed'] = sorted(set(manifest) - set(current))
+    for filename in report['removed']:
+        try:
+            os.remove(os.path.join(projection_dir, filename + '.json'))
+        except FileNotFoundError:
+            pass
+    
+    if report['converted'] or report['removed']:
+        # sections.json and metadata.json are written once, here, rather than by the workers
+        section_path = os.path.join(articles_dir, os.path.basename(SECTION_INDEX_PATH))
+        sections = _load_json(section_path, {})
+        for filename, result in report['converted'].items():
+            sections[filename] = result['section_offsets']
+        for filename in report['removed']:
+            sections.pop(filename, None)
+        _write_json(section_path, sections, indent=2, sort_keys=True)
+        
+        metadata_path = os.path.join(articles_dir, 'metadata.json')
+        metadata = _load_json(metadata_path, {'articles': []})
+        listed = {article['filename'] for article in metadata['articles']}
+        metadata['articles'] = [article for article in metadata['articles']
+                                if article['filename'] not in report['removed']]
+        for filename in report['added']:
+            if filename not in listed:
+                metadata['articles'].append(_metadata_entry(filename, report['converted'][filename]['markdown']))
+        _write_json(metadata_path, metadata, indent=4, ensure_ascii=False)
+    
+    for key in ('added', 'changed'):
+        report[key].sort()
+    if commit is not None:
+        commit(report)
+    _write_json(manifest_path, current, indent=2, sort_keys=True)
+    return report
 
 if __name__ == '__main__':
     process_all_docx_files() 
\ No newline at end of file
@@ -2,10 +2,12 @@ import azure.functions as func
 import logging
 import json
 from shared.azure_services import AzureServices
+from shared.usage import UsageRecorder
+from shared.resilience import error_status
 
 azure_services = AzureServices()
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Content editor function processed a request.')
 
     try:
@@ -21,10 +23,12 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 status_code=400
             )
 
-        edited_content = azure_services.edit_content(
+        usage = UsageRecorder()
+        edited_content = await azure_services.aedit_content(
             session_id,
             user_message,
-            current_content
+            current_content,
+            usage=usage
         )
 
         # Log successful invocation for monitoring
@@ -32,15 +36,17 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         logging.info(f"Function invocation parameters - Session ID: {session_id}, User message: {user_message[:50]}...")
 
         return func.HttpResponse(
-            json.dumps({"edited_content": edited_content}),
+            json.dumps({"edited_content": edited_content, "usage": usage.to_dict()}),
             mimetype="application/json",
             status_code=200
         )
 
     except Exception as e:
         logging.error(f"Content editing failed: {str(e)}")
+        status_code, retry_after = error_status(e)
         return func.HttpResponse(
             json.dumps({"error": str(e)}),
             mimetype="application/json",
-            status_code=500
+            status_code=status_code,
+            headers={"Retry-After": str(retry_after)} if retry_after else None
         )
\ No newline at end of file
@@ -2,10 +2,12 @@ import azure.functions as func
 import logging
 import json
 from shared.azure_services import AzureServices
+from shared.usage import UsageRecorder
+from shared.resilience import error_status
 
 azure_services = AzureServices()
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
 
     try:
@@ -23,9 +25,12 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         state = req_body.get('state')
         planning_session_name = req_body.get('planning_session_name', '15-minute discovery call')
         discovery_call_link = req_body.get('discovery_call_link', '')
+        # Indexed hook/summary/disclaimer kept verbatim (None for articles without an index)
+        preserved_sections = req_body.get('preserved_sections')
 
         # Generate content
-        generated_content = azure_services.rewrite_content(
+        usage = UsageRecorder()
+        generated_content = await azure_services.arewrite_content(
             original_text,
             tone,
             tone_description,
@@ -36,7 +41,9 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             city,
             state,
             planning_session_name,
-            discovery_call_link
+            discovery_call_link,
+            usage=usage,
+            preserved_sections=preserved_sections
         )
 
         # Log successful invocation for monitoring
@@ -44,15 +51,17 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         logging.info(f"Function invocation parameters - Tone: {tone}, Firm: {firm_name}, Keywords: {keywords}")
 
         return func.HttpResponse(
-            json.dumps({"content": generated_content}),
+            json.dumps({"content": generated_content, "usage": usage.to_dict()}),
             mimetype="application/json",
             status_code=200
         )
 
     except Exception as e:
         logging.error(f"Error in content generation: {str(e)}")
+        status_code, retry_after = error_status(e)
         return func.HttpResponse(
             json.dumps({"error": str(e)}),
             mimetype="application/json",
-            status_code=500
+            status_code=status_code,
+            headers={"Retry-After": str(retry_after)} if retry_after else None
         )
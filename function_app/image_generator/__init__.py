@@ -2,37 +2,71 @@ import azure.functions as func
 import logging
 import json
 from shared.azure_services import ImageGenerator
+from shared.usage import UsageRecorder
+from shared.resilience import error_status
 import base64
 import os
-import tempfile
+from urllib.parse import quote
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+image_generator = ImageGenerator()
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
-    image_generator = ImageGenerator()
+
     try:
         req_body = req.get_json()
         text_prompt = req_body.get('text_prompt')
+        # "binary" returns the PNG as the body with metadata in headers (no base64/JSON)
+        binary = req_body.get('response_format') == 'binary'
+        usage = UsageRecorder()
+        
+        if req_body.get('safe_prompt'):
+            # Prompt prefetched earlier (possibly on another instance): skip the prompt stage
+            image_generator.cache.put_prompt(text_prompt, req_body['safe_prompt'])
+        
+        if req_body.get('prompt_only'):
+            # Image prefetch in "prompt" mode: only the safe prompt is produced
+            safe_prompt = await image_generator.aget_image_prompt(text_prompt, usage=usage)
+            return func.HttpResponse(
+                json.dumps({"safe_prompt": safe_prompt, "usage": usage.to_dict()}),
+                mimetype="application/json",
+                status_code=200
+            )
         
         # Generate image
-        image_filename = image_generator.generate_image(text_prompt)
+        image_filename = await image_generator.agenerate_image(text_prompt, usage=usage)
         
         if not image_filename:
             raise ValueError("Image generation failed")
 
         # Read the image file
-        generated_dir = os.path.join(tempfile.gettempdir(), 'generated')
-        image_path = os.path.join(generated_dir, image_filename)
+        image_path = os.path.join(image_generator.cache.directory, image_filename)
         with open(image_path, 'rb') as image_file:
-            image_data = base64.b64encode(image_file.read()).decode('utf-8')
+            image_bytes = image_file.read()
+        safe_prompt = image_generator.cache.get_prompt(text_prompt)
 
         # Log successful invocation for monitoring
         logging.info(f"Image generator function completed successfully. Image filename: {image_filename}")
-        logging.info(f"Function invocation parameters - Text prompt length: {len(text_prompt)}")
+        logging.info(f"Function invocation parameters - Text prompt length: {len(text_prompt)}, binary: {binary}")
+
+        if binary:
+            return func.HttpResponse(
+                image_bytes,
+                mimetype="image/png",
+                status_code=200,
+                headers={
+                    "X-Image-Filename": image_filename,
+                    "X-Safe-Prompt": quote(safe_prompt or ''),
+                    "X-Usage": json.dumps(usage.to_dict())
+                }
+            )
 
         return func.HttpResponse(
             json.dumps({
                 "image_filename": image_filename,
-                "image_data": image_data
+                "image_data": base64.b64encode(image_bytes).decode('utf-8'),
+                "safe_prompt": safe_prompt,
+                "usage": usage.to_dict()
             }),
             mimetype="application/json",
             status_code=200
@@ -40,8 +74,10 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
 
     except Exception as e:
         logging.error(f"Error in image generation: {str(e)}")
+        status_code, retry_after = error_status(e)
         return func.HttpResponse(
             json.dumps({"error": str(e)}),
             mimetype="application/json",
-            status_code=500
+            status_code=status_code,
+            headers={"Retry-After": str(retry_after)} if retry_after else None
         )
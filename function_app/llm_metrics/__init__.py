@@ -0,0 +1,23 @@
+import azure.functions as func
+import logging
+import json
+from shared.metrics import stage_metrics, resilience_counters, edit_counters
+from shared.model_routing import get_routing_table
+from shared.resilience import circuit_states
+from shared.conversations import conversation_store
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('LLM metrics function processed a request.')
+
+    return func.HttpResponse(
+        json.dumps({
+            "routing": get_routing_table(),
+            "stages": stage_metrics.snapshot(),
+            "resilience": resilience_counters.snapshot(),
+            "circuits": circuit_states(),
+            "conversations": conversation_store.snapshot(),
+            "edits": edit_counters.snapshot()
+        }),
+        mimetype="application/json",
+        status_code=200
+    )
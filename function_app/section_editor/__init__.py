@@ -0,0 +1,55 @@
+import azure.functions as func
+import logging
+import json
+from shared.azure_services import AzureServices
+from shared.usage import UsageRecorder
+from shared.resilience import error_status
+
+azure_services = AzureServices()
+
+SECTION_KINDS = ('title', 'section', 'cta')
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Section editor function processed a request.')
+
+    try:
+        req_body = req.get_json()
+
+        section_kind = req_body.get('section_kind')
+        section_text = req_body.get('section_text')
+        instructions = req_body.get('instructions', '')
+        context = req_body.get('context') or {}
+
+        if section_kind not in SECTION_KINDS or not section_text:
+            return func.HttpResponse(
+                "Missing required parameters",
+                status_code=400
+            )
+
+        usage = UsageRecorder()
+        section_content = await azure_services.aregenerate_section(
+            section_kind,
+            section_text,
+            instructions,
+            context,
+            usage=usage
+        )
+
+        # Log successful invocation for monitoring
+        logging.info(f"Section editor function completed successfully. Section kind: {section_kind}, length: {len(section_content)}")
+
+        return func.HttpResponse(
+            json.dumps({"section_content": section_content, "usage": usage.to_dict()}),
+            mimetype="application/json",
+            status_code=200
+        )
+
+    except Exception as e:
+        logging.error(f"Section regeneration failed: {str(e)}")
+        status_code, retry_after = error_status(e)
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            mimetype="application/json",
+            status_code=status_code,
+            headers={"Retry-After": str(retry_after)} if retry_after else None
+        )
@@ -1,215 +1,422 @@
-from openai import AzureOpenAI
 import os
-import time
+import logging
 import requests
 import tempfile
 from dotenv import load_dotenv
+from .llm import chat_completion, image_generation, achat_completion, aimage_generation
+from .resilience import CircuitOpenError, is_transient_error
+from .clients import (get_text_client, get_image_client, get_async_text_client,
+                      get_async_image_client, get_async_http_client)
+from .conversations import conversation_store, run_store
+from .edit_patches import PATCH_SYSTEM_PROMPT, PatchError, patch_article
+from .metrics import edit_counters
+from .image_cache import ImageCache, PROMPT_INPUT_CHARS
+from .preserved_sections import (PRESERVED_SECTIONS_PROMPT, preserved_sections as _preserved,
+                                 strip_preserved_sections, insert_preserved_sections)
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Chunk size for streaming generated images to disk
+IMAGE_CHUNK_SIZE = 64 * 1024
+
 class AzureServices:
     def __init__(self):
-        self.text_client = AzureOpenAI(
-            api_key=os.getenv("AZURE_OPENAI_KEY"),
-            api_version="2024-02-15-preview",
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
+        # Shared per-process clients (see shared.clients)
+        self.text_client = get_text_client()
+        self.async_text_client = get_async_text_client()
         
-        self.conversations = {}
-
-    def rewrite_content(self, original_text, tone, tone_description, keywords, firm_name, location, lawyer_name, city, state, planning_session_name="15-minute discovery call", discovery_call_link=""):
-        response = self.text_client.chat.completions.create(
-            model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
-            messages=[
-                {"role": "system", "content": f"""
-                    You are a legal blog post rewriter. There should be At least 30% changes from original. Rewrite the article following these strict guidelines:
-                    SEO REQUIREMENTS:
-                    1. Must include these elements within the first 150 words:
-                       - Primary keywords: {keywords}
-                       - Firm name: {firm_name}
-                       - City-state of firm: {location}
-                       - Lawyer name: {lawyer_name}
-                       - City-state of Lawyer: {city}, {state}
-                    2. Incorporate naturally - don't just list them
-                    
-                    TONE REQUIREMENTS:
-                    1. Primary Tone: {tone}
-                    2. Tone Description: {tone_description}
-                    3. Consistency: Maintain this tone throughout the entire article
-                    
-                    SPECIAL BRANDING REQUIREMENTS:
-                    - Avoid transactional language like "investing in" which are not aligned with the Personal Family Lawyer® brand tone
-                    - Instead use phrases like:
-                        * "work with us to choose a plan that works to keep your loved ones out of court and out of conflict"
-                        * "create a plan that protects what matters most"
-                        * "develop a comprehensive approach to safeguarding your family's future"
-                        * "put a plan in place that ensures your wishes are honored"
-                        * "create a plan that grows with your family and ensures lasting peace of mind"
-                    - Emphasize the ongoing relationship and family protection aspects rather than transactional terms
-                    - Use the term "{planning_session_name}" when referencing to planning sessions.
-
-                    CONTENT GUIDELINES:
-                    DO's:
-                    1. Use active voice
-                    2. Structure with 5 sections: introduction, 3 subheadings, and conclusion with call-to-action
-                    3. Keep length between 1000-1200 words
-                    4. Use transition sentences between sections
-                    5. Conclusion should be brief (1-2 sentences) with clear call-to-action
-                    6. Include 1-2 bulleted lists in the entire article
-                    7. Balance paragraphs and lists appropriately
-                    8. Write in a {tone} tone
-                    9. Include these keywords naturally: {keywords}
-                    10. Mention {firm_name} in {location} where relevant
-                    11. Firm name is {firm_name} and location is {location}
-                    12 Lawyer name is {lawyer_name} and location is {city}, {state}
-                    
-                    DON'Ts:
-                    1. Avoid legal jargon or complex language (keep it high-school level)
-                    2. No passive voice
-                    3. Don't use lists without context
-                    4. Limit metaphors
-                    5. Don't make conclusion too long
-                    6. Don't include more than 5 sources
-                    7. Don't exceed 1200 words
-                    8. Don't use more than 3 lists
-                    
-                    CTA REQUIREMENTS:
-                    1. MUST use the exact phrase "15-minute Discovery Call" (never "consultation" or "consult")
-                    2. Standard format: "Schedule your complimentary 15-minute Discovery Call with {firm_name} today"
-                    3. Include a clear call-to-action like "Click here to schedule" or "Book your Discovery Call now"
-                    4. Never offer to answer questions or provide consultation during this call
-                    5. Use the discovery call link: {discovery_call_link} when creating hyperlinks
-
-                    STYLE GUIDE UPDATES:
-                    1. LANGUAGE PREFERENCE:
-                    - Use "loved ones" instead of "family" in all cases EXCEPT when:
-                        * Referring specifically to legal family members (spouse, children, parents)
-                        * Discussing family law matters specifically related to spouse, children, parents
-                        * The context explicitly requires "family" (e.g., "family business")
-                    - Preferred phrases:
-                        * "protect your loved ones"
-                        * "ensure your loved ones are cared for"
-                        * "keep your loved ones out of court"
-                        * "provide for your loved ones"
-
-                    Formatting Requirements:
-                    # Main Title
-                    ## Subheading 1
-                    ### Sub-subheading (if needed)
-                    **Bold important terms**
-                    - Bullet points when appropriate
-                    [Link text](URL) for references
-                    
-                    The article must be valuable, engaging, and optimized for both readers and search engines.
-                """},
-                {"role": "user", "content": original_text}
-            ],
+        # Bounded per-process edit memory (see shared.conversations)
+        self.conversations = conversation_store
+        # Ask for a JSON list of edits and apply it locally; full regeneration is the fallback
+        self.patch_edits = os.getenv("EDIT_PATCH_MODE", "true").lower() == "true"
+
+    def rewrite_content(self, original_text, tone, tone_description, keywords, firm_name, location, lawyer_name, city, state, planning_session_name="15-minute discovery call", discovery_call_link="", usage=None, preserved_sections=None):
+        sections = _preserved(preserved_sections, original_text)
+        response = chat_completion(
+            self.text_client,
+            'rewrite',
+            usage=usage,
+            messages=self._rewrite_messages(original_text, tone, tone_description, keywords, firm_name, location, lawyer_name, city, state, planning_session_name, discovery_call_link, sections),
             temperature=0.7,
         )
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        # Indexed hook/summary/disclaimer go back in verbatim
+        return insert_preserved_sections(content, sections) if sections else content
+
+    async def arewrite_content(self, original_text, tone, tone_description, keywords, firm_name, location, lawyer_name, city, state, planning_session_name="15-minute discovery call", discovery_call_link="", usage=None, preserved_sections=None):
+        sections = _preserved(preserved_sections, original_text)
+        response = await achat_completion(
+            self.async_text_client,
+            'rewrite',
+            usage=usage,
+            messages=self._rewrite_messages(original_text, tone, tone_description, keywords, firm_name, location, lawyer_name, city, state, planning_session_name, discovery_call_link, sections),
+            temperature=0.7,
+        )
+        content = response.choices[0].message.content
+        # Indexed hook/summary/disclaimer go back in verbatim
+        return insert_preserved_sections(content, sections) if sections else content
+
+    def _rewrite_messages(self, original_text, tone, tone_description, keywords, firm_name, location, lawyer_name, city, state, planning_session_name, discovery_call_link, sections=None):
+        if sections:
+            original_text = strip_preserved_sections(original_text, sections)
+        return [
+            {"role": "system", "content": f"""
+                You are a legal blog post rewriter. There should be At least 30% changes from original. Rewrite the article following these strict guidelines:
+                SEO REQUIREMENTS:
+                1. Must include these elements within the first 150 words:
+                   - Primary keywords: {keywords}
+                   - Firm name: {firm_name}
+                   - City-state of firm: {location}
+                   - Lawyer name: {lawyer_name}
+                   - City-state of Lawyer: {city}, {state}
+                2. Incorporate naturally - don't just list them
+                
+                TONE REQUIREMENTS:
+                1. Primary Tone: {tone}
+                2. Tone Description: {tone_description}
+                3. Consistency: Maintain this tone throughout the entire article
+                
+                SPECIAL BRANDING REQUIREMENTS:
+                - Avoid transactional language like "investing in" which are not aligned with the Personal Family Lawyer® brand tone
+                - Instead use phrases like:
+                    * "work with us to choose a plan that works to keep your loved ones out of court and out of conflict"
+                    * "create a plan that protects what matters most"
+                    * "develop a comprehensive approach to safeguarding your family's future"
+                    * "put a plan in place that ensures your wishes are honored"
+                    * "create a plan that grows with your family and ensures lasting peace of mind"
+                - Emphasize the ongoing relationship and family protection aspects rather than transactional terms
+                - Use the term "{planning_session_name}" when referencing to planning sessions.
+
+                CONTENT GUIDELINES:
+                DO's:
+                1. Use active voice
+                2. Structure with 5 sections: introduction, 3 subheadings, and conclusion with call-to-action
+                3. Keep length between 1000-1200 words
+                4. Use transition sentences between sections
+                5. Conclusion should be brief (1-2 sentences) with clear call-to-action
+                6. Include 1-2 bulleted lists in the entire article
+                7. Balance paragraphs and lists appropriately
+                8. Write in a {tone} tone
+                9. Include these keywords naturally: {keywords}
+                10. Mention {firm_name} in {location} where relevant
+                11. Firm name is {firm_name} and location is {location}
+                12 Lawyer name is {lawyer_name} and location is {city}, {state}
+                
+                DON'Ts:
+                1. Avoid legal jargon or complex language (keep it high-school level)
+                2. No passive voice
+                3. Don't use lists without context
+                4. Limit metaphors
+                5. Don't make conclusion too long
+                6. Don't include more than 5 sources
+                7. Don't exceed 1200 words
+                8. Don't use more than 3 lists
+                
+                CTA REQUIREMENTS:
+                1. MUST use the exact phrase "15-minute Discovery Call" (never "consultation" or "consult")
+                2. Standard format: "Schedule your complimentary 15-minute Discovery Call with {firm_name} today"
+                3. Include a clear call-to-action like "Click here to schedule" or "Book your Discovery Call now"
+                4. Never offer to answer questions or provide consultation during this call
+                5. Use the discovery call link: {discovery_call_link} when creating hyperlinks
+
+                STYLE GUIDE UPDATES:
+                1. LANGUAGE PREFERENCE:
+                - Use "loved ones" instead of "family" in all cases EXCEPT when:
+                    * Referring specifically to legal family members (spouse, children, parents)
+                    * Discussing family law matters specifically related to spouse, children, parents
+                    * The context explicitly requires "family" (e.g., "family business")
+                - Preferred phrases:
+                    * "protect your loved ones"
+                    * "ensure your loved ones are cared for"
+                    * "keep your loved ones out of court"
+                    * "provide for your loved ones"
+
+                Formatting Requirements:
+                # Main Title
+                ## Subheading 1
+                ### Sub-subheading (if needed)
+                **Bold important terms**
+                - Bullet points when appropriate
+                [Link text](URL) for references
+                
+                The article must be valuable, engaging, and optimized for both readers and search engines.
+            """ + (PRESERVED_SECTIONS_PROMPT if sections else "")},
+            {"role": "user", "content": original_text}
+        ]
+
+    def edit_content(self, session_id, user_message, current_content=None, usage=None):
+        article = self._patch_source(session_id, current_content)
+        if article:
+            response = chat_completion(
+                self.text_client,
+                'edit_patch',
+                usage=usage,
+                messages=self.conversations.build_messages(session_id, PATCH_SYSTEM_PROMPT, user_message, article),
+                temperature=0.2
+            )
+            edited = self._apply_patch_reply(session_id, user_message, article, response)
+            if edited is not None:
+                return edited
+
+        response = chat_completion(
+            self.text_client,
+            'edit',
+            usage=usage,
+            messages=self._edit_messages(session_id, user_message, current_content),
+            temperature=0.5
+        )
+        return self._store_reply(session_id, user_message, response)
+
+    async def aedit_content(self, session_id, user_message, current_content=None, usage=None):
+        # Store calls go through run_store so sqlite/blob I/O stays off the event loop
+        store = self.conversations
+        article = await run_store(store, self._patch_source, session_id, current_content)
+        if article:
+            response = await achat_completion(
+                self.async_text_client,
+                'edit_patch',
+                usage=usage,
+                messages=await run_store(store, store.build_messages, session_id, PATCH_SYSTEM_PROMPT, user_message, article),
+                temperature=0.2
+            )
+            edited = await run_store(store, self._apply_patch_reply, session_id, user_message, article, response)
+            if edited is not None:
+                return edited
+
+        response = await achat_completion(
+            self.async_text_client,
+            'edit',
+            usage=usage,
+            messages=await run_store(store, self._edit_messages, session_id, user_message, current_content),
+            temperature=0.5
+        )
+        return await run_store(store, self._store_reply, session_id, user_message, response)
+
+    def _patch_source(self, session_id, current_content):
+        """Article to patch, or None when patch mode is off or there is no article yet."""
+        if not self.patch_edits:
+            return None
+        return current_content or self.conversations.get_article(session_id)
 
-    def edit_content(self, session_id, user_message, current_content=None):
-        if session_id not in self.conversations:
-            self.conversations[session_id] = [
-                {"role": "system", "content": """
+    def _apply_patch_reply(self, session_id, user_message, article, response):
+        """Apply a patch reply; returns None (so the caller regenerates) if it cannot be applied."""
+        try:
+            edited = patch_article(article, response.choices[0].message.content)
+        except PatchError as e:
+            logger.warning(f"Patch edit failed, falling back to full regeneration: {e}")
+            edit_counters.increment('patch_failed')
+            return None
+        edit_counters.increment('patch_applied')
+        self.conversations.record_reply(session_id, user_message, edited)
+        return edited
+
+    def _edit_messages(self, session_id, user_message, current_content=None):
+        return self.conversations.build_messages(session_id, """
                     You are a legal blog post editor. When the user requests changes:
                     1. Make ONLY the requested changes
                     2. Return the COMPLETE updated blog (not just updated part) in markdown format
                     3. Don't include any commentary or explanations
                     4. Preserve all formatting and structure
-                """}
-            ]
-        
-        if current_content:
-            self.conversations[session_id].append(
-                {"role": "assistant", "content": current_content}
-            )
-        
-        self.conversations[session_id].append(
-            {"role": "user", "content": user_message}
+                """, user_message, current_content)
+
+    def regenerate_section(self, section_kind, section_text, instructions, context, usage=None):
+        response = chat_completion(
+            self.text_client,
+            'section',
+            usage=usage,
+            messages=self._section_messages(section_kind, section_text, instructions, context),
+            temperature=0.7
         )
-        
-        response = self.text_client.chat.completions.create(
-            model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
-            messages=self.conversations[session_id],
-            temperature=0.5
+        return response.choices[0].message.content
+
+    async def aregenerate_section(self, section_kind, section_text, instructions, context, usage=None):
+        response = await achat_completion(
+            self.async_text_client,
+            'section',
+            usage=usage,
+            messages=self._section_messages(section_kind, section_text, instructions, context),
+            temperature=0.7
         )
-        
+        return response.choices[0].message.content
+
+    def _section_messages(self, section_kind, section_text, instructions, context):
+        output_rules = {
+            'title': 'Return ONLY the new title as a single line starting with "# ".',
+            'section': 'Return ONLY the rewritten section, starting with its "## " subheading.',
+            'cta': 'Return ONLY the rewritten call-to-action paragraph. Keep the exact phrase "15-minute Discovery Call" and any links.',
+        }
+        return [
+            {"role": "system", "content": f"""
+                You are a legal blog post editor. Rewrite ONE part of an existing blog post.
+                1. Change only this part; it must still fit the surrounding article
+                2. Keep the same tone, markdown formatting and approximate length unless asked otherwise
+                3. Don't repeat content from other sections
+                4. Don't include any commentary or explanations
+                5. {output_rules.get(section_kind, output_rules['section'])}
+
+                ARTICLE OUTLINE:
+                {context.get('outline', '')}
+
+                TEXT BEFORE THIS PART:
+                {context.get('before', '')}
+
+                TEXT AFTER THIS PART:
+                {context.get('after', '')}
+            """},
+            {"role": "user", "content": f"Instructions: {instructions or 'Rewrite this to be clearer and more engaging.'}\n\n{section_text}"}
+        ]
+
+    def _store_reply(self, session_id, user_message, response):
         ai_response = response.choices[0].message.content
-        self.conversations[session_id].append(
-            {"role": "assistant", "content": ai_response}
-        )
+        edit_counters.increment('full_regeneration')
+        self.conversations.record_reply(session_id, user_message, ai_response)
         
         return ai_response
     
 class ImageGenerator:
     def __init__(self):
-        self.image_client = AzureOpenAI(
-            api_key=os.getenv("AZURE_DALLE_KEY"),
-            api_version="2024-02-01",
-            azure_endpoint=os.getenv("AZURE_DALLE_ENDPOINT")
-        )
-        self.text_client = AzureOpenAI(
-            api_key=os.getenv("AZURE_OPENAI_KEY"),
-            api_version="2024-02-15-preview",
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
+        # Shared per-process clients (see shared.clients)
+        self.image_client = get_image_client()
+        self.text_client = get_text_client()
+        self.async_image_client = get_async_image_client()
+        self.async_text_client = get_async_text_client()
+        # Post -> safe prompt -> image cache (see shared.image_cache)
+        self.cache = ImageCache(os.path.join(tempfile.gettempdir(), 'generated'))
   
-    def generate_image(self, text_prompt):
+    def get_image_prompt(self, text_prompt, usage=None):
+        """Safe image prompt for a post, from the cache or the image_prompt stage."""
+        safe_prompt = self.cache.get_prompt(text_prompt)
+        if safe_prompt is None:
+            safe_prompt = self._get_safe_image_prompt(text_prompt, usage=usage)
+            self.cache.put_prompt(text_prompt, safe_prompt)
+        return safe_prompt
+
+    async def aget_image_prompt(self, text_prompt, usage=None):
+        """Async get_image_prompt."""
+        safe_prompt = self.cache.get_prompt(text_prompt)
+        if safe_prompt is None:
+            safe_prompt = await self._aget_safe_image_prompt(text_prompt, usage=usage)
+            self.cache.put_prompt(text_prompt, safe_prompt)
+        return safe_prompt
+
+    def generate_image(self, text_prompt, usage=None):
         try:
-            safe_prompt = self._get_safe_image_prompt(text_prompt)
+            safe_prompt = self.get_image_prompt(text_prompt, usage=usage)
+            
+            cached_image = self.cache.get_image(safe_prompt)
+            if cached_image:
+                return cached_image
             
-            response = self.image_client.images.generate(
-                model=os.getenv("AZURE_DALLE_DEPLOYMENT"),
-                prompt=safe_prompt,
+            response = image_generation(
+                self.image_client,
+                safe_prompt,
+                usage=usage,
                 size="1024x1024",
                 quality="standard",
                 n=1,
             )
             image_url = response.data[0].url
             
-            # Create 'generated' directory if it doesn't exist
-            generated_dir = os.path.join(tempfile.gettempdir(), 'generated')
-            os.makedirs(generated_dir, exist_ok=True)
+            # Stream the download to disk
+            temp_path = self.cache.temp_path()
+            try:
+                with requests.get(image_url, stream=True) as response:
+                    response.raise_for_status()
+                    with open(temp_path, 'wb') as f:
+                        for chunk in response.iter_content(IMAGE_CHUNK_SIZE):
+                            f.write(chunk)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            return self.cache.put_image_file(safe_prompt, temp_path)
             
-            timestamp = int(time.time())
-            image_filename = f"image_{timestamp}.png"
-            image_path = os.path.join(generated_dir, image_filename)
+        except Exception as e:
+            if isinstance(e, CircuitOpenError) or is_transient_error(e):
+                # Let the caller report 429/503 instead of a generic failure
+                raise
+            print(f"Image generation failed: {e}")
+            return None
+
+    async def agenerate_image(self, text_prompt, usage=None):
+        try:
+            safe_prompt = await self.aget_image_prompt(text_prompt, usage=usage)
+            
+            cached_image = self.cache.get_image(safe_prompt)
+            if cached_image:
+                return cached_image
             
-            # Download and save the image
-            response = requests.get(image_url)
-            with open(image_path, 'wb') as f:
-                f.write(response.content)
+            response = await aimage_generation(
+                self.async_image_client,
+                safe_prompt,
+                usage=usage,
+                size="1024x1024",
+                quality="standard",
+                n=1,
+            )
+            image_url = response.data[0].url
             
-            return image_filename
+            # Stream the download to disk over the shared connection pool
+            temp_path = self.cache.temp_path()
+            try:
+                async with get_async_http_client().stream('GET', image_url) as response:
+                    response.raise_for_status()
+                    with open(temp_path, 'wb') as f:
+                        async for chunk in response.aiter_bytes(IMAGE_CHUNK_SIZE):
+                            f.write(chunk)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            return self.cache.put_image_file(safe_prompt, temp_path)
             
         except Exception as e:
+            if isinstance(e, CircuitOpenError) or is_transient_error(e):
+                # Let the caller report 429/503 instead of a generic failure
+                raise
             print(f"Image generation failed: {e}")
             return None
 
-    def _get_safe_image_prompt(self, text_prompt):
-        response = self.text_client.chat.completions.create(
-            model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
-            messages=[
-                {"role": "system", "content": """
-                    You are a creative prompt engineer for legal blog images. Create safe and professional image prompts that:
-                    1. Are directly relevant to the blog content
-                    2. Be 'unique to the blog's content', not generic or reusable for any legal article
-                    3. Reflect the main topic, themes, or message of the blog post
-                    4. Focus on modern, visually appealing representations
-                    5. Must pass Azure content filters
-                    6. Avoids sensitive content
-                    The prompt should be detailed and specific, including:
-                        - Main subject
-                        - Style description
-                        - Color palette
-                        - Composition notes
-                        - Mood/tone
-                    - Is based on this blog content:
-                """},
-                {"role": "user", "content": text_prompt[:1000]}
-            ],
+    def _get_safe_image_prompt(self, text_prompt, usage=None):
+        response = chat_completion(
+            self.text_client,
+            'image_prompt',
+            usage=usage,
+            messages=self._image_prompt_messages(text_prompt),
+            temperature=1
+        )
+        return response.choices[0].message.content
+
+    async def _aget_safe_image_prompt(self, text_prompt, usage=None):
+        response = await achat_completion(
+            self.async_text_client,
+            'image_prompt',
+            usage=usage,
+            messages=self._image_prompt_messages(text_prompt),
             temperature=1
         )
         return response.choices[0].message.content
 
+    def _image_prompt_messages(self, text_prompt):
+        return [
+            {"role": "system", "content": """
+                You are a creative prompt engineer for legal blog images. Create safe and professional image prompts that:
+                1. Are directly relevant to the blog content
+                2. Be 'unique to the blog's content', not generic or reusable for any legal article
+                3. Reflect the main topic, themes, or message of the blog post
+                4. Focus on modern, visually appealing representations
+                5. Must pass Azure content filters
+                6. Avoids sensitive content
+                The prompt should be detailed and specific, including:
+                    - Main subject
+                    - Style description
+                    - Color palette
+                    - Composition notes
+                    - Mood/tone
+                - Is based on this blog content:
+            """},
+            {"role": "user", "content": text_prompt[:PROMPT_INPUT_CHARS]}
+        ]
+
 
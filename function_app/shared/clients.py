@@ -0,0 +1,103 @@
+"""
+Process-wide Azure OpenAI clients.
+
+Clients are created once per process and reused, so concurrent calls share
+pooled keep-alive connections instead of paying a TLS handshake per request.
+The SDK's own retries are disabled; retries are handled by shared.resilience.
+
+Pool and timeout settings are read from the environment:
+    OPENAI_MAX_CONNECTIONS (default 20), OPENAI_MAX_KEEPALIVE (10),
+    OPENAI_KEEPALIVE_EXPIRY (30s), OPENAI_CONNECT_TIMEOUT (10s),
+    OPENAI_READ_TIMEOUT (120s)
+
+Async clients are bound to the event loop they are first used on; the
+Azure Functions worker runs every invocation on one loop, so they are safe
+to share there.
+"""
+import os
+import threading
+from typing import Dict, Tuple
+
+import httpx
+from openai import AzureOpenAI, AsyncAzureOpenAI
+
+TEXT_API_VERSION = "2024-02-15-preview"
+IMAGE_API_VERSION = "2024-02-01"
+
+_clients: Dict[Tuple[str, bool], object] = {}
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")),
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv("OPENAI_READ_TIMEOUT", "120")),
+        connect=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10")),
+    )
+
+
+def _settings(kind: str) -> Dict[str, str]:
+    if kind == 'image':
+        return {
+            'api_key': os.getenv("AZURE_DALLE_KEY"),
+            'api_version': IMAGE_API_VERSION,
+            'azure_endpoint': os.getenv("AZURE_DALLE_ENDPOINT"),
+        }
+    return {
+        'api_key': os.getenv("AZURE_OPENAI_KEY"),
+        'api_version': TEXT_API_VERSION,
+        'azure_endpoint': os.getenv("AZURE_OPENAI_ENDPOINT"),
+    }
+
+
+def _create(kind: str, is_async: bool):
+    if kind == 'download':
+        return httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+    if is_async:
+        return AsyncAzureOpenAI(**_settings(kind), max_retries=0,
+                                http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()))
+    return AzureOpenAI(**_settings(kind), max_retries=0,
+                       http_client=httpx.Client(limits=_limits(), timeout=_timeout()))
+
+
+def _get_client(kind: str, is_async: bool):
+    key = (kind, is_async)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = _create(kind, is_async)
+    return client
+
+
+def get_text_client() -> AzureOpenAI:
+    """Shared synchronous client for the chat deployments."""
+    return _get_client('text', False)
+
+
+def get_image_client() -> AzureOpenAI:
+    """Shared synchronous client for the DALL-E deployment."""
+    return _get_client('image', False)
+
+
+def get_async_text_client() -> AsyncAzureOpenAI:
+    """Shared async client for the chat deployments."""
+    return _get_client('text', True)
+
+
+def get_async_image_client() -> AsyncAzureOpenAI:
+    """Shared async client for the DALL-E deployment."""
+    return _get_client('image', True)
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Shared async HTTP client for downloading generated images."""
+    return _get_client('download', True)
@@ -0,0 +1,434 @@
+"""
+Bounded conversation memory for the edit stage.
+
+Edit conversations used to be a plain dict of full message histories that
+was never pruned, and every turn re-sent each earlier article version. The
+store keeps only what an edit needs per session:
+
+- the latest article version
+- the last N instructions (earlier edits, already applied)
+
+Requests are built as system prompt (with the earlier instructions listed),
+latest article, new instruction; the oldest instructions are dropped first to
+fit the token window.
+
+State is serialized compactly (zlib-compressed JSON) and kept in a pluggable
+backend selected with CONVERSATION_STORE:
+
+- ``memory`` (default): per process, LRU-bounded by CONVERSATION_MAX_SESSIONS
+- ``sqlite``: a local file (CONVERSATION_SQLITE_PATH), for development and tests
+- ``blob``: an Azure Blob Storage container shared by all function instances,
+  so a scaled-out or recycled instance can continue any session
+
+Sessions expire after CONVERSATION_TTL_SECONDS without an edit. The store's
+methods are synchronous; async callers run them with ``run_store`` so the
+sqlite and blob backends do not block the event loop.
+"""
+import os
+import json
+import asyncio
+import time
+import zlib
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+from .token_budget import estimate_messages_tokens, get_budget
+
+logger = logging.getLogger(__name__)
+
+
+class Conversation:
+    """Edit state for one session."""
+
+    __slots__ = ('article', 'instructions', 'last_access')
+
+    def __init__(self, max_instructions: int, article: Optional[str] = None,
+                 instructions: Optional[List[str]] = None, last_access: Optional[float] = None):
+        self.article = article
+        self.instructions = deque(instructions or [], maxlen=max_instructions)
+        self.last_access = last_access or time.time()
+
+    def to_bytes(self) -> bytes:
+        """Compact serialized form."""
+        payload = {'a': self.article, 'i': list(self.instructions), 't': self.last_access}
+        return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, max_instructions: int) -> 'Conversation':
+        """Inverse of to_bytes."""
+        payload = json.loads(zlib.decompress(data).decode('utf-8'))
+        return cls(max_instructions, payload.get('a'), payload.get('i'), payload.get('t'))
+
+
+class ConversationStore(ABC):
+    """
+    Base store: builds edit requests on top of a backend's load/save/delete.
+
+    Subclasses implement ``_load``, ``_save``, ``_delete`` and optionally ``_stats``.
+    """
+
+    backend = 'base'
+    # Backend calls do I/O; async callers run them in a worker thread
+    blocking = True
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_instructions: Optional[int] = None,
+                 max_tokens: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or float(os.getenv("CONVERSATION_TTL_SECONDS", "3600"))
+        self.max_instructions = max_instructions or int(os.getenv("CONVERSATION_MAX_INSTRUCTIONS", "6"))
+        self.max_tokens = max_tokens or int(os.getenv(
+            "CONVERSATION_MAX_TOKENS", str(get_budget('edit').get('max_input_tokens', 8000))))
+        self._counts_lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'evicted_lru': 0, 'evicted_ttl': 0,
+                        'trimmed_instructions': 0, 'errors': 0}
+
+    # Backend interface
+
+    @abstractmethod
+    def _load(self, session_id: str) -> Optional[bytes]:
+        """Serialized conversation, or None if there is none."""
+
+    @abstractmethod
+    def _save(self, session_id: str, data: bytes, last_access: float):
+        """Store a serialized conversation."""
+
+    @abstractmethod
+    def _delete(self, session_id: Optional[str]):
+        """Delete one conversation, or all of them if session_id is None."""
+
+    def _stats(self) -> Dict[str, Any]:
+        return {}
+
+    # Shared logic
+
+    def _count(self, name: str, amount: int = 1):
+        with self._counts_lock:
+            self._counts[name] += amount
+
+    def _get(self, session_id: str) -> Optional[Conversation]:
+        """Load a live conversation; expired or unreadable state is dropped."""
+        try:
+            data = self._load(session_id)
+            if data is None:
+                return None
+            conversation = Conversation.from_bytes(data, self.max_instructions)
+        except Exception as e:
+            logger.warning(f"Could not load conversation {session_id} from {self.backend} store: {str(e)}")
+            self._count('errors')
+            return None
+        if time.time() - conversation.last_access >= self.ttl_seconds:
+            self._count('evicted_ttl')
+            self._delete(session_id)
+            return None
+        return conversation
+
+    def _put(self, session_id: str, conversation: Conversation):
+        conversation.last_access = time.time()
+        try:
+            self._save(session_id, conversation.to_bytes(), conversation.last_access)
+        except Exception as e:
+            # Losing edit memory degrades quality but must not fail the edit
+            logger.warning(f"Could not save conversation {session_id} to {self.backend} store: {str(e)}")
+            self._count('errors')
+
+    def build_messages(self, session_id: str, system_prompt: str, user_message: str,
+                       current_content: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Build the chat request for an edit.
+
+        Args:
+            session_id: Conversation key
+            system_prompt: Edit system prompt
+            user_message: New edit instruction
+            current_content: Current article (replaces the stored version if given)
+
+        Returns:
+            Chat messages: system prompt, latest article, new instruction
+        """
+        conversation = self._get(session_id)
+        self._count('hits' if conversation is not None else 'misses')
+        if conversation is None:
+            conversation = Conversation(self.max_instructions)
+        if current_content and current_content != conversation.article:
+            conversation.article = current_content
+            self._put(session_id, conversation)
+
+        article = conversation.article
+        instructions = list(conversation.instructions)
+        while True:
+            messages = self._compose(system_prompt, instructions, article, user_message)
+            if not instructions or estimate_messages_tokens(messages) <= self.max_tokens:
+                return messages
+            instructions.pop(0)
+            self._count('trimmed_instructions')
+
+    @staticmethod
+    def _compose(system_prompt: str, instructions: List[str], article: Optional[str],
+                 user_message: str) -> List[Dict[str, str]]:
+        if instructions:
+            earlier = '\n'.join(f"- {instruction}" for instruction in instructions)
+            system_prompt = f"{system_prompt}\n\nEarlier edits in this session (already applied):\n{earlier}"
+        messages = [{"role": "system", "content": system_prompt}]
+        if article:
+            messages.append({"role": "assistant", "content": article})
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    def get_article(self, session_id: str) -> Optional[str]:
+        """Latest stored article for a session, if any."""
+        conversation = self._get(session_id)
+        return conversation.article if conversation else None
+
+    def record_reply(self, session_id: str, user_message: str, reply: str):
+        """Store the edited article and remember the instruction that produced it."""
+        conversation = self._get(session_id) or Conversation(self.max_instructions)
+        conversation.article = reply
+        conversation.instructions.append(user_message)
+        self._put(session_id, conversation)
+
+    def clear(self, session_id: Optional[str] = None):
+        """Forget one session, or all sessions if no id is given."""
+        self._delete(session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self._get(session_id) is not None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get memory metrics.
+
+        Returns:
+            Dict with the backend, limits, hit/miss/eviction/trim/error
+            counters and, where the backend can report them cheaply, the
+            number of sessions and stored bytes
+        """
+        with self._counts_lock:
+            counts = dict(self._counts)
+        return {
+            'backend': self.backend,
+            'ttl_seconds': self.ttl_seconds,
+            'max_instructions': self.max_instructions,
+            'max_tokens': self.max_tokens,
+            **counts,
+            **self._stats(),
+        }
+
+
+class MemoryConversationStore(ConversationStore):
+    """Per-process store, bounded by an LRU limit on sessions."""
+
+    backend = 'memory'
+    blocking = False
+
+    def __init__(self, max_sessions: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions or int(os.getenv("CONVERSATION_MAX_SESSIONS", "200"))
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _expire(self, now: float):
+        """Drop sessions idle longer than the TTL (oldest are at the front)."""
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access < self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self._count('evicted_ttl')
+
+    def _load(self, session_id: str) -> Optional[bytes]:
+        with self._lock:
+            self._expire(time.time())
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def _save(self, session_id: str, data: bytes, last_access: float):
+        with self._lock:
+            self._sessions[session_id] = (data, last_access)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._count('evicted_lru')
+
+    def _delete(self, session_id: Optional[str]):
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def _stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.time())
+            return {
+                'sessions': len(self._sessions),
+                'stored_bytes': sum(len(data) for data, _ in self._sessions.values()),
+                'max_sessions': self.max_sessions,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.time())
+            return len(self._sessions)
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Local file store for development and tests; survives process restarts."""
+
+    backend = 'sqlite'
+
+    def __init__(self, path: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path or os.getenv(
+            "CONVERSATION_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "nlbm_conversations.db"))
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS conversations (
+                    session_id TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _load(self, session_id: str) -> Optional[bytes]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT data FROM conversations WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def _save(self, session_id: str, data: bytes, last_access: float):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO conversations (session_id, data, last_access) VALUES (?, ?, ?)",
+                         (session_id, data, last_access))
+            expired = conn.execute("DELETE FROM conversations WHERE last_access < ?",
+                                   (last_access - self.ttl_seconds,)).rowcount
+        if expired:
+            self._count('evicted_ttl', expired)
+
+    def _delete(self, session_id: Optional[str]):
+        with closing(self._connect()) as conn, conn:
+            if session_id is None:
+                conn.execute("DELETE FROM conversations")
+            else:
+                conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+
+    def _stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            sessions, stored_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM conversations WHERE last_access >= ?",
+                (time.time() - self.ttl_seconds,)).fetchone()
+        return {'sessions': sessions, 'stored_bytes': stored_bytes, 'path': self.path}
+
+
+class BlobConversationStore(ConversationStore):
+    """
+    Azure Blob Storage store shared by all function instances.
+
+    Uses CONVERSATION_STORE_CONNECTION_STRING (falling back to the function
+    app's AzureWebJobsStorage) and the CONVERSATION_BLOB_CONTAINER container.
+    Expired blobs are deleted when read; a storage lifecycle rule can remove
+    abandoned sessions.
+    """
+
+    backend = 'blob'
+
+    def __init__(self, connection_string: Optional[str] = None, container: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        from azure.storage.blob import BlobServiceClient
+        from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+        self._not_found = ResourceNotFoundError
+
+        connection_string = connection_string or os.getenv("CONVERSATION_STORE_CONNECTION_STRING") \
+            or os.getenv("AzureWebJobsStorage")
+        self.container_name = container or os.getenv("CONVERSATION_BLOB_CONTAINER", "conversations")
+        self._container = BlobServiceClient.from_connection_string(connection_string) \
+            .get_container_client(self.container_name)
+        try:
+            self._container.create_container()
+        except ResourceExistsError:
+            pass
+
+    @staticmethod
+    def _blob_name(session_id: str) -> str:
+        return hashlib.sha256(session_id.encode('utf-8')).hexdigest()
+
+    def _load(self, session_id: str) -> Optional[bytes]:
+        try:
+            return self._container.download_blob(self._blob_name(session_id)).readall()
+        except self._not_found:
+            return None
+
+    def _save(self, session_id: str, data: bytes, last_access: float):
+        self._container.upload_blob(self._blob_name(session_id), data, overwrite=True)
+
+    def _delete(self, session_id: Optional[str]):
+        if session_id is None:
+            for blob in self._container.list_blobs():
+                self._container.delete_blob(blob.name)
+            return
+        try:
+            self._container.delete_blob(self._blob_name(session_id))
+        except self._not_found:
+            pass
+
+    def _stats(self) -> Dict[str, Any]:
+        return {'container': self.container_name}
+
+
+async def run_store(store: ConversationStore, func, *args):
+    """
+    Call ``func(*args)`` from async code, in a worker thread when ``store`` does I/O.
+
+    Args:
+        store: Conversation store the call touches
+        func: Synchronous function using the store
+        *args: Arguments for func
+
+    Returns:
+        The result of func
+    """
+    if not store.blocking:
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+STORE_BACKENDS = {
+    'memory': MemoryConversationStore,
+    'sqlite': SQLiteConversationStore,
+    'blob': BlobConversationStore,
+}
+
+
+def create_conversation_store(backend: Optional[str] = None) -> ConversationStore:
+    """
+    Create the configured conversation store.
+
+    Args:
+        backend: "memory", "sqlite" or "blob" (defaults to CONVERSATION_STORE)
+
+    Returns:
+        A ConversationStore; falls back to memory if the backend cannot be created
+    """
+    backend = (backend or os.getenv("CONVERSATION_STORE", "memory")).lower()
+    store_class = STORE_BACKENDS.get(backend)
+    if store_class is None:
+        logger.warning(f"Unknown CONVERSATION_STORE '{backend}', using memory")
+        return MemoryConversationStore()
+    try:
+        return store_class()
+    except Exception as e:
+        logger.error(f"Could not create {backend} conversation store, using memory: {str(e)}")
+        return MemoryConversationStore()
+
+
+conversation_store = create_conversation_store()
@@ -0,0 +1,178 @@
+"""
+Patch-based edits.
+
+Instead of returning the whole article for every change, the model returns a
+small JSON list of edits which are applied locally to the current version:
+
+    {"edits": [
+        {"find": "exact text from the article", "replace": "new text"},
+        {"section": "## Existing Heading", "replace": "## Heading\\n\\nNew section"}
+    ]}
+
+``find`` must match exactly one place in the article (whitespace differences
+are tolerated); ``section`` replaces a heading and everything up to the next
+heading of the same or higher level. The last section ends before the
+call-to-action, so the CTA and the disclaimer after it are never replaced by
+a section edit. Any failure raises PatchError so the caller can fall back to
+full regeneration.
+"""
+import re
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A patched article shorter than this share of the original is treated as broken
+MIN_LENGTH_RATIO = 0.5
+
+PATCH_SYSTEM_PROMPT = """
+                    You are a legal blog post editor. The current blog post follows this message; the user will ask for changes to it.
+                    Do NOT return the blog. Return ONLY a JSON object describing the edits:
+                    {"edits": [{"find": "<exact text copied from the blog>", "replace": "<new text>"}]}
+                    1. Make ONLY the requested changes
+                    2. Each "find" must be copied exactly from the current blog and appear only once; keep it short but unique
+                    3. To rewrite a whole section use {"section": "<its exact heading line>", "replace": "<new heading and section>"}; a section ends before the call-to-action, so change the call-to-action or disclaimer with "find"
+                    4. To delete text use an empty "replace"
+                    5. Preserve markdown formatting
+                    6. If the change affects most of the blog, return {"edits": [], "full_rewrite": true}
+                """
+
+_CODE_FENCE_RE = re.compile(r'^```[a-z]*\s*\n(.*?)\n```$', re.DOTALL)
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_PARAGRAPH_RE = re.compile(r'[^\n]+(?:\n[^\n]+)*')
+
+# Phrases that mark the call-to-action paragraph (as in utils.markdown_normalizer)
+CTA_PHRASES = ("Click here to schedule", "Book your Discovery Call", "Schedule your complimentary")
+
+
+class PatchError(ValueError):
+    """The edit reply could not be parsed or applied."""
+
+
+def parse_edits(reply: str) -> List[Dict[str, str]]:
+    """
+    Parse the model's JSON edit list.
+
+    Args:
+        reply: Model output (optionally wrapped in a code fence)
+
+    Returns:
+        List of edit dicts
+
+    Raises:
+        PatchError: If the reply is not a usable edit list
+    """
+    text = (reply or '').strip()
+    fenced = _CODE_FENCE_RE.match(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise PatchError(f"Edit reply is not JSON: {e}")
+
+    if not isinstance(data, dict) or not isinstance(data.get('edits'), list):
+        raise PatchError("Edit reply has no edits list")
+    if data.get('full_rewrite'):
+        raise PatchError("Model requested a full rewrite")
+    if not data['edits']:
+        raise PatchError("Edit reply is empty")
+
+    edits = []
+    for edit in data['edits']:
+        if not isinstance(edit, dict) or not isinstance(edit.get('replace'), str):
+            raise PatchError(f"Invalid edit: {edit!r}")
+        if not (isinstance(edit.get('find'), str) and edit['find']) and \
+                not (isinstance(edit.get('section'), str) and edit['section'].strip()):
+            raise PatchError(f"Edit has neither find nor section: {edit!r}")
+        edits.append(edit)
+    return edits
+
+
+def _find_span(content: str, find: str) -> Tuple[int, int]:
+    """Locate the single occurrence of ``find``, tolerating whitespace differences."""
+    count = content.count(find)
+    if count == 1:
+        start = content.index(find)
+        return start, start + len(find)
+    if count > 1:
+        raise PatchError(f"Anchor is ambiguous ({count} matches): {find[:60]!r}")
+
+    words = find.split()
+    if not words:
+        raise PatchError("Anchor is blank")
+    matches = list(re.finditer(r'\s+'.join(re.escape(word) for word in words), content))
+    if len(matches) != 1:
+        raise PatchError(f"Anchor not found ({len(matches)} matches): {find[:60]!r}")
+    return matches[0].span()
+
+
+def _section_span(content: str, heading: str) -> Tuple[int, int]:
+    """Locate a heading and its body, up to the next heading of the same or higher level or the CTA."""
+    wanted = _HEADING_RE.match(heading.strip())
+    wanted_title = (wanted.group(2) if wanted else heading.strip()).lower()
+
+    start = level = None
+    offset = 0
+    for line in content.split('\n'):
+        match = _HEADING_RE.match(line)
+        if match:
+            if start is None and match.group(2).strip().lower() == wanted_title:
+                start, level = offset, len(match.group(1))
+            elif start is not None and len(match.group(1)) <= level:
+                return start, offset
+        offset += len(line) + 1
+    if start is None:
+        raise PatchError(f"Section not found: {heading[:60]!r}")
+    return start, _trailing_start(content, start)
+
+
+def _trailing_start(content: str, section_start: int) -> int:
+    """Start of the CTA paragraph after the last heading (the CTA and disclaimer are not part of the section)."""
+    body_start = content.find('\n', section_start)
+    for match in _PARAGRAPH_RE.finditer(content, body_start if body_start != -1 else len(content)):
+        paragraph = match.group().lower()
+        if any(phrase.lower() in paragraph for phrase in CTA_PHRASES):
+            return match.start()
+    raise PatchError("Last section has no call-to-action to end before; not replacing the rest of the article")
+
+
+def apply_edits(content: str, edits: List[Dict[str, Any]]) -> str:
+    """
+    Apply edits in order and verify the result.
+
+    Args:
+        content: Current article
+        edits: Edits from parse_edits
+
+    Returns:
+        The patched article
+
+    Raises:
+        PatchError: If an edit cannot be located or the result looks broken
+    """
+    patched = content
+    for edit in edits:
+        if edit.get('section'):
+            start, end = _section_span(patched, edit['section'])
+            replacement = edit['replace'].strip('\n') + '\n\n'
+        else:
+            start, end = _find_span(patched, edit['find'])
+            replacement = edit['replace']
+        patched = patched[:start] + replacement + patched[end:]
+
+    patched = re.sub(r'\n{3,}', '\n\n', patched).strip()
+    if not patched:
+        raise PatchError("Patched article is empty")
+    if len(patched) < len(content) * MIN_LENGTH_RATIO:
+        raise PatchError(f"Patched article lost too much content ({len(content)} -> {len(patched)} characters)")
+    return patched
+
+
+def patch_article(content: str, reply: str) -> str:
+    """Parse an edit reply and apply it to ``content`` (raises PatchError on failure)."""
+    edits = parse_edits(reply)
+    patched = apply_edits(content, edits)
+    logger.info(f"Applied {len(edits)} edit(s) locally ({len(content)} -> {len(patched)} characters)")
+    return patched
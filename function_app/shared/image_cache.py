@@ -0,0 +1,180 @@
+"""
+Two-level, content-addressed cache for generated images.
+
+Generating an image costs a chat call (to turn the post into a safe image
+prompt) and an image call. Both are skipped when the post has not changed:
+
+1. post content hash -> safe image prompt (in memory, LRU-bounded)
+2. safe prompt hash -> image file on disk, named after the hash
+   (``image_<hash>.png``), evicted oldest-first beyond IMAGE_CACHE_MAX_BYTES
+
+Only the first PROMPT_INPUT_CHARS characters of the post are sent to the
+prompt stage, so only those are hashed.
+"""
+import os
+import re
+import uuid
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Characters of the post sent to the image prompt stage
+PROMPT_INPUT_CHARS = 1000
+
+_CACHED_FILE_RE = re.compile(r'^image_[0-9a-f]{24}\.png$')
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ImageCache:
+    """Thread-safe post -> prompt -> image cache backed by a directory."""
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None, max_prompts: Optional[int] = None,
+                 on_evict: Optional[Callable[[str], None]] = None, is_pinned: Optional[Callable[[str], bool]] = None):
+        self.directory = directory
+        # Called with the filename of each evicted image (e.g. to remove derived files)
+        self.on_evict = on_evict
+        # Images still in use elsewhere (e.g. referenced by a post) are never evicted
+        self.is_pinned = is_pinned
+        self.max_bytes = max_bytes or int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+        self.max_prompts = max_prompts or int(os.getenv("IMAGE_PROMPT_CACHE_SIZE", "256"))
+        self._lock = threading.Lock()
+        self._prompts: "OrderedDict[str, str]" = OrderedDict()
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._counts = {'prompt_hits': 0, 'prompt_misses': 0, 'image_hits': 0, 'image_misses': 0, 'evicted': 0}
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Index cached files already on disk, oldest first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if _CACHED_FILE_RE.match(name):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+
+    @staticmethod
+    def content_key(text_prompt: str) -> str:
+        """Key for the part of a post that determines its image prompt."""
+        return _sha256((text_prompt or '')[:PROMPT_INPUT_CHARS])
+
+    @staticmethod
+    def filename_for(safe_prompt: str) -> str:
+        """Content-addressed filename for the image of a safe prompt."""
+        return f"image_{_sha256(safe_prompt)[:24]}.png"
+
+    def get_prompt(self, text_prompt: str) -> Optional[str]:
+        """Cached safe prompt for a post, or None."""
+        key = self.content_key(text_prompt)
+        with self._lock:
+            safe_prompt = self._prompts.get(key)
+            if safe_prompt is None:
+                self._counts['prompt_misses'] += 1
+                return None
+            self._prompts.move_to_end(key)
+            self._counts['prompt_hits'] += 1
+            return safe_prompt
+
+    def put_prompt(self, text_prompt: str, safe_prompt: str):
+        """Remember the safe prompt generated for a post."""
+        with self._lock:
+            self._prompts[self.content_key(text_prompt)] = safe_prompt
+            self._prompts.move_to_end(self.content_key(text_prompt))
+            while len(self._prompts) > self.max_prompts:
+                self._prompts.popitem(last=False)
+
+    def get_image(self, safe_prompt: str) -> Optional[str]:
+        """Filename of the cached image for a safe prompt, or None."""
+        filename = self.filename_for(safe_prompt)
+        path = os.path.join(self.directory, filename)
+        with self._lock:
+            if filename not in self._files or not os.path.exists(path):
+                self._files.pop(filename, None)
+                self._counts['image_misses'] += 1
+                return None
+            self._files.move_to_end(filename)
+            self._counts['image_hits'] += 1
+        try:
+            os.utime(path)  # keep disk order in step for the next _scan
+        except OSError:
+            pass
+        return filename
+
+    def put_image(self, safe_prompt: str, image_bytes: bytes) -> str:
+        """
+        Store an image for a safe prompt and evict the oldest beyond the size limit.
+
+        Returns:
+            The image filename (relative to the cache directory)
+        """
+        temp_path = self.temp_path()
+        with open(temp_path, 'wb') as f:
+            f.write(image_bytes)
+        return self.put_image_file(safe_prompt, temp_path)
+
+    def temp_path(self) -> str:
+        """Path in the cache directory to download an image to before put_image_file."""
+        return os.path.join(self.directory, f".download-{uuid.uuid4().hex}.tmp")
+
+    def put_image_file(self, safe_prompt: str, source_path: str) -> str:
+        """
+        Move an image file (e.g. a streamed download) into the cache.
+
+        Args:
+            safe_prompt: Prompt the image was generated from
+            source_path: File to move, ideally from temp_path() so the move is atomic
+
+        Returns:
+            The image filename (relative to the cache directory)
+        """
+        filename = self.filename_for(safe_prompt)
+        path = os.path.join(self.directory, filename)
+        os.replace(source_path, path)
+        size = os.path.getsize(path)
+
+        evicted = []
+        with self._lock:
+            self._files[filename] = size
+            self._files.move_to_end(filename)
+            total = sum(self._files.values())
+            for old_name in list(self._files):
+                if total <= self.max_bytes:
+                    break
+                if old_name == filename or (self.is_pinned and self.is_pinned(old_name)):
+                    continue
+                total -= self._files.pop(old_name)
+                self._counts['evicted'] += 1
+                evicted.append(old_name)
+
+        for old_name in evicted:
+            try:
+                os.remove(os.path.join(self.directory, old_name))
+            except OSError as e:
+                logger.warning(f"Could not evict cached image {old_name}: {str(e)}")
+            if self.on_evict:
+                self.on_evict(old_name)
+        return filename
+
+    def lookup(self, text_prompt: str) -> Optional[str]:
+        """Cached image filename for a post (both levels hit), or None."""
+        safe_prompt = self.get_prompt(text_prompt)
+        return self.get_image(safe_prompt) if safe_prompt else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cache sizes and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                'prompts': len(self._prompts),
+                'images': len(self._files),
+                'image_bytes': sum(self._files.values()),
+                'max_bytes': self.max_bytes,
+                **self._counts,
+            }
@@ -0,0 +1,145 @@
+"""
+Thin wrappers around the Azure OpenAI SDK calls used by AzureServices and
+ImageGenerator.
+
+All model calls go through these helpers so per-stage concerns (usage
+accounting, token budgets, deployment routing, retries, metrics) live in
+one place instead of being repeated at every call site.
+"""
+import os
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from .usage import UsageRecorder, usage_entry
+from .token_budget import apply_budget
+from .model_routing import deployment_for
+from .metrics import stage_metrics
+from .resilience import call_with_resilience, acall_with_resilience
+
+logger = logging.getLogger(__name__)
+
+
+def chat_completion(client, stage: str, messages: List[Dict[str, str]],
+                    usage: Optional[UsageRecorder] = None, **kwargs) -> Any:
+    """
+    Run a chat completion for a pipeline stage and record its token usage.
+
+    The call is routed to the stage's deployment (see model_routing), messages
+    are trimmed to the stage's input budget and ``max_tokens`` is set from the
+    stage's output budget unless the caller passes one explicitly. Transient
+    failures are retried and guarded by the deployment's circuit breaker.
+
+    Args:
+        client: AzureOpenAI client
+        stage: Pipeline stage name (e.g. "rewrite", "summary", "edit")
+        messages: Chat messages
+        usage: Optional recorder that receives the stage's token counts
+        **kwargs: Extra arguments passed to ``chat.completions.create``
+
+    Returns:
+        The SDK response
+    """
+    deployment, messages = _prepare_chat(stage, messages, kwargs)
+    started = time.time()
+    try:
+        response = call_with_resilience(
+            deployment,
+            lambda: client.chat.completions.create(model=deployment, messages=messages, **kwargs),
+            stage=stage
+        )
+    except Exception:
+        stage_metrics.record(stage, deployment, int((time.time() - started) * 1000), success=False)
+        raise
+    return _record_chat(stage, deployment, response, started, usage)
+
+
+async def achat_completion(client, stage: str, messages: List[Dict[str, str]],
+                           usage: Optional[UsageRecorder] = None, **kwargs) -> Any:
+    """Async version of chat_completion for an AsyncAzureOpenAI client."""
+    deployment, messages = _prepare_chat(stage, messages, kwargs)
+    started = time.time()
+    try:
+        response = await acall_with_resilience(
+            deployment,
+            lambda: client.chat.completions.create(model=deployment, messages=messages, **kwargs),
+            stage=stage
+        )
+    except Exception:
+        stage_metrics.record(stage, deployment, int((time.time() - started) * 1000), success=False)
+        raise
+    return _record_chat(stage, deployment, response, started, usage)
+
+
+def _prepare_chat(stage: str, messages: List[Dict[str, str]], kwargs: Dict[str, Any]):
+    """Resolve the stage's deployment and apply its token budget (sets max_tokens in kwargs)."""
+    deployment = deployment_for(stage)
+    messages, max_output_tokens = apply_budget(stage, messages)
+    if max_output_tokens and 'max_tokens' not in kwargs:
+        kwargs['max_tokens'] = max_output_tokens
+    return deployment, messages
+
+
+def _record_chat(stage: str, deployment: Optional[str], response: Any, started: float,
+                 usage: Optional[UsageRecorder]) -> Any:
+    """Record metrics and usage for a successful chat call."""
+    latency_ms = int((time.time() - started) * 1000)
+    entry = usage_entry(stage, deployment, response, latency_ms=latency_ms)
+    stage_metrics.record(stage, deployment, latency_ms, entry['prompt_tokens'], entry['completion_tokens'])
+    if usage is not None:
+        usage.add(entry)
+    return response
+
+
+def image_generation(client, prompt: str, usage: Optional[UsageRecorder] = None, **kwargs) -> Any:
+    """
+    Generate an image and record the call against the "image" stage.
+
+    Args:
+        client: AzureOpenAI client for the DALL-E deployment
+        prompt: Safe image prompt
+        usage: Optional recorder for the call
+        **kwargs: Extra arguments passed to ``images.generate``
+
+    Returns:
+        The SDK response
+    """
+    deployment = os.getenv("AZURE_DALLE_DEPLOYMENT")
+    started = time.time()
+    try:
+        response = call_with_resilience(
+            deployment,
+            lambda: client.images.generate(model=deployment, prompt=prompt, **kwargs),
+            stage='image'
+        )
+    except Exception:
+        stage_metrics.record('image', deployment, int((time.time() - started) * 1000), success=False)
+        raise
+    return _record_image(deployment, response, started, usage)
+
+
+async def aimage_generation(client, prompt: str, usage: Optional[UsageRecorder] = None, **kwargs) -> Any:
+    """Async version of image_generation for an AsyncAzureOpenAI client."""
+    deployment = os.getenv("AZURE_DALLE_DEPLOYMENT")
+    started = time.time()
+    try:
+        response = await acall_with_resilience(
+            deployment,
+            lambda: client.images.generate(model=deployment, prompt=prompt, **kwargs),
+            stage='image'
+        )
+    except Exception:
+        stage_metrics.record('image', deployment, int((time.time() - started) * 1000), success=False)
+        raise
+    return _record_image(deployment, response, started, usage)
+
+
+def _record_image(deployment: Optional[str], response: Any, started: float,
+                  usage: Optional[UsageRecorder]) -> Any:
+    """Record metrics and usage for a successful image call."""
+    latency_ms = int((time.time() - started) * 1000)
+    stage_metrics.record('image', deployment, latency_ms)
+    if usage is not None:
+        usage.record('image', deployment, response, latency_ms=latency_ms,
+                     images=len(getattr(response, 'data', None) or []))
+    return response
@@ -0,0 +1,110 @@
+"""
+In-process metrics for Azure OpenAI calls.
+
+Aggregates latency and token counts per (stage, deployment) so the stage
+routing table can be tuned from data, plus simple counters (retries, open
+circuits) for the resilience layer and patch/full-regeneration edits. Metrics are per process and reset on
+restart; durable per-request usage is stored by the web app in llm_usage.
+"""
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Number of recent latencies kept per (stage, deployment) for percentiles
+LATENCY_WINDOW = 200
+
+
+def _percentile(values, percentile: float) -> Optional[int]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class StageMetrics:
+    """Thread-safe per-stage latency and token counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, Dict[str, Any]] = {}
+
+    def record(self, stage: str, deployment: Optional[str], latency_ms: int,
+               prompt_tokens: int = 0, completion_tokens: int = 0, success: bool = True):
+        """Record one call for a stage."""
+        key = (stage, deployment)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    'calls': 0,
+                    'errors': 0,
+                    'prompt_tokens': 0,
+                    'completion_tokens': 0,
+                    'latencies': deque(maxlen=LATENCY_WINDOW),
+                }
+            stats['calls'] += 1
+            if not success:
+                stats['errors'] += 1
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+            stats['latencies'].append(latency_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get current metrics.
+
+        Returns:
+            Dict keyed by "stage:deployment" with call counts, token totals and
+            average/p50/p95 latency over the recent window
+        """
+        with self._lock:
+            result = {}
+            for (stage, deployment), stats in self._stats.items():
+                latencies = list(stats['latencies'])
+                result[f"{stage}:{deployment}"] = {
+                    'stage': stage,
+                    'deployment': deployment,
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'prompt_tokens': stats['prompt_tokens'],
+                    'completion_tokens': stats['completion_tokens'],
+                    'avg_latency_ms': int(sum(latencies) / len(latencies)) if latencies else None,
+                    'p50_latency_ms': _percentile(latencies, 50),
+                    'p95_latency_ms': _percentile(latencies, 95),
+                }
+            return result
+
+    def reset(self):
+        """Clear all metrics."""
+        with self._lock:
+            self._stats.clear()
+
+
+class Counters:
+    """Thread-safe named counters, optionally split by a key (e.g. deployment)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def increment(self, name: str, key: Optional[str] = None, amount: int = 1):
+        """Increment counter ``name`` for ``key``."""
+        with self._lock:
+            by_key = self._counts.setdefault(name, {})
+            by_key[str(key)] = by_key.get(str(key), 0) + amount
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Get a copy of all counters."""
+        with self._lock:
+            return {name: dict(by_key) for name, by_key in self._counts.items()}
+
+    def reset(self):
+        """Clear all counters."""
+        with self._lock:
+            self._counts.clear()
+
+
+stage_metrics = StageMetrics()
+resilience_counters = Counters()
+edit_counters = Counters()
@@ -0,0 +1,60 @@
+"""
+Per-stage deployment routing for Azure OpenAI calls.
+
+Short, low-creativity stages (summary, validation, formatting, image prompt)
+can be routed to a smaller, faster deployment than the main rewrite. The
+routing table is read from the environment:
+
+- AZURE_OPENAI_STAGE_DEPLOYMENTS: JSON object mapping stage to deployment,
+  e.g. ``{"summary": "gpt-4o-mini", "image_prompt": "gpt-4o-mini"}``
+- AZURE_OPENAI_DEPLOYMENT_<STAGE>: per-stage override, e.g.
+  AZURE_OPENAI_DEPLOYMENT_SUMMARY
+
+Stages without an entry use AZURE_OPENAI_DEPLOYMENT.
+"""
+import os
+import json
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('rewrite', 'summary', 'validation', 'formatting', 'edit', 'edit_patch', 'section', 'image_prompt')
+
+
+def get_routing_table() -> Dict[str, str]:
+    """
+    Build the stage -> deployment routing table from the environment.
+
+    Returns:
+        Dict mapping every known stage to its deployment name
+    """
+    default = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+    table = {stage: default for stage in STAGES}
+
+    configured = os.getenv("AZURE_OPENAI_STAGE_DEPLOYMENTS")
+    if configured:
+        try:
+            table.update({stage: name for stage, name in json.loads(configured).items() if name})
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.warning(f"Ignoring invalid AZURE_OPENAI_STAGE_DEPLOYMENTS: {e}")
+
+    for stage in STAGES:
+        override = os.getenv(f"AZURE_OPENAI_DEPLOYMENT_{stage.upper()}")
+        if override:
+            table[stage] = override
+
+    return table
+
+
+def deployment_for(stage: str) -> Optional[str]:
+    """
+    Get the deployment a stage should be routed to.
+
+    Args:
+        stage: Pipeline stage name
+
+    Returns:
+        Deployment name (falls back to AZURE_OPENAI_DEPLOYMENT)
+    """
+    return get_routing_table().get(stage) or os.getenv("AZURE_OPENAI_DEPLOYMENT")
@@ -0,0 +1,61 @@
+"""
+Preserved article sections in the rewrite.
+
+The web app indexes each library article's hook, summary and disclaimer and
+sends them with the content_generator request. Those sections are kept
+verbatim: they are removed from the text the model rewrites and put back
+around its output in template order (hook, summary, article, disclaimer), so
+they are never paraphrased or duplicated.
+"""
+import re
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PRESERVED_KEYS = ('hook', 'summary', 'disclaimer')
+# Largest share of the source a single preserved section may take (as in utils.article_sections)
+MAX_SECTION_SHARE = 0.2
+
+PRESERVED_SECTIONS_PROMPT = """
+                PRESERVED SECTIONS:
+                The article's opening hook, its summary and its closing disclaimer are added verbatim
+                after you reply and have been removed from the text you are given. Do not write a hook,
+                a summary or a disclaimer of your own; start with the title and end with the call-to-action.
+"""
+
+
+def preserved_sections(sections, original_text: str = '') -> Optional[Dict[str, str]]:
+    """
+    The preserved sections of a request, or None when there are none or they are unusable.
+
+    Every section must occur verbatim in the source and be a small part of it;
+    otherwise the full text is rewritten (stripping would leave the model
+    almost nothing to work from).
+    """
+    if not isinstance(sections, dict):
+        return None
+    kept = {key: sections[key].strip() for key in PRESERVED_KEYS
+            if isinstance(sections.get(key), str) and sections[key].strip()}
+    if original_text and any(section not in original_text or len(section) > len(original_text) * MAX_SECTION_SHARE
+                             for section in kept.values()):
+        logger.warning("Ignoring preserved sections that are missing from the source or too long")
+        return None
+    return kept or None
+
+
+def strip_preserved_sections(text: str, sections: Dict[str, str]) -> str:
+    """Remove the preserved sections from the source text."""
+    for key in PRESERVED_KEYS:
+        if sections.get(key):
+            text = text.replace(sections[key], '', 1)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+def insert_preserved_sections(content: str, sections: Dict[str, str]) -> str:
+    """Put the hook and summary before the rewritten article and the disclaimer at its end (template order)."""
+    parts = [sections[key] for key in ('hook', 'summary') if sections.get(key)]
+    parts.append(content.strip())
+    if sections.get('disclaimer'):
+        parts.append(sections['disclaimer'])
+    return '\n\n'.join(part for part in parts if part)
@@ -0,0 +1,297 @@
+"""
+Retry, backoff and circuit breaking for Azure OpenAI calls.
+
+Transient failures (429, 5xx, timeouts, connection errors) are retried with
+jittered exponential backoff that honours the service's Retry-After header.
+Each deployment has a circuit breaker: after repeated transient failures it
+opens and calls fail fast with CircuitOpenError until the reset timeout
+passes, so bursts degrade gracefully instead of piling up long failing calls.
+
+Tunable via environment variables:
+    LLM_MAX_ATTEMPTS (default 3), LLM_RETRY_BASE_DELAY (1.0s),
+    LLM_RETRY_MAX_DELAY (20s), CIRCUIT_FAILURE_THRESHOLD (5),
+    CIRCUIT_RESET_TIMEOUT (30s)
+"""
+import os
+import time
+import asyncio
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import openai
+
+from .metrics import resilience_counters
+from .token_budget import TokenBudgetError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a deployment's circuit is open and calls are rejected."""
+
+    def __init__(self, deployment: Optional[str], retry_after: float):
+        super().__init__(f"Circuit open for deployment '{deployment}', retry in {retry_after:.0f}s")
+        self.deployment = deployment
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """Retry settings read from the environment."""
+
+    def __init__(self):
+        self.max_attempts = max(1, int(os.getenv("LLM_MAX_ATTEMPTS", "3")))
+        self.base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+        self.max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before the next attempt.
+
+        Args:
+            attempt: Zero-based index of the attempt that just failed
+            retry_after: Seconds requested by the service, if any
+
+        Returns:
+            Seconds to wait (Retry-After plus a little jitter, otherwise full jitter backoff)
+        """
+        if retry_after is not None:
+            return min(self.max_delay, retry_after + random.uniform(0, self.base_delay / 2))
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one deployment."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None,
+                 reset_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+        self.reset_timeout = reset_timeout or float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed (one probe is allowed when half-open)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.time() >= self.opened_until:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit will allow a probe call."""
+        return max(0.0, self.opened_until - time.time())
+
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for '{self.name}' closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """End a call that says nothing about the deployment's health (state unchanged; a new probe may run)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        """Count a transient failure, opening the circuit when the threshold is reached."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_until = time.time() + max(self.reset_timeout, retry_after or 0)
+                self._probe_in_flight = False
+                resilience_counters.increment('circuit_opened', self.name)
+                logger.warning(f"Circuit for '{self.name}' opened for "
+                               f"{self.opened_until - time.time():.0f}s after {self.failures} failures")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(deployment: Optional[str]) -> CircuitBreaker:
+    """Get (or create) the process-wide circuit breaker for a deployment."""
+    key = str(deployment)
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(key)
+        return _breakers[key]
+
+
+def circuit_states() -> Dict[str, str]:
+    """Current state of every circuit breaker, for metrics endpoints."""
+    with _breakers_lock:
+        return {name: breaker.state for name, breaker in _breakers.items()}
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Return True for errors worth retrying (429, 5xx, timeouts, connection errors)."""
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read the Retry-After hint from an API error.
+
+    Supports ``retry-after-ms`` and ``retry-after`` (seconds or HTTP date).
+
+    Returns:
+        Seconds to wait, or None if the service gave no hint
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def _next_delay(error: Exception, attempt: int, policy: RetryPolicy, breaker: CircuitBreaker,
+                deployment: Optional[str], stage: str) -> float:
+    """
+    Record a failed attempt and decide whether to retry.
+
+    Returns:
+        Seconds to wait before the next attempt
+
+    Raises:
+        The original error if it is not transient or retries are exhausted
+    """
+    if not is_transient_error(error):
+        # The request itself was bad; that neither proves nor disproves the deployment is healthy
+        breaker.release_probe()
+        raise error
+    retry_after = retry_after_seconds(error)
+    breaker.record_failure(retry_after)
+    last_attempt = attempt == policy.max_attempts - 1
+    if last_attempt or (retry_after is not None and retry_after > policy.max_delay):
+        resilience_counters.increment('retries_exhausted', deployment)
+        logger.error(f"[{stage}] {deployment} failed after {attempt + 1} attempt(s): {error}")
+        raise error
+    delay = policy.backoff_delay(attempt, retry_after)
+    resilience_counters.increment('retries', deployment)
+    logger.warning(f"[{stage}] {deployment} transient error ({error.__class__.__name__}), "
+                   f"retrying in {delay:.1f}s (attempt {attempt + 2}/{policy.max_attempts})")
+    return delay
+
+
+def _check_circuit(breaker: CircuitBreaker, deployment: Optional[str]):
+    if not breaker.allow():
+        resilience_counters.increment('circuit_rejections', deployment)
+        raise CircuitOpenError(deployment, breaker.retry_after())
+
+
+def call_with_resilience(deployment: Optional[str], fn: Callable[[], Any], stage: str = '') -> Any:
+    """
+    Call ``fn`` with retries and the deployment's circuit breaker.
+
+    Args:
+        deployment: Deployment name (one circuit per deployment)
+        fn: Zero-argument callable making the API request
+        stage: Pipeline stage, used in log messages
+
+    Returns:
+        Whatever ``fn`` returns
+
+    Raises:
+        CircuitOpenError: If the circuit is open
+        Exception: The last error once retries are exhausted, or any non-transient error
+    """
+    policy = RetryPolicy()
+    breaker = get_circuit_breaker(deployment)
+
+    for attempt in range(policy.max_attempts):
+        _check_circuit(breaker, deployment)
+        try:
+            result = fn()
+        except Exception as e:
+            time.sleep(_next_delay(e, attempt, policy, breaker, deployment, stage))
+            continue
+        except BaseException:
+            # Cancelled (e.g. the client went away) or interrupted: the call proved nothing,
+            # but a half-open probe must not stay in flight or the circuit never closes
+            breaker.release_probe()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def acall_with_resilience(deployment: Optional[str], fn: Callable[[], Awaitable[Any]],
+                                stage: str = '') -> Any:
+    """Async version of call_with_resilience; ``fn`` returns an awaitable."""
+    policy = RetryPolicy()
+    breaker = get_circuit_breaker(deployment)
+
+    for attempt in range(policy.max_attempts):
+        _check_circuit(breaker, deployment)
+        try:
+            result = await fn()
+        except Exception as e:
+            await asyncio.sleep(_next_delay(e, attempt, policy, breaker, deployment, stage))
+            continue
+        except BaseException:
+            # Cancelled (e.g. the client went away) or interrupted: the call proved nothing,
+            # but a half-open probe must not stay in flight or the circuit never closes
+            breaker.release_probe()
+            raise
+        breaker.record_success()
+        return result
+
+
+def error_status(error: Exception) -> Tuple[int, Optional[int]]:
+    """
+    Map an exception to the HTTP status a function should return.
+
+    Returns:
+        Tuple of (status_code, retry_after_seconds) - 429/503 with a
+        Retry-After hint for saturation, 413 for input over the token
+        budget, 500 otherwise
+    """
+    if isinstance(error, TokenBudgetError):
+        return 413, None
+    if isinstance(error, CircuitOpenError):
+        return 503, max(1, int(error.retry_after))
+    if is_transient_error(error):
+        retry_after = retry_after_seconds(error)
+        status = 429 if isinstance(error, openai.RateLimitError) else 503
+        return status, max(1, int(retry_after)) if retry_after is not None else 10
+    return 500, None
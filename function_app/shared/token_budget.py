@@ -0,0 +1,224 @@
+"""
+Pre-flight token estimation and per-stage token budgets.
+
+Inputs are estimated locally with tiktoken (falling back to a
+characters-per-token heuristic when the tokenizer is unavailable), trimmed to
+the stage's input budget, and every call gets an explicit ``max_tokens`` so a
+long upload or edit conversation cannot produce an unbounded response.
+
+Budgets can be overridden with the TOKEN_BUDGETS environment variable, a JSON
+object such as ``{"edit": {"max_input_tokens": 6000}}``.
+"""
+import os
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on environment
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Rough average for English prose when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Marker inserted where content was removed to fit a budget
+TRIM_MARKER = "\n\n[...]\n\n"
+
+
+class TokenBudgetError(ValueError):
+    """A request cannot be fitted into its stage's input budget without cutting the system prompt or a paragraph."""
+
+DEFAULT_STAGE_BUDGETS = {
+    'rewrite': {'max_input_tokens': 6000, 'max_output_tokens': 2500},
+    'summary': {'max_input_tokens': 1000, 'max_output_tokens': 200},
+    'validation': {'max_input_tokens': 8000, 'max_output_tokens': 1000},
+    'formatting': {'max_input_tokens': 6000, 'max_output_tokens': 3000},
+    'edit': {'max_input_tokens': 8000, 'max_output_tokens': 3000},
+    'edit_patch': {'max_input_tokens': 8000, 'max_output_tokens': 1000},
+    'section': {'max_input_tokens': 2000, 'max_output_tokens': 800},
+    'image_prompt': {'max_input_tokens': 500, 'max_output_tokens': 300},
+}
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Load the tokenizer once; returns None if tiktoken cannot be used."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable, using heuristic token estimates: {e}")
+    return _encoding
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Estimate the number of tokens in a string.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Token count (exact with tiktoken, approximate otherwise)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_messages_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimate tokens for a chat request, including per-message overhead."""
+    return sum(estimate_tokens(m.get('content', '')) + 4 for m in messages) + 2
+
+
+def get_budget(stage: str) -> Dict[str, int]:
+    """
+    Get the token budget for a pipeline stage.
+
+    Args:
+        stage: Pipeline stage name
+
+    Returns:
+        Dict with max_input_tokens and max_output_tokens (empty if the stage has no budget)
+    """
+    budget = dict(DEFAULT_STAGE_BUDGETS.get(stage, {}))
+    overrides = os.getenv("TOKEN_BUDGETS")
+    if overrides:
+        try:
+            budget.update(json.loads(overrides).get(stage, {}))
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.warning(f"Ignoring invalid TOKEN_BUDGETS: {e}")
+    return budget
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens tokens."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+
+def trim_text(text: str, max_tokens: int, hard_cut: bool = True) -> Tuple[str, bool]:
+    """
+    Trim text to a token budget, keeping whole paragraphs from the start and end.
+
+    The head of the text is favoured (two thirds of the budget) and the tail
+    keeps any closing instructions; removed content is replaced by TRIM_MARKER.
+
+    Args:
+        text: Text to trim
+        max_tokens: Token budget
+        hard_cut: Cut mid-paragraph when no whole paragraph fits (otherwise raise TokenBudgetError)
+
+    Returns:
+        Tuple of (trimmed_text, was_trimmed)
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text, False
+
+    budget = max(max_tokens - estimate_tokens(TRIM_MARKER), 1)
+    paragraphs = text.split('\n\n')
+    head_budget = budget * 2 // 3
+    tail_budget = budget - head_budget
+
+    head, used = [], 0
+    for para in paragraphs:
+        cost = estimate_tokens(para) + 1
+        if used + cost > head_budget:
+            break
+        head.append(para)
+        used += cost
+
+    tail, used = [], 0
+    for para in reversed(paragraphs[len(head):]):
+        cost = estimate_tokens(para) + 1
+        if used + cost > tail_budget:
+            break
+        tail.insert(0, para)
+        used += cost
+
+    if not head and not tail:
+        # A single paragraph exceeds the budget
+        if not hard_cut:
+            raise TokenBudgetError(f"No whole paragraph fits in {max_tokens} tokens")
+        return _truncate_to_tokens(text, budget), True
+
+    return '\n\n'.join(head) + TRIM_MARKER + '\n\n'.join(tail), True
+
+
+def apply_budget(stage: str, messages: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], Optional[int]]:
+    """
+    Fit a chat request into the stage's input budget.
+
+    Older conversation turns are dropped first (keeping the system prompt and
+    the latest turns), then whole paragraphs are removed from the middle of
+    the largest non-system message (e.g. the source article). System prompts
+    are never trimmed.
+
+    Args:
+        stage: Pipeline stage name
+        messages: Chat messages to send
+
+    Returns:
+        Tuple of (messages, max_output_tokens)
+
+    Raises:
+        TokenBudgetError: If the request cannot fit at paragraph boundaries
+    """
+    budget = get_budget(stage)
+    max_input = budget.get('max_input_tokens')
+    max_output = budget.get('max_output_tokens')
+    if not max_input:
+        return messages, max_output
+
+    original_tokens = estimate_messages_tokens(messages)
+    if original_tokens <= max_input:
+        return messages, max_output
+
+    messages = [dict(m) for m in messages]
+
+    # Drop the oldest non-system turns, always keeping the last two messages
+    while estimate_messages_tokens(messages) > max_input:
+        droppable = [i for i, m in enumerate(messages[:-2]) if m.get('role') != 'system']
+        if not droppable:
+            break
+        del messages[droppable[0]]
+
+    overflow = estimate_messages_tokens(messages) - max_input
+    if overflow > 0:
+        trimmable = [i for i, m in enumerate(messages) if m.get('role') != 'system']
+        if not trimmable:
+            raise TokenBudgetError(f"The system prompt for stage '{stage}' exceeds its {max_input}-token budget")
+        largest = max(trimmable, key=lambda i: estimate_tokens(messages[i].get('content', '')))
+        content = messages[largest].get('content', '')
+        content_tokens = estimate_tokens(content)
+        if content_tokens - overflow < 1:
+            raise TokenBudgetError(f"Request for stage '{stage}' needs {original_tokens} input tokens, "
+                                   f"more than its {max_input}-token budget")
+        try:
+            trimmed, _ = trim_text(content, content_tokens - overflow, hard_cut=False)
+        except TokenBudgetError as e:
+            raise TokenBudgetError(f"Request for stage '{stage}' does not fit its {max_input}-token budget: {e}") from e
+        messages[largest]['content'] = trimmed
+        # The trimmed text is head + TRIM_MARKER + tail, so the marker accounts for one extra paragraph
+        dropped_paragraphs = len(content.split('\n\n')) - (len(trimmed.split('\n\n')) - 1)
+        logger.warning(f"Token budget for stage '{stage}' dropped {dropped_paragraphs} paragraph(s) "
+                       f"({content_tokens - estimate_tokens(trimmed)} of {content_tokens} tokens) "
+                       f"from the middle of the {messages[largest].get('role')} message")
+
+    logger.warning(f"Token budget enforced for stage '{stage}': "
+                   f"{original_tokens} -> {estimate_messages_tokens(messages)} input tokens "
+                   f"(budget {max_input})")
+    return messages, max_output
@@ -0,0 +1,77 @@
+"""
+Token usage accounting for Azure OpenAI calls.
+
+Each chat or image call records one entry per pipeline stage (rewrite,
+summary, validation, formatting, edit, image_prompt, image) so callers can
+attach token counts and the deployment used to the activity event they log.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def usage_entry(stage: str, deployment: Optional[str], response: Any = None,
+                latency_ms: Optional[int] = None, images: int = 0) -> Dict[str, Any]:
+    """
+    Build a usage entry from an OpenAI response.
+
+    Args:
+        stage: Pipeline stage name (e.g. "rewrite", "summary")
+        deployment: Azure deployment the call was routed to
+        response: SDK response object; its ``usage`` attribute is read if present
+        latency_ms: Wall-clock duration of the call
+        images: Number of images produced (image calls report no tokens)
+
+    Returns:
+        Dict with stage, deployment, token counts, images and latency
+    """
+    usage = getattr(response, 'usage', None)
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    total_tokens = getattr(usage, 'total_tokens', 0) or (prompt_tokens + completion_tokens)
+
+    return {
+        'stage': stage,
+        'deployment': deployment,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': total_tokens,
+        'images': images,
+        'latency_ms': latency_ms,
+    }
+
+
+class UsageRecorder:
+    """Collects per-stage token usage for a single request."""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def add(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a usage entry built by usage_entry()."""
+        self.records.append(entry)
+        logger.debug(f"Usage [{entry['stage']}] deployment={entry['deployment']} "
+                     f"prompt={entry['prompt_tokens']} completion={entry['completion_tokens']} "
+                     f"latency_ms={entry['latency_ms']}")
+        return entry
+
+    def record(self, stage: str, deployment: Optional[str], response: Any = None,
+               latency_ms: Optional[int] = None, images: int = 0) -> Dict[str, Any]:
+        """Record the usage reported by an OpenAI response (see usage_entry)."""
+        return self.add(usage_entry(stage, deployment, response, latency_ms, images))
+
+    def totals(self) -> Dict[str, Any]:
+        """Sum token counts across all recorded stages."""
+        deployments = sorted({r['deployment'] for r in self.records if r['deployment']})
+        return {
+            'prompt_tokens': sum(r['prompt_tokens'] for r in self.records),
+            'completion_tokens': sum(r['completion_tokens'] for r in self.records),
+            'total_tokens': sum(r['total_tokens'] for r in self.records),
+            'images': sum(r['images'] for r in self.records),
+            'deployments': deployments,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for inclusion in a function response or activity event."""
+        return {'stages': list(self.records), **self.totals()}
@@ -0,0 +1,123 @@
+"""
+Unit tests for the admin article listing and DOCX download
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import attachment_disposition
+
+DOCX = b'0123456789'
+
+
+@pytest.fixture
+def admin_client(client):
+    """Test client logged in as an admin"""
+    with client.session_transaction() as sess:
+        sess['user'] = {'id': 1, 'username': 'admin', 'is_admin': True}
+    return client
+
+
+@pytest.fixture
+def mock_cursor():
+    """Database whose connections all share one mocked cursor"""
+    mock_db = MagicMock()
+    cursor = MagicMock()
+    mock_db.cursor.return_value = cursor
+    with patch('app.get_db', return_value=mock_db):
+        yield cursor
+
+
+def article_rows(*ids):
+    return [SimpleNamespace(id=article_id, title=f"Article {article_id}") for article_id in ids]
+
+
+class TestAdminArticlesPagination:
+    """Test keyset pagination of /admin/articles"""
+
+    @patch('app.ADMIN_ARTICLES_PAGE_SIZE', 2)
+    @patch('app.render_template', return_value='')
+    def test_first_page(self, mock_render, mock_cursor, admin_client):
+        """Test that the first page reads one extra row and points the next page below the last id shown"""
+        mock_cursor.fetchall.return_value = article_rows(9, 8, 7)
+        mock_cursor.fetchone.return_value = (3,)
+
+        assert admin_client.get('/admin/articles').status_code == 200
+
+        sql, params = mock_cursor.execute.call_args_list[0].args
+        assert 'TOP (3)' in sql
+        assert 'WHERE a.id < ?' not in sql
+        assert params == ()
+        context = mock_render.call_args.kwargs
+        assert [article.id for article in context['articles']] == [9, 8]
+        assert context['next_before'] == 8
+        assert context['first_page'] is True
+        assert context['total_articles'] == 3
+
+    @patch('app.ADMIN_ARTICLES_PAGE_SIZE', 2)
+    @patch('app.render_template', return_value='')
+    def test_before_boundary(self, mock_render, mock_cursor, admin_client):
+        """Test that ?before= starts below that id and the last page has no next page"""
+        mock_cursor.fetchall.return_value = article_rows(7, 6)
+        mock_cursor.fetchone.return_value = (4,)
+
+        assert admin_client.get('/admin/articles?before=8').status_code == 200
+
+        sql, params = mock_cursor.execute.call_args_list[0].args
+        assert 'WHERE a.id < ?' in sql
+        assert params == (8,)
+        context = mock_render.call_args.kwargs
+        assert [article.id for article in context['articles']] == [7, 6]
+        assert context['next_before'] is None
+        assert context['first_page'] is False
+
+
+class TestAdminArticleDocx:
+    """Test the chunked DOCX download"""
+
+    @staticmethod
+    def serve(cursor, filename, data):
+        """Answer the size query and each SUBSTRING (1-based start, length) query from ``data``"""
+        def fetchone():
+            sql, params = cursor.execute.call_args.args
+            if 'SUBSTRING' in sql:
+                start, length, _ = params
+                return (data[start - 1:start - 1 + length],)
+            return (filename, len(data))
+        cursor.fetchone.side_effect = fetchone
+
+    @patch('app.DOCX_DOWNLOAD_CHUNK_SIZE', 4)
+    def test_chunks_reassembled(self, mock_cursor, admin_client):
+        """Test that the chunks add up to the DOCX and Content-Length matches"""
+        self.serve(mock_cursor, 'Plan é.docx', DOCX)
+
+        response = admin_client.get('/admin/articles/5/docx')
+        assert response.status_code == 200
+        assert response.data == DOCX
+        assert response.headers['Content-Length'] == str(len(DOCX))
+        assert response.headers['Content-Disposition'] == \
+            "attachment; filename=\"Plan e.docx\"; filename*=UTF-8''Plan%20%C3%A9.docx"
+
+        chunk_queries = [call.args[1] for call in mock_cursor.execute.call_args_list if 'SUBSTRING' in call.args[0]]
+        assert chunk_queries == [(1, 4, 5), (5, 4, 5), (9, 4, 5)]
+
+    def test_missing_article(self, mock_cursor, admin_client):
+        """Test that an unknown article or one without a DOCX is a 404"""
+        mock_cursor.fetchone.return_value = None
+        assert admin_client.get('/admin/articles/5/docx').status_code == 404
+        mock_cursor.fetchone.return_value = ('empty.docx', None)
+        assert admin_client.get('/admin/articles/5/docx').status_code == 404
+
+
+class TestAttachmentDisposition:
+    """Test the download filename header"""
+
+    def test_ascii_fallback(self):
+        """Test that quotes and non-ASCII characters are dropped from filename="""
+        assert attachment_disposition('Plan "é".docx') == \
+            "attachment; filename=\"Plan e.docx\"; filename*=UTF-8''Plan%20%22%C3%A9%22.docx"
+        assert attachment_disposition('日本.docx').startswith('attachment; filename="article.docx"; ')
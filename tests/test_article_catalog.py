@@ -0,0 +1,93 @@
+"""
+Unit tests for the cached article catalog
+"""
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.article_catalog import ArticleCatalog
+
+
+@pytest.fixture
+def articles_dir(tmp_path):
+    """Articles directory with a DOCX folder and metadata.json"""
+    (tmp_path / 'docx').mkdir()
+    (tmp_path / 'metadata.json').write_text('{"articles": []}')
+    return tmp_path
+
+
+def make_catalog(articles_dir, **kwargs):
+    """Catalog whose loader counts its calls"""
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return sorted(os.listdir(articles_dir / 'docx')), {}
+
+    catalog = ArticleCatalog(loader, str(articles_dir / '.catalog_version'),
+                             [str(articles_dir / 'docx'), str(articles_dir / 'metadata.json')], **kwargs)
+    return catalog, loads
+
+
+def touch_later(path):
+    """Move a path's mtime forward so the change is visible on coarse clocks"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestArticleCatalog:
+    """Test caching and change-driven rebuilds"""
+
+    def test_cached_between_checks(self, articles_dir):
+        """Test that the catalog is built once and served from memory"""
+        catalog, loads = make_catalog(articles_dir, check_seconds=60)
+        assert catalog.get() is catalog.get()
+        assert len(loads) == 1
+        assert catalog.snapshot()['hits'] == 1
+
+    def test_unchanged_stamp_is_not_rebuilt(self, articles_dir):
+        """Test that a check without changes keeps the catalog"""
+        catalog, loads = make_catalog(articles_dir, check_seconds=0)
+        catalog.get()
+        catalog.get()
+        assert len(loads) == 1
+        assert catalog.snapshot()['checks'] == 2
+
+    def test_new_docx_rebuilds(self, articles_dir):
+        """Test that adding a DOCX file is picked up at the next check"""
+        catalog, loads = make_catalog(articles_dir, check_seconds=0)
+        assert catalog.get()[0] == []
+        (articles_dir / 'docx' / 'new.docx').write_bytes(b'docx')
+        touch_later(articles_dir / 'docx')
+        assert catalog.get()[0] == ['new.docx']
+        assert len(loads) == 2
+
+    def test_metadata_edit_rebuilds(self, articles_dir):
+        """Test that editing metadata.json is picked up"""
+        catalog, loads = make_catalog(articles_dir, check_seconds=0)
+        catalog.get()
+        touch_later(articles_dir / 'metadata.json')
+        catalog.get()
+        assert len(loads) == 2
+
+    def test_bump_version(self, articles_dir):
+        """Test that bumping the version rebuilds here and in other processes"""
+        catalog, loads = make_catalog(articles_dir, check_seconds=60)
+        other, other_loads = make_catalog(articles_dir, check_seconds=0)
+        catalog.get()
+        other.get()
+        catalog.bump_version()
+        touch_later(articles_dir / '.catalog_version')
+        catalog.get()
+        other.get()
+        assert len(loads) == 2
+        assert len(other_loads) == 2
+
+    def test_max_age(self, articles_dir):
+        """Test that the catalog is rebuilt after the maximum age"""
+        catalog, loads = make_catalog(articles_dir, check_seconds=0, max_age_seconds=0)
+        catalog.get()
+        catalog.get()
+        assert len(loads) == 2
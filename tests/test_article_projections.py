@@ -0,0 +1,162 @@
+"""
+Unit tests for materialized article projections
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from docx import Document
+
+from utils.article_projections import (ProjectionCache, build_projections, is_current, sanitize_html,
+                                       PROJECTION_VERSION)
+from utils.article_sections import markdown_to_source_text
+
+ARTICLE = "# Title\n\nHook paragraph.\n\nSummary paragraph, read more...\n\nBody with **bold** text.\n\nDisclaimer."
+
+
+class TestBuildProjections:
+    """Test that every projection is built from the stored markdown"""
+
+    def test_projections(self):
+        """Test plain text, HTML, stats and offsets"""
+        projections = build_projections(ARTICLE)
+        assert projections['version'] == PROJECTION_VERSION
+        assert projections['markdown'] == ARTICLE
+        assert projections['plain_text'] == markdown_to_source_text(ARTICLE)
+        assert '<strong>bold</strong>' in projections['html']
+        assert projections['word_count'] == len(projections['plain_text'].split())
+        assert len(projections['content_hash']) == 64
+        assert projections['section_offsets']['text_length'] == len(projections['plain_text'])
+        assert is_current(projections)
+
+    def test_docx_plain_text_and_offsets_are_kept(self):
+        """Test that DOCX text and indexed offsets are used as given"""
+        projections = build_projections(None, plain_text="Docx text", section_offsets={'version': 'x'})
+        assert projections['plain_text'] == "Docx text"
+        assert projections['markdown'] is None
+        assert projections['html'] == "<p>Docx text</p>"
+        assert projections['section_offsets'] == {'version': 'x'}
+
+    def test_content_hash_changes_with_content(self):
+        """Test that the hash identifies the content"""
+        assert build_projections(ARTICLE)['content_hash'] == build_projections(ARTICLE)['content_hash']
+        assert build_projections(ARTICLE)['content_hash'] != build_projections(ARTICLE + " More.")['content_hash']
+
+    def test_sanitize_html(self):
+        """Test that scripts, event handlers and javascript: links are removed"""
+        html = sanitize_html('<p onclick="steal()">Hi <a href="javascript:alert(1)">x</a>'
+                             '<a href="https://example.com">ok</a></p><script>alert(1)</script>')
+        assert 'script' not in html
+        assert 'onclick' not in html
+        assert 'javascript' not in html
+        assert 'href="https://example.com"' in html
+
+
+class TestProjectionCache:
+    """Test the per-process projection cache"""
+
+    def test_loaded_once(self):
+        """Test that the loader runs once per article until cleared"""
+        loads = []
+        cache = ProjectionCache(lambda name: loads.append(name) or {'name': name}, max_entries=2)
+        assert cache.get('a.docx') is cache.get('a.docx')
+        assert loads == ['a.docx']
+        cache.clear()
+        cache.get('a.docx')
+        assert loads == ['a.docx', 'a.docx']
+
+    def test_lru_bound(self):
+        """Test that the least recently used article is dropped"""
+        loads = []
+        cache = ProjectionCache(lambda name: loads.append(name) or {}, max_entries=2)
+        cache.get('a')
+        cache.get('b')
+        cache.get('a')
+        cache.get('c')
+        cache.get('a')
+        cache.get('b')
+        assert loads == ['a', 'b', 'c', 'b']
+
+    def test_load_during_clear_not_cached(self):
+        """Test that a load overlapping a clear() is returned but not cached"""
+        loads = []
+
+        def loader(name):
+            loads.append(name)
+            if len(loads) == 1:
+                cache.clear()
+            return {}
+
+        cache = ProjectionCache(loader, max_entries=2)
+        cache.get('a')
+        assert cache.snapshot()['articles'] == 0
+        cache.get('a')
+        cache.get('a')
+        assert loads == ['a', 'a']
+
+    def test_missing_article(self):
+        """Test that loader errors are not cached"""
+        def loader(name):
+            raise FileNotFoundError(name)
+        with pytest.raises(FileNotFoundError):
+            ProjectionCache(loader).get('missing.docx')
+
+    def test_warm(self):
+        """Test that warming loads uncached articles up to the cache size and skips failures"""
+        loads = []
+
+        def loader(name):
+            loads.append(name)
+            if name == 'missing':
+                raise FileNotFoundError(name)
+            return {}
+
+        cache = ProjectionCache(loader, max_entries=3)
+        cache.get('a')
+        assert cache.warm(['a', 'missing', 'b', 'c']) == 1
+        assert loads == ['a', 'missing', 'b']
+        cache.get('b')
+        assert loads == ['a', 'missing', 'b']
+
+
+class TestDocxProjections:
+    """Test projections stored for DOCX files"""
+
+    @pytest.fixture
+    def converter(self, tmp_path, monkeypatch):
+        from content.articles import docx_to_markdown
+        (tmp_path / 'docx').mkdir()
+        (tmp_path / 'markdown').mkdir()
+        monkeypatch.setattr(docx_to_markdown, 'PROJECTION_DIR', str(tmp_path / 'projections'))
+        monkeypatch.setattr(docx_to_markdown, '_source_paths', lambda filename: (
+            str(tmp_path / 'docx' / filename), str(tmp_path / 'markdown' / (filename[:-5] + '.md'))))
+        monkeypatch.setattr(docx_to_markdown, 'load_section_index', lambda: {})
+        document = Document()
+        document.add_paragraph("First paragraph.")
+        document.add_paragraph("Second paragraph.")
+        document.save(str(tmp_path / 'docx' / 'post.docx'))
+        return docx_to_markdown
+
+    def test_built_once_and_reused(self, converter, tmp_path, monkeypatch):
+        """Test that projections are stored and read back without parsing the DOCX"""
+        first = converter.load_docx_projections('post.docx')
+        assert first['plain_text'] == "First paragraph.\nSecond paragraph."
+        assert os.path.exists(tmp_path / 'projections' / 'post.docx.json')
+
+        monkeypatch.setattr(converter, 'docx_source_text', lambda path: pytest.fail("DOCX parsed again"))
+        assert converter.load_docx_projections('post.docx')['content_hash'] == first['content_hash']
+
+    def test_rebuilt_when_source_changes(self, converter, tmp_path):
+        """Test that a new markdown copy makes the stored projections stale"""
+        converter.load_docx_projections('post.docx')
+        (tmp_path / 'markdown' / 'post.md').write_text("# Post\n\nFirst paragraph.")
+        assert converter.load_docx_projections('post.docx')['markdown'] == "# Post\n\nFirst paragraph."
+
+    def test_invalid_names(self, converter):
+        """Test that paths and missing files are rejected"""
+        with pytest.raises(ValueError):
+            converter.load_docx_projections('../app.py')
+        with pytest.raises(FileNotFoundError):
+            converter.load_docx_projections('missing.docx')
@@ -0,0 +1,123 @@
+"""
+Unit tests for preserved section indexing
+"""
+import pytest
+import json
+import io
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from docx import Document
+
+from utils.article_sections import (
+    SECTION_MARKERS, compute_section_offsets, extract_sections, markdown_to_source_text,
+    markers_version, paragraph_spans, sections_from_offsets, usable_sections
+)
+from utils.docx_text import docx_text
+
+ARTICLE = "Hook paragraph.\n\nSummary line. Read more...\n\nBody one.\n\nBody two.\n\nDisclaimer text."
+
+
+class TestSectionOffsets:
+    """Test computing and slicing section offsets"""
+
+    def test_paragraph_spans_match_split(self):
+        """Test that spans cover the same paragraphs as split('\\n\\n')"""
+        spans = paragraph_spans(ARTICLE)
+        assert [ARTICLE[s:e] for s, e in spans] == ARTICLE.split('\n\n')
+
+    def test_extract_default_sections(self):
+        """Test that hook, summary and disclaimer are the 1st, 2nd and last paragraphs"""
+        sections = extract_sections(ARTICLE)
+        assert sections == {
+            'hook': 'Hook paragraph.',
+            'summary': 'Summary line. Read more...',
+            'disclaimer': 'Disclaimer text.',
+        }
+
+    def test_short_article_missing_summary(self):
+        """Test that a one-paragraph article has no summary"""
+        sections = extract_sections("Only paragraph")
+        assert sections['hook'] == "Only paragraph"
+        assert sections['summary'] == ""
+        assert sections['disclaimer'] == "Only paragraph"
+
+    def test_multi_paragraph_marker(self):
+        """Test that a marker spanning paragraphs keeps the separators"""
+        markers = {'hook': {'start': 0, 'end': 2}}
+        assert extract_sections(ARTICLE, markers)['hook'] == "Hook paragraph.\n\nSummary line. Read more..."
+
+    def test_round_trip_through_json(self):
+        """Test that stored offsets slice the same sections"""
+        stored = json.dumps(compute_section_offsets(ARTICLE))
+        assert sections_from_offsets(ARTICLE, stored) == extract_sections(ARTICLE)
+
+
+class TestStaleOffsets:
+    """Test that stale or invalid offsets are ignored"""
+
+    def test_markers_changed(self):
+        """Test that offsets computed with other markers are rejected"""
+        markers = {'hook': {'start': 0, 'end': 2}}
+        offsets = compute_section_offsets(ARTICLE, markers)
+        assert markers_version(markers) != markers_version(SECTION_MARKERS)
+        assert sections_from_offsets(ARTICLE, offsets) is None
+
+    def test_text_changed(self):
+        """Test that offsets for a different text are rejected"""
+        offsets = compute_section_offsets(ARTICLE)
+        assert sections_from_offsets(ARTICLE + " edited", offsets) is None
+
+    def test_missing_or_invalid(self):
+        """Test that missing and malformed offsets return None"""
+        assert sections_from_offsets(ARTICLE, None) is None
+        assert sections_from_offsets(ARTICLE, "not json") is None
+
+
+class TestSourceText:
+    """Test markdown to source text conversion"""
+
+    def test_strips_markdown(self):
+        """Test that headers, bold and italic markers are removed"""
+        assert markdown_to_source_text("# Title\n\n**Bold** and *italic*\n") == "Title\n\nBold and italic"
+
+
+class TestUsableSections:
+    """Test that only short-paragraph sections are preserved"""
+
+    def test_short_paragraphs_kept(self):
+        """Test that sections of a paragraph-separated article are kept"""
+        article = ARTICLE.replace("Body one.", "Body one. " * 30)
+        sections = extract_sections(article)
+        assert usable_sections(article, sections) == sections
+
+    def test_single_newline_docx_text(self):
+        """Test that DOCX text joined with single newlines does not yield a whole-body section"""
+        document = Document()
+        for n in range(20):
+            document.add_paragraph(f"Paragraph {n} of the article body with some words in it.")
+        buffer = io.BytesIO()
+        document.save(buffer)
+        text = docx_text(io.BytesIO(buffer.getvalue()))
+        assert '\n\n' not in text
+
+        sections = extract_sections(text)
+        assert sections['hook'] == text
+        assert usable_sections(text, sections) is None
+
+    def test_library_article(self):
+        """Test a library article whose "summary" spans most of the body"""
+        path = os.path.join(os.path.dirname(__file__), '..', 'content', 'articles', 'docx',
+                            "A Texas Mail Carrier's Act of Love Shows Why Your Pets Need a Plan Too.docx")
+        if not os.path.exists(path):
+            pytest.skip("Library article not present")
+        text = docx_text(path)
+        sections = extract_sections(text)
+        assert len(sections['summary']) > len(text) / 2
+        assert usable_sections(text, sections) is None
+
+    def test_missing(self):
+        """Test that no sections stay None"""
+        assert usable_sections(ARTICLE, None) is None
@@ -0,0 +1,127 @@
+"""
+Unit tests for the incremental DOCX library sync
+"""
+import pytest
+import json
+import sys
+import os
+
+from docx import Document
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from content.articles import docx_to_markdown
+from content.articles.docx_to_markdown import sync_docx_library
+
+
+def write_docx(path, *paragraphs, heading=None):
+    """Save a DOCX file with an optional heading and paragraphs"""
+    document = Document()
+    if heading:
+        document.add_heading(heading, level=1)
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(str(path))
+
+
+@pytest.fixture
+def library(tmp_path):
+    (tmp_path / 'docx').mkdir()
+    write_docx(tmp_path / 'docx' / 'wills.docx', "A will names guardians.", heading="Writing a Will")
+    write_docx(tmp_path / 'docx' / 'trusts.docx', "A trust avoids probate.")
+    return tmp_path
+
+
+class TestSyncDocxLibrary:
+    """Test conversion, change detection and the files written by a sync"""
+
+    def test_first_sync_converts_everything(self, library):
+        """Test that a first sync converts every file and writes markdown, projections and metadata"""
+        report = sync_docx_library(workers=1, articles_dir=str(library))
+        assert report['added'] == ['trusts.docx', 'wills.docx']
+        assert report['failed'] == {}
+
+        assert (library / 'markdown' / 'wills.md').read_text(encoding='utf-8') == \
+            "# Writing a Will\nA will names guardians."
+        assert (library / 'projections' / 'wills.docx.json').exists()
+        converted = report['converted']['wills.docx']
+        assert converted['projections']['plain_text'] == "Writing a Will\nA will names guardians."
+
+        metadata = json.loads((library / 'metadata.json').read_text(encoding='utf-8'))
+        titles = {article['filename']: article['title'] for article in metadata['articles']}
+        assert titles == {'wills.docx': 'Writing a Will', 'trusts.docx': 'trusts'}
+        sections = json.loads((library / 'sections.json').read_text(encoding='utf-8'))
+        assert set(sections) == {'trusts.docx', 'wills.docx'}
+
+    def test_unchanged_files_are_skipped(self, library, monkeypatch):
+        """Test that files with the same content are not reconverted, even when touched"""
+        sync_docx_library(workers=1, articles_dir=str(library))
+        os.utime(library / 'docx' / 'wills.docx', ns=(0, 0))
+        monkeypatch.setattr(docx_to_markdown, '_convert_for_sync', lambda *args: pytest.fail("reconverted"))
+
+        report = sync_docx_library(workers=1, articles_dir=str(library))
+        assert report['unchanged'] == ['trusts.docx', 'wills.docx']
+        assert report['converted'] == {}
+
+    def test_changed_and_removed_files(self, library):
+        """Test that edited files are reconverted and deleted files are reported and unlisted"""
+        sync_docx_library(workers=1, articles_dir=str(library))
+        write_docx(library / 'docx' / 'wills.docx', "Updated text.", heading="Writing a Will")
+        os.remove(library / 'docx' / 'trusts.docx')
+
+        report = sync_docx_library(workers=1, articles_dir=str(library))
+        assert report['changed'] == ['wills.docx']
+        assert report['removed'] == ['trusts.docx']
+        assert "Updated text." in (library / 'markdown' / 'wills.md').read_text(encoding='utf-8')
+        assert not (library / 'projections' / 'trusts.docx.json').exists()
+
+        metadata = json.loads((library / 'metadata.json').read_text(encoding='utf-8'))
+        assert [article['filename'] for article in metadata['articles']] == ['wills.docx']
+
+    def test_existing_metadata_is_kept(self, library):
+        """Test that curated titles in metadata.json are not overwritten"""
+        curated = {'articles': [{'filename': 'trusts.docx', 'title': 'Trusts 101', 'description': 'Curated'}]}
+        (library / 'metadata.json').write_text(json.dumps(curated), encoding='utf-8')
+        sync_docx_library(workers=1, articles_dir=str(library))
+
+        metadata = json.loads((library / 'metadata.json').read_text(encoding='utf-8'))
+        assert metadata['articles'][0] == curated['articles'][0]
+        assert len(metadata['articles']) == 2
+
+    def test_failed_file_is_retried(self, library):
+        """Test that a file that fails to convert is reported and converted on the next sync"""
+        (library / 'docx' / 'broken.docx').write_bytes(b'not a docx')
+        report = sync_docx_library(workers=1, articles_dir=str(library))
+        assert list(report['failed']) == ['broken.docx']
+        assert 'broken.docx' not in report['added']
+
+        write_docx(library / 'docx' / 'broken.docx', "Fixed.")
+        assert sync_docx_library(workers=1, articles_dir=str(library))['added'] == ['broken.docx']
+
+    def test_process_pool(self, library):
+        """Test that several changed files are converted in worker processes"""
+        report = sync_docx_library(force=True, workers=2, articles_dir=str(library))
+        assert report['added'] == ['trusts.docx', 'wills.docx']
+        assert report['converted']['trusts.docx']['markdown'] == "A trust avoids probate."
+
+    def test_manifest_written_after_commit(self, library):
+        """Test that the commit callback gets the report and a failed commit leaves files to reconvert"""
+        def failing_commit(report):
+            assert report['added'] == ['trusts.docx', 'wills.docx']
+            assert not (library / 'sync_manifest.json').exists()
+            raise RuntimeError("database unavailable")
+
+        with pytest.raises(RuntimeError):
+            sync_docx_library(workers=1, articles_dir=str(library), commit=failing_commit)
+
+        committed = []
+        report = sync_docx_library(workers=1, articles_dir=str(library), commit=committed.append)
+        assert report['added'] == ['trusts.docx', 'wills.docx']
+        assert committed == [report]
+        assert sync_docx_library(workers=1, articles_dir=str(library))['unchanged'] == ['trusts.docx', 'wills.docx']
+
+    def test_database_offsets_match_projection_text(self, library):
+        """Test that the projections carry offsets into their own (markdown-derived) plain text"""
+        converted = sync_docx_library(workers=1, articles_dir=str(library))['converted']['wills.docx']
+        projections = converted['projections']
+        assert projections['section_offsets']['text_length'] == len(projections['plain_text'])
@@ -0,0 +1,114 @@
+"""
+Unit tests for the generated asset store
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.asset_store import AssetStore, LocalAssetBackend, asset_name, valid_asset_name
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    """Factory for a local text store with an index in tmp_path"""
+    def make(**kwargs):
+        kwargs.setdefault('grace_seconds', 0)
+        kwargs.setdefault('gc_interval_seconds', 3600)
+        return AssetStore('text', LocalAssetBackend(str(tmp_path / 'assets')), str(tmp_path / 'index.db'), **kwargs)
+    return make
+
+
+class TestAssetStore:
+    """Test content addressing, references, quotas and garbage collection"""
+
+    def test_content_addressed_names(self, make_store, tmp_path):
+        """Test that the same content is stored once under a hash name"""
+        store = make_store()
+        first = store.put(1, b"post", 'blog', 'txt')
+        second = store.put(2, b"post", 'blog', 'txt')
+        assert first == second == asset_name(b"post", 'blog', 'txt')
+        assert first.startswith('blog_') and first.endswith('.txt')
+        assert store.read_text(first) == "post"
+        assert os.listdir(tmp_path / 'assets') == [first]
+        assert store.snapshot()['deduplicated'] == 1
+
+    def test_read_rejects_paths(self, make_store):
+        """Test that names with directories or '..' are rejected"""
+        store = make_store()
+        for name in ('../app.py', 'a/b.txt', '..', ''):
+            assert not valid_asset_name(name)
+            with pytest.raises(ValueError):
+                store.read(name)
+        with pytest.raises(FileNotFoundError):
+            store.read('blog_missing.txt')
+
+    def test_garbage_collection_needs_all_refs_released(self, make_store, tmp_path):
+        """Test that an asset is collected only after every user released it"""
+        deleted = []
+        store = make_store(on_delete=deleted.append)
+        name = store.put(1, b"shared", 'blog', 'txt')
+        store.put(2, b"shared", 'blog', 'txt')
+        store.release(1, name)
+        assert store.collect_garbage() == []
+        store.release(2, name)
+        assert store.collect_garbage() == [name]
+        assert deleted == [name]
+        assert not (tmp_path / 'assets' / name).exists()
+
+    def test_grace_period(self, make_store):
+        """Test that new unreferenced assets are kept during the grace period"""
+        store = make_store(grace_seconds=3600)
+        name = store.put(1, b"post", 'blog', 'txt')
+        store.release(1, name)
+        assert store.collect_garbage() == []
+
+    def test_user_quota_releases_oldest(self, make_store):
+        """Test that references beyond the user quota are released oldest first"""
+        store = make_store(user_quota_bytes=10)
+        first = store.put(1, b"12345", 'blog', 'txt')
+        second = store.put(1, b"67890", 'blog', 'txt')
+        third = store.put(1, b"abcde", 'blog', 'txt')
+        assert not store.referenced(first)
+        assert store.referenced(second) and store.referenced(third)
+        assert store.usage(1) == 10
+        assert store.collect_garbage() == [first]
+
+    def test_user_quota_with_shared_assets(self, make_store):
+        """Test that releasing a reference shared with another user lowers this user's usage"""
+        store = make_store(user_quota_bytes=250)
+        first = store.put('bob', b"a" * 100, 'blog', 'txt')
+        second = store.put('bob', b"b" * 100, 'blog', 'txt')
+        store.put('alice', b"a" * 100, 'blog', 'txt')
+        store.put('alice', b"b" * 100, 'blog', 'txt')
+        third = store.put('alice', b"c" * 100, 'blog', 'txt')
+        assert store.usage('alice') == 200
+        assert store.referenced(first) and store.referenced(second) and store.referenced(third)
+
+    def test_total_quota(self, make_store):
+        """Test that the store-wide quota releases the least recently used references"""
+        store = make_store(max_bytes=10)
+        first = store.put(1, b"12345", 'blog', 'txt')
+        store.put(2, b"67890", 'blog', 'txt')
+        store.put(3, b"abcde", 'blog', 'txt')
+        assert not store.referenced(first)
+        assert store.snapshot()['quota_released'] == 1
+
+    def test_external_asset_reference(self, make_store, tmp_path):
+        """Test that files written outside the store can be referenced and collected"""
+        store = make_store()
+        (tmp_path / 'assets' / 'image_abc.png').write_bytes(b"png")
+        store.add_ref(1, 'image_abc.png')
+        assert store.usage(1) == 3
+        store.add_ref(1, 'image_missing.png')
+        store.release(1, 'image_abc.png')
+        assert store.collect_garbage() == ['image_abc.png']
+
+    def test_legacy_files_are_not_collected(self, make_store, tmp_path):
+        """Test that files missing from the index are readable and kept"""
+        store = make_store()
+        (tmp_path / 'assets' / 'blog_1700000000.txt').write_text("old post")
+        assert store.read_text('blog_1700000000.txt') == "old post"
+        assert store.collect_garbage() == []
+        assert (tmp_path / 'assets' / 'blog_1700000000.txt').exists()
@@ -0,0 +1,74 @@
+"""
+Unit tests for background jobs
+"""
+import pytest
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.background_jobs import JobManager, JOB_DONE, JOB_ERROR, JOB_PENDING, JOB_RUNNING
+
+
+def wait_for(job, timeout=10):
+    """Block until a job has finished"""
+    for _ in range(int(timeout / 0.01)):
+        if job.finished_at is not None:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"Job {job.id} did not finish")
+
+
+class TestJobManager:
+    """Test job submission, status and deduplication"""
+
+    def test_job_result(self):
+        """Test that a job runs in the background and stores its result"""
+        manager = JobManager(max_workers=1)
+        job = manager.submit('user', 'key', lambda: 'image.png')
+        assert manager.get(job.id) is job
+        wait_for(job)
+        assert job.status == JOB_DONE
+        assert job.result == 'image.png'
+
+    def test_job_error(self):
+        """Test that an exception marks the job as failed and is kept"""
+        manager = JobManager(max_workers=1)
+
+        def fail():
+            raise RuntimeError("boom")
+
+        job = wait_for(manager.submit('user', 'key', fail))
+        assert job.status == JOB_ERROR
+        assert str(job.error) == "boom"
+
+    def test_active_job_is_reused(self):
+        """Test that the same work is not started twice while in progress"""
+        manager = JobManager(max_workers=2)
+        release = threading.Event()
+        first = manager.submit('user', 'key', release.wait)
+        assert first.status in (JOB_PENDING, JOB_RUNNING)
+        assert manager.submit('user', 'key', release.wait) is first
+        assert manager.submit('other user', 'key', lambda: None) is not first
+        release.set()
+        wait_for(first)
+        assert manager.submit('user', 'key', lambda: None) is not first
+
+    def test_unknown_job(self):
+        """Test that unknown ids return None"""
+        assert JobManager(max_workers=1).get('missing') is None
+
+    def test_finished_jobs_expire(self):
+        """Test that finished jobs are dropped after the TTL"""
+        manager = JobManager(max_workers=1, ttl_seconds=60)
+        job = wait_for(manager.submit('user', 'key', lambda: None))
+        job.finished_at -= 120
+        manager.submit('user', 'other', lambda: None)
+        assert manager.get(job.id) is None
+
+    def test_snapshot(self):
+        """Test that the snapshot counts jobs by status"""
+        manager = JobManager(max_workers=1)
+        wait_for(manager.submit('user', 'key', lambda: None))
+        assert manager.snapshot()[JOB_DONE] == 1
@@ -0,0 +1,111 @@
+"""
+Unit tests for shared Azure OpenAI clients and the async call helpers
+"""
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+import sys
+import os
+
+import httpx
+import openai
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_app.shared import clients, resilience
+from function_app.shared.clients import (
+    get_text_client, get_image_client, get_async_text_client, get_async_http_client
+)
+from function_app.shared.llm import achat_completion, aimage_generation
+from function_app.shared.usage import UsageRecorder
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    """Give every test its own client cache and circuit breakers."""
+    monkeypatch.setattr(clients, '_clients', {})
+    monkeypatch.setattr(resilience, '_breakers', {})
+    monkeypatch.setenv('AZURE_OPENAI_KEY', 'test-key')
+    monkeypatch.setenv('AZURE_OPENAI_ENDPOINT', 'https://example.openai.azure.com')
+    monkeypatch.setenv('AZURE_DALLE_KEY', 'test-key')
+    monkeypatch.setenv('AZURE_DALLE_ENDPOINT', 'https://example-dalle.openai.azure.com')
+    monkeypatch.setenv('AZURE_OPENAI_DEPLOYMENT', 'main')
+
+
+def make_response(content='ok', prompt_tokens=10, completion_tokens=5):
+    """Build a chat completion response stub."""
+    response = Mock()
+    response.choices = [Mock(message=Mock(content=content))]
+    response.usage = Mock(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                          total_tokens=prompt_tokens + completion_tokens)
+    return response
+
+
+class TestSharedClients:
+    """Test per-process client reuse"""
+
+    def test_clients_are_singletons(self):
+        """Test that repeated lookups return the same client"""
+        assert get_text_client() is get_text_client()
+        assert get_async_text_client() is get_async_text_client()
+        assert get_async_http_client() is get_async_http_client()
+
+    def test_text_and_image_clients_differ(self):
+        """Test that the chat and DALL-E clients are separate"""
+        assert get_text_client() is not get_image_client()
+        assert isinstance(get_async_text_client(), openai.AsyncAzureOpenAI)
+
+    def test_sdk_retries_disabled(self):
+        """Test that the SDK does not retry on top of shared.resilience"""
+        assert get_text_client().max_retries == 0
+        assert get_async_text_client().max_retries == 0
+
+    def test_pool_settings_from_env(self, monkeypatch):
+        """Test that pool limits and timeouts are read from the environment"""
+        monkeypatch.setenv('OPENAI_MAX_CONNECTIONS', '7')
+        monkeypatch.setenv('OPENAI_READ_TIMEOUT', '45')
+        assert clients._limits().max_connections == 7
+        assert clients._timeout().read == 45
+
+
+class TestAsyncHelpers:
+    """Test the async chat and image helpers"""
+
+    async def test_achat_completion_records_usage(self):
+        """Test that async chat calls are routed and recorded"""
+        client = Mock()
+        client.chat.completions.create = AsyncMock(return_value=make_response())
+        usage = UsageRecorder()
+
+        response = await achat_completion(client, 'edit', [{'role': 'user', 'content': 'hi'}],
+                                          usage=usage, temperature=0.5)
+
+        assert response.choices[0].message.content == 'ok'
+        kwargs = client.chat.completions.create.call_args.kwargs
+        assert kwargs['model'] == 'main'
+        assert 'max_tokens' in kwargs
+        assert usage.totals()['total_tokens'] == 15
+
+    async def test_achat_completion_retries_transient_errors(self):
+        """Test that async calls are retried without blocking the loop"""
+        request = httpx.Request('POST', 'https://example.openai.azure.com')
+        error = openai.InternalServerError('error', response=httpx.Response(500, request=request), body=None)
+        client = Mock()
+        client.chat.completions.create = AsyncMock(side_effect=[error, make_response()])
+
+        with patch.object(resilience.asyncio, 'sleep', new=AsyncMock()) as sleep:
+            await achat_completion(client, 'summary', [{'role': 'user', 'content': 'hi'}])
+
+        assert client.chat.completions.create.await_count == 2
+        sleep.assert_awaited_once()
+
+    async def test_aimage_generation_counts_images(self, monkeypatch):
+        """Test that async image calls record the image count"""
+        monkeypatch.setenv('AZURE_DALLE_DEPLOYMENT', 'dalle')
+        client = Mock()
+        client.images.generate = AsyncMock(return_value=Mock(data=[Mock(url='https://x/y.png')], usage=None))
+        usage = UsageRecorder()
+
+        await aimage_generation(client, 'a prompt', usage=usage, n=1)
+
+        assert client.images.generate.call_args.kwargs['model'] == 'dalle'
+        assert usage.totals()['images'] == 1
@@ -0,0 +1,157 @@
+"""
+Unit tests for the bounded edit conversation store
+"""
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_app.shared import token_budget
+from function_app.shared.conversations import (
+    Conversation, ConversationStore, MemoryConversationStore, SQLiteConversationStore, create_conversation_store
+)
+
+
+@pytest.fixture(autouse=True)
+def heuristic_tokenizer(monkeypatch):
+    """Use the character heuristic so results do not depend on tiktoken"""
+    monkeypatch.setattr(token_budget, '_encoding', None)
+    monkeypatch.setattr(token_budget, '_encoding_loaded', True)
+
+
+def make_store(**kwargs):
+    options = {'max_sessions': 10, 'ttl_seconds': 60, 'max_instructions': 3, 'max_tokens': 10000}
+    options.update(kwargs)
+    return MemoryConversationStore(**options)
+
+
+class TestMessages:
+    """Test request building"""
+
+    def test_first_turn(self):
+        """Test that a new session sends system prompt, article and instruction"""
+        store = make_store()
+        messages = store.build_messages('s1', 'SYSTEM', 'Shorten it', 'Article v1')
+        assert [m['role'] for m in messages] == ['system', 'assistant', 'user']
+        assert messages[0]['content'] == 'SYSTEM'
+        assert messages[1]['content'] == 'Article v1'
+
+    def test_only_latest_article_is_sent(self):
+        """Test that earlier versions are replaced, and instructions listed in the system prompt"""
+        store = make_store()
+        store.build_messages('s1', 'SYSTEM', 'Shorten it', 'Article v1')
+        store.record_reply('s1', 'Shorten it', 'Article v2')
+        messages = store.build_messages('s1', 'SYSTEM', 'Add a list')
+        assert len(messages) == 3
+        assert messages[1]['content'] == 'Article v2'
+        assert '- Shorten it' in messages[0]['content']
+
+    def test_keeps_last_instructions(self):
+        """Test that only the last max_instructions instructions are kept"""
+        store = make_store(max_instructions=2)
+        for index in range(4):
+            store.record_reply('s1', f'instruction {index}', 'Article')
+        system = store.build_messages('s1', 'SYSTEM', 'next')[0]['content']
+        assert 'instruction 0' not in system and 'instruction 1' not in system
+        assert 'instruction 2' in system and 'instruction 3' in system
+
+    def test_token_window_drops_oldest_instructions(self):
+        """Test that instructions are dropped oldest first to fit the window"""
+        store = make_store(max_tokens=40)
+        store.record_reply('s1', 'a' * 100, 'Article')
+        store.record_reply('s1', 'keep me', 'Article')
+        system = store.build_messages('s1', 'SYSTEM', 'next')[0]['content']
+        assert 'keep me' in system
+        assert 'a' * 100 not in system
+        assert store.snapshot()['trimmed_instructions'] == 1
+
+
+class TestEviction:
+    """Test LRU and TTL bounds"""
+
+    def test_lru_eviction(self):
+        """Test that the least recently used session is evicted"""
+        store = make_store(max_sessions=2)
+        store.build_messages('a', 'S', 'x', 'A')
+        store.build_messages('b', 'S', 'x', 'B')
+        store.build_messages('a', 'S', 'y')
+        store.build_messages('c', 'S', 'x', 'C')
+        assert 'a' in store and 'c' in store
+        assert 'b' not in store
+        assert store.snapshot()['evicted_lru'] == 1
+
+    def test_ttl_expiry(self):
+        """Test that idle sessions expire"""
+        store = make_store(ttl_seconds=10)
+        with patch('function_app.shared.conversations.time.time', return_value=100.0):
+            store.record_reply('a', 'x', 'A')
+        with patch('function_app.shared.conversations.time.time', return_value=111.0):
+            assert len(store) == 0
+        assert store.snapshot()['evicted_ttl'] == 1
+
+    def test_snapshot(self):
+        """Test that memory metrics are reported"""
+        store = make_store()
+        store.build_messages('a', 'S', 'x', 'Article')
+        store.record_reply('a', 'x', 'Edited')
+        snapshot = store.snapshot()
+        assert snapshot['backend'] == 'memory'
+        assert snapshot['sessions'] == 1
+        assert snapshot['stored_bytes'] > 0
+        assert snapshot['misses'] == 1
+
+
+class TestPersistence:
+    """Test serialization and the SQLite backend"""
+
+    def test_incomplete_backend_fails_on_creation(self):
+        """Test that a store missing a backend method cannot be created"""
+        class NoDelete(ConversationStore):
+            def _load(self, session_id):
+                return None
+
+            def _save(self, session_id, data, last_access):
+                pass
+
+        with pytest.raises(TypeError):
+            NoDelete()
+
+    def test_round_trip(self):
+        """Test that conversations serialize compactly and round-trip"""
+        conversation = Conversation(3, 'Article ' * 200, ['a', 'b'], 123.0)
+        data = conversation.to_bytes()
+        assert len(data) < len('Article ' * 200)
+        restored = Conversation.from_bytes(data, 3)
+        assert (restored.article, list(restored.instructions), restored.last_access) == \
+            (conversation.article, ['a', 'b'], 123.0)
+
+    def test_sqlite_shared_between_instances(self, tmp_path):
+        """Test that a second store instance continues the same session"""
+        path = str(tmp_path / 'conversations.db')
+        first = SQLiteConversationStore(path=path, ttl_seconds=60, max_instructions=3, max_tokens=10000)
+        first.record_reply('s1', 'Shorten it', 'Article v2')
+
+        second = SQLiteConversationStore(path=path, ttl_seconds=60, max_instructions=3, max_tokens=10000)
+        messages = second.build_messages('s1', 'SYSTEM', 'Add a list')
+        assert messages[1]['content'] == 'Article v2'
+        assert '- Shorten it' in messages[0]['content']
+        assert second.snapshot()['sessions'] == 1
+
+    def test_sqlite_ttl(self, tmp_path):
+        """Test that expired SQLite sessions are not returned"""
+        store = SQLiteConversationStore(path=str(tmp_path / 'c.db'), ttl_seconds=10)
+        with patch('function_app.shared.conversations.time.time', return_value=100.0):
+            store.record_reply('s1', 'x', 'A')
+        with patch('function_app.shared.conversations.time.time', return_value=111.0):
+            assert store.get_article('s1') is None
+        assert 's1' not in store
+
+    def test_factory(self, monkeypatch, tmp_path):
+        """Test backend selection from CONVERSATION_STORE"""
+        monkeypatch.setenv('CONVERSATION_SQLITE_PATH', str(tmp_path / 'c.db'))
+        assert create_conversation_store('sqlite').backend == 'sqlite'
+        assert create_conversation_store('unknown').backend == 'memory'
+        monkeypatch.setenv('CONVERSATION_STORE', 'memory')
+        assert create_conversation_store().backend == 'memory'
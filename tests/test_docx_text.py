@@ -0,0 +1,145 @@
+"""
+Unit tests for streaming DOCX text extraction
+"""
+import pytest
+import time
+import io
+import sys
+import os
+
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.enum.text import WD_BREAK
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.docx_text import iter_paragraphs, docx_text, heading_level
+from content.articles.docx_to_markdown import convert_docx_to_markdown, get_text_style
+
+LIBRARY_DIR = os.path.join(os.path.dirname(__file__), '..', 'content', 'articles', 'docx')
+
+
+def python_docx_markdown(source):
+    """Markdown built through the python-docx object model (the previous implementation)"""
+    lines = []
+    for paragraph in Document(source).paragraphs:
+        if not paragraph.text.strip():
+            lines.append('')
+            continue
+        if paragraph.style.name.startswith('Heading'):
+            lines.append(f"{'#' * int(paragraph.style.name[-1])} {paragraph.text}")
+            continue
+        formatted_text = ''
+        for run in paragraph.runs:
+            if not run.text.strip():
+                continue
+            styles = get_text_style(run)
+            formatted_text += f"{''.join(styles)}{run.text}{''.join(styles[::-1])}" if styles else run.text
+        if formatted_text:
+            lines.append(formatted_text)
+    return '\n'.join(lines)
+
+
+def add_hyperlink(paragraph, text):
+    """Append a w:hyperlink holding one run"""
+    hyperlink = OxmlElement('w:hyperlink')
+    run = OxmlElement('w:r')
+    text_element = OxmlElement('w:t')
+    text_element.text = text
+    run.append(text_element)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+@pytest.fixture
+def sample_docx():
+    document = Document()
+    document.add_heading("Planning Ahead", level=1)
+    paragraph = document.add_paragraph("Plain ")
+    paragraph.add_run("bold").bold = True
+    paragraph.add_run(" and ")
+    paragraph.add_run("italic").italic = True
+    run = paragraph.add_run(" not bold")
+    run.bold = False
+    add_hyperlink(paragraph, " linked")
+    document.add_paragraph("")
+    tabbed = document.add_paragraph("Tab\there")
+    tabbed.add_run().add_break()
+    tabbed.add_run("next line")
+    tabbed.add_run().add_break(WD_BREAK.PAGE)
+    document.add_heading("Details", level=2)
+    table = document.add_table(rows=1, cols=1)
+    table.cell(0, 0).text = "In a table"
+    document.add_paragraph("After the table", style='List Bullet')
+
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+class TestIterParagraphs:
+    """Test that streamed paragraphs match python-docx"""
+
+    def test_matches_python_docx(self, sample_docx):
+        """Test that styles, text and runs match the python-docx object model"""
+        expected = [(p.style.name, p.text, [(r.text, r.bold, r.italic) for r in p.runs])
+                    for p in Document(io.BytesIO(sample_docx)).paragraphs]
+        actual = [(p.style, p.text, [tuple(r) for r in p.runs]) for p in iter_paragraphs(io.BytesIO(sample_docx))]
+        assert actual == expected
+
+    def test_text_and_formatting(self, sample_docx):
+        """Test hyperlink text, tabs, breaks and run formatting"""
+        paragraphs = list(iter_paragraphs(io.BytesIO(sample_docx)))
+        assert paragraphs[0].style == 'Heading 1'
+        assert paragraphs[1].text == "Plain bold and italic not bold linked"
+        assert [run.text for run in paragraphs[1].runs if run.bold] == ['bold']
+        assert paragraphs[1].runs[-1].bold is False
+        assert paragraphs[3].text == "Tab\there\nnext line"
+        assert "In a table" not in docx_text(io.BytesIO(sample_docx))
+
+    def test_markdown_matches_python_docx(self, sample_docx):
+        """Test that the markdown conversion is unchanged"""
+        assert convert_docx_to_markdown(io.BytesIO(sample_docx)) == python_docx_markdown(io.BytesIO(sample_docx))
+
+    def test_heading_level(self):
+        """Test heading levels from style names"""
+        assert heading_level('Heading 3') == 3
+        assert heading_level('Heading') == 0
+        assert heading_level('Normal') == 0
+
+
+def benchmarks_enabled(config):
+    """Benchmarks run only when asked for: RUN_BENCHMARKS=1 or -m slow"""
+    return bool(os.getenv('RUN_BENCHMARKS')) or 'slow' in (config.getoption('markexpr') or '')
+
+
+@pytest.mark.slow
+class TestBenchmark:
+    """Benchmark streaming extraction against python-docx on the article library"""
+
+    def test_faster_than_python_docx(self, request, record_property):
+        """Test that converting the library is faster than through python-docx, with the same output"""
+        if not benchmarks_enabled(request.config):
+            pytest.skip("Benchmark: set RUN_BENCHMARKS=1 or run with -m slow")
+        paths = [os.path.join(LIBRARY_DIR, name) for name in sorted(os.listdir(LIBRARY_DIR)) if name.endswith('.docx')]
+        if not paths:
+            pytest.skip("No DOCX files in the article library")
+
+        timings = {}
+        for label, convert in (('python-docx', python_docx_markdown), ('streaming', convert_docx_to_markdown)):
+            start = time.perf_counter()
+            for _ in range(3):
+                outputs = [convert(path) for path in paths]
+            timings[label] = (time.perf_counter() - start) / (3 * len(paths))
+            if label == 'python-docx':
+                expected = outputs
+        assert outputs == expected
+
+        # Reported in the JUnit XML (--junitxml) and in the failure message
+        summary = (f"DOCX to markdown over {len(paths)} articles: "
+                   f"python-docx {timings['python-docx'] * 1000:.1f} ms/file, "
+                   f"streaming {timings['streaming'] * 1000:.1f} ms/file "
+                   f"({timings['python-docx'] / timings['streaming']:.1f}x)")
+        record_property('python_docx_ms_per_file', round(timings['python-docx'] * 1000, 2))
+        record_property('streaming_ms_per_file', round(timings['streaming'] * 1000, 2))
+        assert timings['streaming'] < timings['python-docx'] / 2, summary
@@ -0,0 +1,153 @@
+"""
+Unit tests for patch-based edits
+"""
+import pytest
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_app.shared.edit_patches import PatchError, apply_edits, parse_edits, patch_article
+from function_app.shared.conversations import MemoryConversationStore
+
+ARTICLE = (
+    "# Title\n\n"
+    "Intro paragraph with a typo teh.\n\n"
+    "## First\n\n"
+    "First body.\n\n"
+    "### Detail\n\n"
+    "Detail body.\n\n"
+    "## Second\n\n"
+    "Second body.\n\n"
+    "Book your Discovery Call now.\n\n"
+    "Disclaimer text."
+)
+
+
+def reply(edits, **extra):
+    return json.dumps({"edits": edits, **extra})
+
+
+class TestParseEdits:
+    """Test parsing the model's edit list"""
+
+    def test_parses_fenced_json(self):
+        """Test that a fenced JSON reply is accepted"""
+        edits = parse_edits("```json\n" + reply([{"find": "a", "replace": "b"}]) + "\n```")
+        assert edits == [{"find": "a", "replace": "b"}]
+
+    @pytest.mark.parametrize("text", [
+        "Here is the updated blog...",
+        reply([]),
+        reply([], full_rewrite=True),
+        reply([{"replace": "b"}]),
+        json.dumps({"changes": []}),
+    ])
+    def test_rejects_unusable_replies(self, text):
+        """Test that non-JSON, empty and malformed replies raise PatchError"""
+        with pytest.raises(PatchError):
+            parse_edits(text)
+
+
+class TestApplyEdits:
+    """Test applying edits locally"""
+
+    def test_find_replace(self):
+        """Test that an anchor is replaced in place"""
+        result = patch_article(ARTICLE, reply([{"find": "typo teh", "replace": "typo the"}]))
+        assert result == ARTICLE.replace("typo teh", "typo the")
+
+    def test_whitespace_tolerant_anchor(self):
+        """Test that anchors match across whitespace differences"""
+        result = apply_edits(ARTICLE, [{"find": "Intro  paragraph\nwith", "replace": "An intro with"}])
+        assert "An intro with a typo" in result
+
+    def test_ambiguous_and_missing_anchor(self):
+        """Test that anchors must match exactly once"""
+        with pytest.raises(PatchError):
+            apply_edits(ARTICLE, [{"find": "body.", "replace": "x"}])
+        with pytest.raises(PatchError):
+            apply_edits(ARTICLE, [{"find": "not in the article", "replace": "x"}])
+
+    def test_section_replacement(self):
+        """Test that a section is replaced up to the next heading of the same level"""
+        result = apply_edits(ARTICLE, [{"section": "## First", "replace": "## First\n\nNew body."}])
+        assert "## First\n\nNew body.\n\n## Second" in result
+        assert "Detail body." not in result
+
+    def test_last_section_and_deletion(self):
+        """Test that the last section ends before the CTA and disclaimer, and deleting text"""
+        result = apply_edits(ARTICLE, [
+            {"section": "Second", "replace": "## Second\n\nShorter."},
+            {"find": "Detail body.", "replace": ""},
+        ])
+        assert result.endswith("## Second\n\nShorter.\n\nBook your Discovery Call now.\n\nDisclaimer text.")
+        assert "### Detail\n\n## Second" in result
+
+    def test_last_section_without_cta(self):
+        """Test that the last section is not replaced when the CTA cannot be found"""
+        article = ARTICLE.replace("Book your Discovery Call now.", "Call us.")
+        with pytest.raises(PatchError):
+            apply_edits(article, [{"section": "## Second", "replace": "## Second\n\nShorter."}])
+
+    def test_rejects_gutted_article(self):
+        """Test that a patch removing most of the article is rejected"""
+        with pytest.raises(PatchError):
+            apply_edits(ARTICLE, [{"section": "# Title", "replace": "# Title"}])
+
+
+class TestEditFallback:
+    """Test patch mode in AzureServices.edit_content"""
+
+    @pytest.fixture
+    def services(self):
+        from function_app.shared import azure_services
+        with patch.object(azure_services, 'get_text_client'), patch.object(azure_services, 'get_async_text_client'):
+            service = azure_services.AzureServices()
+        service.conversations = MemoryConversationStore(max_sessions=10, ttl_seconds=60, max_instructions=3, max_tokens=10000)
+        service.patch_edits = True
+        return service
+
+    @staticmethod
+    def response(content):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def test_patch_applied_without_full_regeneration(self, services):
+        """Test that a valid patch is applied with a single model call"""
+        patch_reply = self.response(reply([{"find": "typo teh", "replace": "typo the"}]))
+        with patch('function_app.shared.azure_services.chat_completion', return_value=patch_reply) as completion:
+            result = services.edit_content('s1', 'Fix the typo', ARTICLE)
+        assert result == ARTICLE.replace("typo teh", "typo the")
+        assert [call.args[1] for call in completion.call_args_list] == ['edit_patch']
+        assert services.conversations.get_article('s1') == result
+
+    def test_falls_back_to_full_regeneration(self, services):
+        """Test that an unusable patch falls back to the full edit stage"""
+        replies = [self.response("not json"), self.response("# Full rewrite")]
+        with patch('function_app.shared.azure_services.chat_completion', side_effect=replies) as completion:
+            result = services.edit_content('s1', 'Rewrite it', ARTICLE)
+        assert result == "# Full rewrite"
+        assert [call.args[1] for call in completion.call_args_list] == ['edit_patch', 'edit']
+
+    async def test_async_edit_runs_blocking_store_off_the_loop(self, services):
+        """Test that a store doing I/O is only called from worker threads by aedit_content"""
+        store = services.conversations
+        store.blocking = True
+        loop_thread = threading.get_ident()
+        original_load = store._load
+        threads = []
+
+        def load(session_id):
+            threads.append(threading.get_ident())
+            return original_load(session_id)
+
+        store._load = load
+        patch_reply = self.response(reply([{"find": "typo teh", "replace": "typo the"}]))
+        with patch('function_app.shared.azure_services.achat_completion', return_value=patch_reply):
+            result = await services.aedit_content('s1', 'Fix the typo', ARTICLE)
+        assert result == ARTICLE.replace("typo teh", "typo the")
+        assert threads and loop_thread not in threads
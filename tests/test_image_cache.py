@@ -0,0 +1,153 @@
+"""
+Unit tests for the content-addressed image cache
+"""
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from types import SimpleNamespace
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_app.shared.image_cache import ImageCache, PROMPT_INPUT_CHARS
+
+
+class TestImageCache:
+    """Test the two cache levels and eviction"""
+
+    def test_prompt_level(self, tmp_path):
+        """Test that safe prompts are keyed by the part of the post sent to the model"""
+        cache = ImageCache(str(tmp_path))
+        post = "x" * PROMPT_INPUT_CHARS
+        cache.put_prompt(post, "a calm office")
+        assert cache.get_prompt(post + " trailing text not sent") == "a calm office"
+        assert cache.get_prompt("different post") is None
+
+    def test_image_level(self, tmp_path):
+        """Test that images are stored under a content-addressed name"""
+        cache = ImageCache(str(tmp_path))
+        filename = cache.put_image("a calm office", b"png")
+        assert filename == ImageCache.filename_for("a calm office")
+        assert (tmp_path / filename).read_bytes() == b"png"
+        assert cache.get_image("a calm office") == filename
+        assert cache.get_image("another prompt") is None
+
+    def test_put_image_file(self, tmp_path):
+        """Test that a downloaded file is moved into the cache and accounted"""
+        cache = ImageCache(str(tmp_path))
+        temp_path = cache.temp_path()
+        with open(temp_path, 'wb') as f:
+            f.write(b"streamed")
+        filename = cache.put_image_file("prompt", temp_path)
+        assert not os.path.exists(temp_path)
+        assert (tmp_path / filename).read_bytes() == b"streamed"
+        assert cache.snapshot()['image_bytes'] == len(b"streamed")
+
+    def test_lookup_needs_both_levels(self, tmp_path):
+        """Test that lookup hits only when prompt and image are cached"""
+        cache = ImageCache(str(tmp_path))
+        cache.put_prompt("post", "prompt")
+        assert cache.lookup("post") is None
+        cache.put_image("prompt", b"png")
+        assert cache.lookup("post") == ImageCache.filename_for("prompt")
+
+    def test_size_bounded_eviction(self, tmp_path):
+        """Test that the least recently used images are evicted beyond max_bytes"""
+        cache = ImageCache(str(tmp_path), max_bytes=10)
+        first = cache.put_image("one", b"12345")
+        cache.put_image("two", b"12345")
+        cache.get_image("one")
+        cache.put_image("three", b"12345")
+        assert cache.get_image("one") == first
+        assert cache.get_image("two") is None
+        assert not (tmp_path / ImageCache.filename_for("two")).exists()
+        assert cache.snapshot()['evicted'] == 1
+
+    def test_on_evict_callback(self, tmp_path):
+        """Test that the eviction hook receives evicted filenames"""
+        evicted = []
+        cache = ImageCache(str(tmp_path), max_bytes=5, on_evict=evicted.append)
+        first = cache.put_image("one", b"12345")
+        cache.put_image("two", b"12345")
+        assert evicted == [first]
+
+    def test_pinned_images_are_not_evicted(self, tmp_path):
+        """Test that images referenced elsewhere survive eviction"""
+        pinned = set()
+        cache = ImageCache(str(tmp_path), max_bytes=10, is_pinned=pinned.__contains__)
+        first = cache.put_image("one", b"12345")
+        pinned.add(first)
+        second = cache.put_image("two", b"12345")
+        cache.put_image("three", b"12345")
+        assert cache.get_image("one") == first
+        assert cache.get_image("two") is None
+        assert not (tmp_path / second).exists()
+
+    def test_existing_files_indexed(self, tmp_path):
+        """Test that cached files survive a restart and other files are ignored"""
+        ImageCache(str(tmp_path)).put_image("one", b"png")
+        (tmp_path / "image_1700000000.png").write_bytes(b"old")
+        cache = ImageCache(str(tmp_path))
+        assert cache.get_image("one") == ImageCache.filename_for("one")
+        assert cache.snapshot()['images'] == 1
+
+
+class FakeDownload:
+    """Minimal stand-in for an httpx streaming response"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    async def aiter_bytes(self, chunk_size=None):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class TestImageGenerator:
+    """Test that ImageGenerator skips model calls on cache hits"""
+
+    @pytest.fixture
+    def generator(self, tmp_path):
+        from function_app.shared import azure_services
+        with patch.object(azure_services, 'get_image_client'), patch.object(azure_services, 'get_text_client'), \
+                patch.object(azure_services, 'get_async_image_client'), \
+                patch.object(azure_services, 'get_async_text_client'):
+            generator = azure_services.ImageGenerator()
+        generator.cache = ImageCache(str(tmp_path))
+        return generator
+
+    async def test_second_request_is_cached(self, generator):
+        """Test that the same post reuses the prompt and image"""
+        prompt_response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="safe prompt"))])
+        image_response = SimpleNamespace(data=[SimpleNamespace(url="https://example.com/image.png")])
+        http_client = MagicMock()
+        http_client.stream.return_value = FakeDownload([b"p", b"ng"])
+
+        with patch('function_app.shared.azure_services.achat_completion', AsyncMock(return_value=prompt_response)) as chat, \
+                patch('function_app.shared.azure_services.aimage_generation', AsyncMock(return_value=image_response)) as image, \
+                patch('function_app.shared.azure_services.get_async_http_client', return_value=http_client):
+            first = await generator.agenerate_image("post content")
+            second = await generator.agenerate_image("post content")
+
+        assert first == second == ImageCache.filename_for("safe prompt")
+        assert chat.await_count == 1
+        assert image.await_count == 1
+        assert open(os.path.join(generator.cache.directory, first), 'rb').read() == b"png"
+        assert not [name for name in os.listdir(generator.cache.directory) if name.endswith('.tmp')]
+
+    async def test_prefetched_prompt_skips_prompt_stage(self, generator):
+        """Test that a prompt from an earlier prompt-only request is reused"""
+        prompt_response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="safe prompt"))])
+        with patch('function_app.shared.azure_services.achat_completion', AsyncMock(return_value=prompt_response)) as chat:
+            assert await generator.aget_image_prompt("post content") == "safe prompt"
+            assert await generator.aget_image_prompt("post content") == "safe prompt"
+        assert chat.await_count == 1
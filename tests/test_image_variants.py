@@ -0,0 +1,84 @@
+"""
+Unit tests for responsive image variants
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+
+from utils.image_variants import (
+    VariantPipeline, create_variants, image_sources, remove_variants,
+    thumbnail_filename, variant_filename, VARIANT_WIDTHS
+)
+
+
+@pytest.fixture
+def original(tmp_path):
+    """A 1024x1024 PNG like the ones DALL-E returns"""
+    Image.new('RGBA', (1024, 1024), (30, 90, 160, 255)).save(tmp_path / 'image_abc.png')
+    return 'image_abc.png'
+
+
+class TestVariants:
+    """Test variant creation and srcset building"""
+
+    def test_creates_all_variants(self, tmp_path, original):
+        """Test that WebP/JPEG variants and a thumbnail are written at each width"""
+        written = create_variants(str(tmp_path), original)
+        assert len(written) == len(VARIANT_WIDTHS) * 2 + 1
+        with Image.open(tmp_path / variant_filename(original, 640, 'webp')) as image:
+            assert image.size == (640, 640)
+            assert image.format == 'WEBP'
+        with Image.open(tmp_path / variant_filename(original, 320, 'jpeg')) as image:
+            assert image.format == 'JPEG'
+        with Image.open(tmp_path / thumbnail_filename(original)) as image:
+            assert image.size == (160, 160)
+
+    def test_variants_are_smaller(self, tmp_path, original):
+        """Test that the full-width variants are smaller than the PNG"""
+        create_variants(str(tmp_path), original)
+        png_size = (tmp_path / original).stat().st_size
+        assert (tmp_path / variant_filename(original, 1024, 'webp')).stat().st_size < png_size
+
+    def test_skips_widths_above_original(self, tmp_path):
+        """Test that small images are not upscaled"""
+        Image.new('RGB', (500, 250)).save(tmp_path / 'small.png')
+        written = create_variants(str(tmp_path), 'small.png')
+        assert variant_filename('small.png', 320, 'webp') in written
+        assert variant_filename('small.png', 640, 'webp') not in written
+
+    def test_image_sources(self, tmp_path, original):
+        """Test that srcsets list existing variants and are None before creation"""
+        url = lambda name: f"/generated/{name}"
+        assert image_sources(str(tmp_path), original, url) is None
+        create_variants(str(tmp_path), original)
+        sources = image_sources(str(tmp_path), original, url)
+        assert sources['webp'].startswith("/generated/image_abc-320.webp 320w, ")
+        assert sources['src'] == "/generated/image_abc-1024.jpg"
+        assert sources['thumbnail'] == "/generated/image_abc-thumb.webp"
+
+    def test_remove_variants(self, tmp_path, original):
+        """Test that variants are removed and the original kept"""
+        create_variants(str(tmp_path), original)
+        remove_variants(str(tmp_path), original)
+        assert os.listdir(tmp_path) == [original]
+
+
+class TestVariantPipeline:
+    """Test background variant jobs"""
+
+    def test_submit_runs_once(self, tmp_path, original):
+        """Test that a job runs in the pool and is skipped once done"""
+        pipeline = VariantPipeline(max_workers=1)
+        future = pipeline.submit(str(tmp_path), original)
+        assert len(future.result(timeout=30)) == len(VARIANT_WIDTHS) * 2 + 1
+        assert pipeline.submit(str(tmp_path), original) is None
+
+    def test_failure_is_logged(self, tmp_path):
+        """Test that a broken image does not raise from the pool"""
+        (tmp_path / 'broken.png').write_bytes(b'not an image')
+        future = VariantPipeline(max_workers=1).submit(str(tmp_path), 'broken.png')
+        assert future.result(timeout=30) == []
@@ -0,0 +1,99 @@
+"""
+Unit tests for the local markdown normalizer
+"""
+import pytest
+from datetime import datetime
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.markdown_normalizer import (
+    format_date_line, normalize_inline, normalize_markdown, parse_blocks
+)
+
+TODAY = datetime(2025, 3, 4)
+
+
+class TestFormatting:
+    """Test formatting rules without structure changes"""
+
+    def test_headings(self):
+        """Test that heading markers, setext headings and deep levels are fixed"""
+        content = "Title\n=====\n\n##Subheading ##\n\n#### Too deep"
+        assert normalize_markdown(content) == "# Title\n\n## Subheading\n\n### Too deep"
+
+    def test_promotes_first_heading_without_title(self):
+        """Test that the first heading becomes the title when there is no H1"""
+        assert normalize_markdown("## Title\n\nText\n\n## Section") == "# Title\n\nText\n\n## Section"
+
+    def test_blank_lines_between_blocks(self):
+        """Test that blocks are separated by exactly one blank line"""
+        content = "# Title\nFirst paragraph\n\n\n\nSecond paragraph\n- item"
+        assert normalize_markdown(content) == "# Title\n\nFirst paragraph\n\nSecond paragraph\n\n- item"
+
+    def test_bullets_and_numbered_lists(self):
+        """Test that bullet markers are unified and numbered lists renumbered"""
+        content = "*  one\n+ two\n  continued\n• three\n\n1) a\n1) b"
+        assert normalize_markdown(content) == "- one\n- two continued\n- three\n\n1. a\n2. b"
+
+    def test_emphasis(self):
+        """Test that underscore emphasis is converted, URLs left alone"""
+        assert normalize_inline("__bold__ _it_ [x](http://a_b_c)") == "**bold** *it* [x](http://a_b_c)"
+
+    def test_date_line(self):
+        """Test that date lines are rewritten as **Date: Month DD, YYYY**"""
+        assert normalize_markdown("Date: 2025-03-04") == "**Date: March 04, 2025**"
+        assert normalize_markdown("**Date:** Mar 4, 2025") == "**Date: March 04, 2025**"
+        assert format_date_line("sometime soon") == "**Date: sometime soon**"
+        assert format_date_line(today=TODAY) == "**Date: March 04, 2025**"
+
+    def test_parse_block_kinds(self):
+        """Test that blocks are classified"""
+        kinds = [b.kind for b in parse_blocks("# T\n\ntext\n\n- a\n\n---\n\nDate: May 1, 2025")]
+        assert kinds == ['heading', 'paragraph', 'list', 'rule', 'date']
+
+
+class TestStructure:
+    """Test template ordering with preserved sections"""
+
+    SECTIONS = {
+        'hook': 'Weekly hook text.',
+        'summary': 'Short summary. Read more...',
+        'disclaimer': '*This article is a service of the firm.*',
+    }
+
+    def test_template_order(self):
+        """Test that sections are placed hook, summary, date, body, disclaimer, with text after the CTA kept"""
+        content = (
+            "Weekly hook text.\n\n"
+            "##Title\n\n"
+            "Body text.\n\n"
+            "Short summary. Read more...\n\n"
+            "Schedule your complimentary 15-minute Discovery Call today.\n\n"
+            "Text after the CTA.\n\n"
+            "Schedule your complimentary  15-minute Discovery Call today.\n\n"
+            "*This article is a service of the firm.*"
+        )
+        assert normalize_markdown(content, self.SECTIONS, today=TODAY) == (
+            "Weekly hook text.\n\n"
+            "Short summary. Read more...\n\n"
+            "**Date: March 04, 2025**\n\n"
+            "# Title\n\n"
+            "Body text.\n\n"
+            "Schedule your complimentary 15-minute Discovery Call today.\n\n"
+            "Text after the CTA.\n\n"
+            "*This article is a service of the firm.*"
+        )
+
+    def test_keeps_existing_date(self):
+        """Test that an existing date is kept and normalized"""
+        content = "# Title\n\nDate: 2024-12-01\n\nBody"
+        result = normalize_markdown(content, {'hook': '', 'summary': '', 'disclaimer': ''}, today=TODAY)
+        assert result == "**Date: December 01, 2024**\n\n# Title\n\nBody"
+
+    def test_preserved_sections_verbatim(self):
+        """Test that preserved sections are not reformatted"""
+        sections = {'hook': '__Hook__ stays', 'summary': '', 'disclaimer': ''}
+        result = normalize_markdown("__Hook__ stays\n\n# Title", sections, today=TODAY)
+        assert result.startswith("__Hook__ stays\n\n")
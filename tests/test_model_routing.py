@@ -0,0 +1,80 @@
+"""
+Unit tests for per-stage model routing and stage metrics
+"""
+import pytest
+from unittest.mock import Mock, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_app.shared.model_routing import get_routing_table, deployment_for
+from function_app.shared.metrics import StageMetrics, stage_metrics
+from function_app.shared.llm import chat_completion
+
+
+class TestRoutingTable:
+    """Test the stage -> deployment routing table"""
+
+    def test_defaults_to_main_deployment(self, monkeypatch):
+        """Test that unconfigured stages use AZURE_OPENAI_DEPLOYMENT"""
+        monkeypatch.setenv('AZURE_OPENAI_DEPLOYMENT', 'main')
+        monkeypatch.delenv('AZURE_OPENAI_STAGE_DEPLOYMENTS', raising=False)
+        assert deployment_for('summary') == 'main'
+        assert deployment_for('unknown-stage') == 'main'
+
+    def test_json_table_routes_stages(self, monkeypatch):
+        """Test that the JSON routing table overrides stages"""
+        monkeypatch.setenv('AZURE_OPENAI_DEPLOYMENT', 'main')
+        monkeypatch.setenv('AZURE_OPENAI_STAGE_DEPLOYMENTS', '{"summary": "mini", "image_prompt": "mini"}')
+        table = get_routing_table()
+        assert table['summary'] == 'mini'
+        assert table['image_prompt'] == 'mini'
+        assert table['rewrite'] == 'main'
+
+    def test_stage_env_override_wins(self, monkeypatch):
+        """Test that AZURE_OPENAI_DEPLOYMENT_<STAGE> takes precedence"""
+        monkeypatch.setenv('AZURE_OPENAI_DEPLOYMENT', 'main')
+        monkeypatch.setenv('AZURE_OPENAI_STAGE_DEPLOYMENTS', '{"validation": "mini"}')
+        monkeypatch.setenv('AZURE_OPENAI_DEPLOYMENT_VALIDATION', 'nano')
+        assert deployment_for('validation') == 'nano'
+
+    def test_invalid_json_is_ignored(self, monkeypatch):
+        """Test that a malformed routing table falls back to the default"""
+        monkeypatch.setenv('AZURE_OPENAI_DEPLOYMENT', 'main')
+        monkeypatch.setenv('AZURE_OPENAI_STAGE_DEPLOYMENTS', '{broken')
+        assert deployment_for('summary') == 'main'
+
+
+class TestStageMetrics:
+    """Test in-process stage metrics"""
+
+    def test_snapshot_aggregates_calls(self):
+        """Test that calls, errors, tokens and latency are aggregated"""
+        metrics = StageMetrics()
+        metrics.record('summary', 'mini', 100, prompt_tokens=10, completion_tokens=5)
+        metrics.record('summary', 'mini', 300, prompt_tokens=20, completion_tokens=5)
+        metrics.record('summary', 'mini', 200, success=False)
+
+        stats = metrics.snapshot()['summary:mini']
+
+        assert stats['calls'] == 3
+        assert stats['errors'] == 1
+        assert stats['prompt_tokens'] == 30
+        assert stats['completion_tokens'] == 10
+        assert stats['avg_latency_ms'] == 200
+        assert stats['p50_latency_ms'] == 200
+
+    def test_chat_completion_uses_routed_deployment(self, monkeypatch):
+        """Test that chat_completion sends the stage's deployment and records metrics"""
+        monkeypatch.setenv('AZURE_OPENAI_DEPLOYMENT', 'main')
+        monkeypatch.setenv('AZURE_OPENAI_DEPLOYMENT_SUMMARY', 'mini')
+        stage_metrics.reset()
+        client = MagicMock()
+        client.chat.completions.create.return_value = Mock(
+            usage=Mock(prompt_tokens=7, completion_tokens=3, total_tokens=10))
+
+        chat_completion(client, 'summary', [{"role": "user", "content": "hi"}])
+
+        assert client.chat.completions.create.call_args.kwargs['model'] == 'mini'
+        assert stage_metrics.snapshot()['summary:mini']['prompt_tokens'] == 7
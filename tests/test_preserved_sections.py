@@ -0,0 +1,50 @@
+"""
+Unit tests for keeping indexed article sections verbatim in the rewrite
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_app.shared.preserved_sections import (
+    preserved_sections, strip_preserved_sections, insert_preserved_sections
+)
+
+SECTIONS = {'hook': "Hook paragraph.", 'summary': "Summary paragraph, read more...", 'disclaimer': "Disclaimer."}
+SOURCE = "Title\nHook paragraph.\nSummary paragraph, read more...\nBody text.\nDisclaimer."
+
+
+class TestPreservedSections:
+    """Test removing preserved sections from the source and putting them back"""
+
+    def test_request_sections(self):
+        """Test that missing, empty and non-dict sections are ignored"""
+        assert preserved_sections(None) is None
+        assert preserved_sections("hook") is None
+        assert preserved_sections({'hook': " ", 'summary': None}) is None
+        assert preserved_sections({'hook': " Hook. ", 'extra': "x"}) == {'hook': "Hook."}
+
+    def test_unusable_sections_ignored(self):
+        """Test that sections missing from the source or covering most of it are ignored"""
+        assert preserved_sections(SECTIONS, SOURCE * 3) == SECTIONS
+        assert preserved_sections({'summary': "Not in the source."}, SOURCE * 3) is None
+        body = "Body paragraph one.\nBody paragraph two.\nBody paragraph three."
+        assert preserved_sections({'hook': "Hook.", 'summary': body}, f"Hook.\n{body}") is None
+
+    def test_strip(self):
+        """Test that the model only sees the text between the preserved sections"""
+        assert strip_preserved_sections(SOURCE, SECTIONS) == "Title\n\nBody text."
+
+    def test_insert(self):
+        """Test that hook and summary open the article and the disclaimer ends it"""
+        content = insert_preserved_sections("# New Title\n\n## Section\n\nNew body.\n", SECTIONS)
+        assert content == ("Hook paragraph.\n\nSummary paragraph, read more...\n\n# New Title\n\n"
+                           "## Section\n\nNew body.\n\nDisclaimer.")
+        assert insert_preserved_sections("New body.", {'disclaimer': "Disclaimer."}) == "New body.\n\nDisclaimer."
+
+    def test_normalized_by_web_app(self):
+        """Test that the web app's normalizer (run without sections) keeps the assembled article intact"""
+        from utils.markdown_normalizer import normalize_markdown
+        content = insert_preserved_sections("# New Title\n\nNew body.\n\nBook your Discovery Call now.", SECTIONS)
+        assert normalize_markdown(content) == content
@@ -0,0 +1,198 @@
+"""
+Unit tests for retries, backoff and circuit breaking of Azure OpenAI calls
+"""
+import pytest
+import asyncio
+from unittest.mock import Mock, patch
+import sys
+import os
+
+import httpx
+import openai
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_app.shared import resilience
+from function_app.shared.resilience import (
+    CircuitBreaker, CircuitOpenError, acall_with_resilience, call_with_resilience, error_status,
+    is_transient_error, retry_after_seconds
+)
+from function_app.shared.metrics import resilience_counters
+
+
+def make_status_error(error_class, status, headers=None):
+    """Build an openai status error with the given response headers."""
+    request = httpx.Request('POST', 'https://example.openai.azure.com')
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return error_class('error', response=response, body=None)
+
+
+@pytest.fixture(autouse=True)
+def reset_resilience(monkeypatch):
+    """Start every test with fresh breakers, counters and fast retries."""
+    monkeypatch.setattr(resilience, '_breakers', {})
+    monkeypatch.setenv('LLM_MAX_ATTEMPTS', '3')
+    monkeypatch.setenv('LLM_RETRY_MAX_DELAY', '20')
+    monkeypatch.setenv('CIRCUIT_FAILURE_THRESHOLD', '5')
+    resilience_counters.reset()
+    with patch.object(resilience.time, 'sleep') as sleep:
+        yield sleep
+
+
+class TestRetryAfter:
+    """Test Retry-After header parsing"""
+
+    def test_seconds_header(self):
+        """Test that retry-after in seconds is parsed"""
+        error = make_status_error(openai.RateLimitError, 429, {'retry-after': '7'})
+        assert retry_after_seconds(error) == 7.0
+
+    def test_milliseconds_header_preferred(self):
+        """Test that retry-after-ms takes precedence"""
+        error = make_status_error(openai.RateLimitError, 429,
+                                  {'retry-after-ms': '1500', 'retry-after': '7'})
+        assert retry_after_seconds(error) == 1.5
+
+    def test_missing_header(self):
+        """Test that errors without a hint return None"""
+        error = make_status_error(openai.InternalServerError, 500)
+        assert retry_after_seconds(error) is None
+        assert retry_after_seconds(ValueError('x')) is None
+
+
+class TestCallWithResilience:
+    """Test retrying transient failures"""
+
+    def test_retries_rate_limit_then_succeeds(self, reset_resilience):
+        """Test that a 429 is retried using the Retry-After delay"""
+        fn = Mock(side_effect=[make_status_error(openai.RateLimitError, 429, {'retry-after': '2'}), 'ok'])
+
+        assert call_with_resilience('main', fn, stage='rewrite') == 'ok'
+        assert fn.call_count == 2
+        delay = reset_resilience.call_args[0][0]
+        assert 2 <= delay <= 2.5
+        assert resilience_counters.snapshot()['retries'] == {'main': 1}
+
+    def test_gives_up_after_max_attempts(self):
+        """Test that the last transient error is raised once attempts run out"""
+        fn = Mock(side_effect=make_status_error(openai.InternalServerError, 500))
+
+        with pytest.raises(openai.InternalServerError):
+            call_with_resilience('main', fn)
+        assert fn.call_count == 3
+        assert resilience_counters.snapshot()['retries_exhausted'] == {'main': 1}
+
+    def test_non_transient_error_not_retried(self):
+        """Test that client errors are raised immediately"""
+        fn = Mock(side_effect=make_status_error(openai.BadRequestError, 400))
+
+        with pytest.raises(openai.BadRequestError):
+            call_with_resilience('main', fn)
+        assert fn.call_count == 1
+
+    def test_long_retry_after_not_waited(self, reset_resilience):
+        """Test that a Retry-After beyond the max delay fails without sleeping"""
+        fn = Mock(side_effect=make_status_error(openai.RateLimitError, 429, {'retry-after': '120'}))
+
+        with pytest.raises(openai.RateLimitError):
+            call_with_resilience('main', fn)
+        assert fn.call_count == 1
+        reset_resilience.assert_not_called()
+
+
+class TestCircuitBreaker:
+    """Test the per-deployment circuit breaker"""
+
+    def test_opens_after_threshold_and_rejects(self, monkeypatch):
+        """Test that repeated failures open the circuit and calls fail fast"""
+        monkeypatch.setenv('LLM_MAX_ATTEMPTS', '1')
+        monkeypatch.setenv('CIRCUIT_FAILURE_THRESHOLD', '2')
+        failing = Mock(side_effect=make_status_error(openai.InternalServerError, 503))
+
+        for _ in range(2):
+            with pytest.raises(openai.InternalServerError):
+                call_with_resilience('main', failing)
+
+        healthy = Mock(return_value='ok')
+        with pytest.raises(CircuitOpenError):
+            call_with_resilience('main', healthy)
+        healthy.assert_not_called()
+        assert resilience.circuit_states() == {'main': 'open'}
+
+    def test_half_open_probe_closes_circuit(self):
+        """Test that a successful probe after the timeout closes the circuit"""
+        breaker = CircuitBreaker('main', failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        assert not breaker.allow()
+
+        breaker.opened_until = 0
+        assert breaker.allow()
+        assert not breaker.allow()  # only one probe at a time
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow()
+
+    def test_non_transient_error_leaves_circuit_state(self):
+        """Test that a client error during a half-open probe neither closes nor reopens the circuit"""
+        breaker = resilience.get_circuit_breaker('main')
+        breaker.state = CircuitBreaker.OPEN
+        breaker.opened_until = 0
+        fn = Mock(side_effect=make_status_error(openai.BadRequestError, 400))
+
+        with pytest.raises(openai.BadRequestError):
+            call_with_resilience('main', fn)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        # The probe slot is released for the next call
+        assert breaker.allow()
+
+    async def test_cancelled_probe_is_released(self):
+        """Test that cancelling a half-open probe frees the probe slot"""
+        breaker = resilience.get_circuit_breaker('main')
+        breaker.state = CircuitBreaker.OPEN
+        breaker.opened_until = 0
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        task = asyncio.create_task(acall_with_resilience('main', hang))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed probe reopens the circuit"""
+        breaker = CircuitBreaker('main', failure_threshold=3, reset_timeout=30)
+        breaker.state = CircuitBreaker.OPEN
+        breaker.opened_until = 0
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.retry_after() > 0
+
+
+class TestErrorStatus:
+    """Test mapping exceptions to function responses"""
+
+    def test_rate_limit_maps_to_429(self):
+        """Test that rate limits return 429 with the service's Retry-After"""
+        error = make_status_error(openai.RateLimitError, 429, {'retry-after': '12'})
+        assert error_status(error) == (429, 12)
+
+    def test_open_circuit_maps_to_503(self):
+        """Test that an open circuit returns 503"""
+        assert error_status(CircuitOpenError('main', 25.4)) == (503, 25)
+
+    def test_server_error_maps_to_503(self):
+        """Test that transient server errors return 503 with a default hint"""
+        error = make_status_error(openai.InternalServerError, 502)
+        assert is_transient_error(error)
+        assert error_status(error) == (503, 10)
+
+    def test_other_errors_map_to_500(self):
+        """Test that everything else is a plain 500"""
+        assert error_status(ValueError('bad')) == (500, None)
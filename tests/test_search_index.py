@@ -0,0 +1,104 @@
+"""
+Unit tests for the article search index
+"""
+import pytest
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.search_index import SearchIndex, tokenize
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add_document('trusts.docx', 'Living Trusts Explained', 'Why a revocable trust avoids probate',
+                       'A living trust holds your assets during your lifetime.')
+    index.add_document('wills.docx', 'Writing a Will', 'The basics of a last will',
+                       'A will names guardians and is reviewed in probate court. Trusts are covered elsewhere.')
+    index.add_document('taxes.docx', 'Estate Taxes', 'Federal estate tax thresholds',
+                       'Most families never owe estate tax.')
+    return index
+
+
+class TestTokenize:
+    """Test query and document tokenization"""
+
+    def test_tokenize(self):
+        """Test that tokens are lowercased without stopwords or apostrophes"""
+        assert tokenize("Don't forget the Trust!") == ['dont', 'forget', 'trust']
+
+
+class TestSearchIndex:
+    """Test ranking, prefix search, suggestions and updates"""
+
+    def test_title_match_ranks_first(self, index):
+        """Test that a title match outranks a body match"""
+        results = index.search('trusts', prefix=False)
+        assert [result['id'] for result in results] == ['trusts.docx', 'wills.docx']
+        assert results[0]['title'] == 'Living Trusts Explained'
+
+    def test_all_terms_rank_above_some(self, index):
+        """Test that documents matching more query terms rank higher"""
+        results = index.search('probate court', prefix=False)
+        assert results[0]['id'] == 'wills.docx'
+
+    def test_prefix_search(self, index):
+        """Test that the last term matches as a prefix while typing"""
+        assert [result['id'] for result in index.search('esta')] == ['taxes.docx']
+        assert index.search('esta', prefix=False) == []
+
+    def test_no_match(self, index):
+        """Test that unknown and stopword-only queries return nothing"""
+        assert index.search('zebra') == []
+        assert index.search('the and') == []
+
+    def test_suggest(self, index):
+        """Test that suggestions complete the last word, most common first, and keep the others"""
+        assert index.suggest('tru') == ['trusts', 'trust']
+        assert index.suggest('living tru') == ['living trusts', 'living trust']
+        assert index.suggest('') == []
+
+    def test_replace_and_remove(self, index):
+        """Test that re-adding replaces a document and removal drops its terms"""
+        index.add_document('taxes.docx', 'Gift Taxes', '', 'Annual exclusion.')
+        assert index.search('estate', prefix=False) == []
+        assert index.search('gift')[0]['id'] == 'taxes.docx'
+
+        index.remove_document('taxes.docx')
+        assert 'taxes.docx' not in index
+        assert index.search('gift') == []
+        assert index.snapshot()['documents'] == 2
+
+    def test_sync_indexes_only_changes(self):
+        """Test that sync re-indexes changed documents and drops removed ones"""
+        index = SearchIndex()
+        loaded = []
+
+        def load(doc_id):
+            loaded.append(doc_id)
+            return {'title': doc_id, 'body': f"body of {doc_id}"}
+
+        source = object()
+        assert index.sync(source, lambda: {'a': 1, 'b': 1}, load) == 2
+        assert index.sync(source, lambda: {'a': 1, 'b': 2}, load) == 0
+
+        assert index.sync(object(), lambda: {'a': 1, 'c': 1}, load) == 2
+        assert loaded == ['a', 'b', 'c']
+        assert 'b' not in index
+        assert 'c' in index
+
+    def test_query_latency(self):
+        """Test that queries over a large library stay fast"""
+        index = SearchIndex()
+        words = [f"word{n}" for n in range(2000)]
+        for n in range(1000):
+            body = ' '.join(words[(n * 7 + i) % len(words)] for i in range(300))
+            index.add_document(f"article{n}.docx", f"Article {n} word{n}", '', body)
+
+        start = time.perf_counter()
+        for _ in range(20):
+            index.search('word12 word4')
+        assert (time.perf_counter() - start) / 20 < 0.05
@@ -0,0 +1,90 @@
+"""
+Unit tests for section splitting and splicing
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.section_splice import (
+    clean_section_output, get_section, section_context, splice_section, split_sections
+)
+
+ARTICLE = (
+    "Weekly hook text.\n\n"
+    "Short summary. Read more...\n\n"
+    "**Date: March 04, 2025**\n\n"
+    "# Protect Your Family\n\n"
+    "Intro paragraph.\n\n"
+    "## Why Plan\n\n"
+    "Planning matters.\n\n"
+    "More reasons.\n\n"
+    "## Next Steps\n\n"
+    "Talk to an advisor.\n\n"
+    "Schedule your complimentary 15-minute Discovery Call today.\n\n"
+    "*This article is a service of the firm.*"
+)
+
+
+class TestSplitSections:
+    """Test finding regenerable sections"""
+
+    def test_kinds_and_headings(self):
+        """Test that the title, ## sections and CTA are found in order"""
+        sections = split_sections(ARTICLE)
+        assert [(s['id'], s['kind'], s['heading']) for s in sections] == [
+            (0, 'title', 'Protect Your Family'),
+            (1, 'section', 'Why Plan'),
+            (2, 'section', 'Next Steps'),
+            (3, 'cta', 'Call to action'),
+        ]
+
+    def test_offsets_cover_section_text(self):
+        """Test that offsets slice the section text out of the article"""
+        for section in split_sections(ARTICLE):
+            assert ARTICLE[section['start']:section['end']] == section['text']
+        assert get_section(ARTICLE, 1)['text'] == "## Why Plan\n\nPlanning matters.\n\nMore reasons."
+
+    def test_stops_at_disclaimer(self):
+        """Test that nothing after the disclaimer is offered"""
+        content = "# Title\n\n## A\n\nText\n\n*This article is a service of the firm.*\n\n## After"
+        assert [s['heading'] for s in split_sections(content)] == ['Title', 'A']
+
+    def test_missing_section(self):
+        """Test that unknown ids return None"""
+        assert get_section(ARTICLE, 10) is None
+        assert get_section(ARTICLE, -1) is None
+
+
+class TestRegeneration:
+    """Test context building, output cleanup and splicing"""
+
+    def test_context_outline(self):
+        """Test that the outline marks the section being regenerated"""
+        context = section_context(ARTICLE, get_section(ARTICLE, 2))
+        assert "## Next Steps  <-- this section" in context['outline']
+        assert context['outline'].startswith("# Protect Your Family")
+        assert context['before'].endswith("More reasons.")
+        assert context['after'].startswith("Schedule your complimentary")
+
+    def test_clean_title(self):
+        """Test that a title is reduced to a single # line"""
+        title = get_section(ARTICLE, 0)
+        assert clean_section_output(title, "## New Title\n\nextra") == "# New Title"
+
+    def test_clean_section_keeps_heading(self):
+        """Test that a missing heading is restored and fences stripped"""
+        section = get_section(ARTICLE, 1)
+        assert clean_section_output(section, "```markdown\nNew body.\n```") == "## Why Plan\n\nNew body."
+        assert clean_section_output(section, "### Better\n\nBody") == "## Better\n\nBody"
+
+    def test_splice_round_trip(self):
+        """Test that only the chosen section changes"""
+        section = get_section(ARTICLE, 1)
+        result = splice_section(ARTICLE, section, "## Why Plan\n\nRewritten.")
+        assert "Rewritten." in result
+        assert "Planning matters." not in result
+        assert result.startswith(ARTICLE[:section['start']])
+        assert result.endswith(ARTICLE[section['end']:])
+        assert [s['heading'] for s in split_sections(result)] == [s['heading'] for s in split_sections(ARTICLE)]
@@ -0,0 +1,91 @@
+"""
+Unit tests for local change metrics between source and rewrite
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import text_diff
+from utils.text_diff import align_paragraphs, change_metrics, shingles, tokenize
+
+SOURCE = (
+    "Estate planning protects the people you love from court and conflict.\n\n"
+    "A will alone is not enough to keep your family out of probate court.\n\n"
+    "Schedule a call with our office to get started today."
+)
+
+
+class TestTokenize:
+    """Test tokenization"""
+
+    def test_strips_markdown_and_case(self):
+        """Test that markdown markers and case are ignored"""
+        assert tokenize("## **Estate** Planning's _basics_") == ['estate', "planning's", 'basics']
+
+    def test_shingles_short_text(self):
+        """Test that text shorter than the shingle size is one shingle"""
+        assert shingles(['a', 'b'], 5) == {('a', 'b')}
+        assert shingles([], 5) == set()
+
+
+class TestChangeMetrics:
+    """Test change percentage, retained sentences and alignment"""
+
+    def test_identical_text_has_no_change(self):
+        """Test that an unchanged article reports 0% change"""
+        metrics = change_metrics(SOURCE, SOURCE)
+        assert metrics['change_percentage'] == 0.0
+        assert metrics['similarity'] == 1.0
+        assert metrics['retained_sentences'] == 3
+        assert not metrics['meets_minimum']
+
+    def test_full_rewrite(self):
+        """Test that a completely different article reports 100% change"""
+        rewrite = "Trusts help families avoid lengthy delays.\n\nBook your discovery call now."
+        metrics = change_metrics(SOURCE, rewrite)
+        assert metrics['change_percentage'] == 100.0
+        assert metrics['retained_sentences'] == 0
+        assert metrics['meets_minimum']
+        assert metrics['method'] == 'tokens'
+
+    def test_partial_rewrite(self):
+        """Test that keeping one paragraph gives a partial change"""
+        rewrite = (
+            "# Why Planning Matters\n\n"
+            "A will alone is not enough to keep your family out of probate court.\n\n"
+            "Trusts and guardianship nominations let you decide who cares for your children."
+        )
+        metrics = change_metrics(SOURCE, rewrite)
+        assert 30 < metrics['change_percentage'] < 80
+        assert metrics['retained_sentences'] == 1
+        assert metrics['near_copy_paragraphs'] == 1
+
+    def test_empty_rewrite(self):
+        """Test that an empty rewrite does not divide by zero"""
+        assert change_metrics(SOURCE, "")['change_percentage'] == 0.0
+
+    def test_long_texts_use_shingles(self, monkeypatch):
+        """Test that long texts switch to shingle containment"""
+        monkeypatch.setattr(text_diff, 'TOKEN_DIFF_LIMIT', 10)
+        metrics = change_metrics(SOURCE, SOURCE)
+        assert metrics['method'] == 'shingles'
+        assert metrics['change_percentage'] == 0.0
+
+
+class TestAlignParagraphs:
+    """Test paragraph alignment"""
+
+    def test_aligns_reordered_paragraphs(self):
+        """Test that each paragraph maps to its source position"""
+        paragraphs = SOURCE.split('\n\n')
+        reordered = '\n\n'.join([paragraphs[2], paragraphs[0]])
+        alignment = align_paragraphs(SOURCE, reordered)
+        assert [a['original_index'] for a in alignment] == [2, 0]
+        assert all(a['similarity'] == 1.0 for a in alignment)
+
+    def test_unmatched_paragraph(self):
+        """Test that a new paragraph has no source match"""
+        alignment = align_paragraphs(SOURCE, "Completely unrelated words here.")
+        assert alignment[0]['original_index'] is None
@@ -0,0 +1,129 @@
+"""
+Unit tests for pre-flight token estimation and per-stage budgets
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_app.shared import token_budget
+from function_app.shared.token_budget import (
+    estimate_tokens, get_budget, trim_text, apply_budget, TRIM_MARKER, TokenBudgetError
+)
+
+
+@pytest.fixture(autouse=True)
+def heuristic_tokenizer(monkeypatch):
+    """Use the character heuristic so results do not depend on tiktoken"""
+    monkeypatch.setattr(token_budget, '_encoding', None)
+    monkeypatch.setattr(token_budget, '_encoding_loaded', True)
+
+
+class TestEstimateTokens:
+    """Test token estimation"""
+
+    def test_empty_text_is_zero(self):
+        """Test that empty input has no tokens"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens(None) == 0
+
+    def test_heuristic_rounds_up(self):
+        """Test that the heuristic uses four characters per token"""
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+
+
+class TestBudgets:
+    """Test budget lookup and overrides"""
+
+    def test_default_budget(self):
+        """Test that known stages have input and output limits"""
+        budget = get_budget('summary')
+        assert budget['max_input_tokens'] > 0
+        assert budget['max_output_tokens'] > 0
+
+    def test_env_override(self, monkeypatch):
+        """Test that TOKEN_BUDGETS overrides individual values"""
+        monkeypatch.setenv('TOKEN_BUDGETS', '{"summary": {"max_output_tokens": 50}}')
+        budget = get_budget('summary')
+        assert budget['max_output_tokens'] == 50
+        assert budget['max_input_tokens'] == token_budget.DEFAULT_STAGE_BUDGETS['summary']['max_input_tokens']
+
+    def test_invalid_override_is_ignored(self, monkeypatch):
+        """Test that malformed TOKEN_BUDGETS falls back to defaults"""
+        monkeypatch.setenv('TOKEN_BUDGETS', 'not json')
+        assert get_budget('edit') == token_budget.DEFAULT_STAGE_BUDGETS['edit']
+
+
+class TestTrimming:
+    """Test trimming text and messages to budgets"""
+
+    def test_text_within_budget_is_untouched(self):
+        """Test that short text is returned unchanged"""
+        assert trim_text("short text", 100) == ("short text", False)
+
+    def test_trim_keeps_head_and_tail(self):
+        """Test that trimming keeps the first and last paragraphs"""
+        paragraphs = [f"Paragraph {i} " + "x" * 80 for i in range(20)]
+        trimmed, was_trimmed = trim_text('\n\n'.join(paragraphs), 200)
+
+        assert was_trimmed is True
+        assert trimmed.startswith("Paragraph 0")
+        assert trimmed.rstrip().endswith(paragraphs[-1])
+        assert TRIM_MARKER in trimmed
+        assert estimate_tokens(trimmed) <= 200
+
+    def test_single_long_paragraph_is_cut(self):
+        """Test that a paragraph larger than the budget is hard cut"""
+        trimmed, was_trimmed = trim_text("y" * 4000, 100)
+        assert was_trimmed is True
+        assert estimate_tokens(trimmed) <= 100
+
+    def test_apply_budget_sets_output_limit(self):
+        """Test that small requests pass through with an output limit"""
+        messages = [{"role": "user", "content": "hello"}]
+        result, max_output = apply_budget('summary', messages)
+        assert result == messages
+        assert max_output == get_budget('summary')['max_output_tokens']
+
+    def test_apply_budget_drops_old_turns_first(self, monkeypatch):
+        """Test that old conversation turns are dropped before trimming"""
+        monkeypatch.setenv('TOKEN_BUDGETS', '{"edit": {"max_input_tokens": 600}}')
+        messages = [{"role": "system", "content": "You are an editor."}]
+        for i in range(10):
+            messages.append({"role": "assistant", "content": f"version {i} " + "z" * 400})
+            messages.append({"role": "user", "content": f"instruction {i}"})
+
+        result, _ = apply_budget('edit', messages)
+
+        assert result[0]['role'] == 'system'
+        assert result[-1]['content'] == "instruction 9"
+        assert len(result) < len(messages)
+        assert token_budget.estimate_messages_tokens(result) <= 600
+        # The caller's list is not modified
+        assert len(messages) == 21
+
+    def test_apply_budget_never_trims_system_prompt(self, monkeypatch):
+        """Test that the article is trimmed at paragraph boundaries even when the system prompt is larger"""
+        monkeypatch.setenv('TOKEN_BUDGETS', '{"rewrite": {"max_input_tokens": 1200}}')
+        system_prompt = "Rules. " + "r" * 2400
+        article = '\n\n'.join(f"Paragraph {i} " + "a" * 200 for i in range(30))
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": article}]
+
+        result, _ = apply_budget('rewrite', messages)
+
+        assert result[0]['content'] == system_prompt
+        assert TRIM_MARKER in result[1]['content']
+        kept = result[1]['content'].replace(TRIM_MARKER, '\n\n').split('\n\n')
+        assert all(paragraph in article.split('\n\n') for paragraph in kept)
+        assert token_budget.estimate_messages_tokens(result) <= 1200
+
+    def test_apply_budget_raises_when_unfittable(self, monkeypatch):
+        """Test that a system prompt or single paragraph over the budget raises instead of being cut"""
+        monkeypatch.setenv('TOKEN_BUDGETS', '{"rewrite": {"max_input_tokens": 300}}')
+        with pytest.raises(TokenBudgetError):
+            apply_budget('rewrite', [{"role": "system", "content": "s" * 4000}])
+        with pytest.raises(TokenBudgetError):
+            apply_budget('rewrite', [{"role": "system", "content": "Rules."},
+                                     {"role": "user", "content": "one paragraph " * 400}])
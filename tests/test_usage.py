@@ -0,0 +1,89 @@
+"""
+Unit tests for token usage accounting
+"""
+import pytest
+from unittest.mock import Mock, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from function_app.shared.usage import UsageRecorder
+from function_app.shared.llm import chat_completion, image_generation
+
+
+def make_response(prompt_tokens, completion_tokens):
+    """Build a fake chat completion response with usage"""
+    response = Mock()
+    response.usage = Mock(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                          total_tokens=prompt_tokens + completion_tokens)
+    return response
+
+
+class TestUsageRecorder:
+    """Test per-stage usage recording"""
+
+    def test_record_reads_response_usage(self):
+        """Test that record copies token counts from the response"""
+        recorder = UsageRecorder()
+        entry = recorder.record('rewrite', 'gpt-4o', make_response(100, 50), latency_ms=1200)
+
+        assert entry['stage'] == 'rewrite'
+        assert entry['deployment'] == 'gpt-4o'
+        assert entry['prompt_tokens'] == 100
+        assert entry['completion_tokens'] == 50
+        assert entry['total_tokens'] == 150
+        assert entry['latency_ms'] == 1200
+
+    def test_record_handles_missing_usage(self):
+        """Test that responses without usage record zero tokens"""
+        recorder = UsageRecorder()
+        entry = recorder.record('image', 'dalle-3', Mock(usage=None), images=1)
+
+        assert entry['total_tokens'] == 0
+        assert entry['images'] == 1
+
+    def test_totals_sum_all_stages(self):
+        """Test that totals aggregate across stages and list deployments"""
+        recorder = UsageRecorder()
+        recorder.record('rewrite', 'gpt-4o', make_response(100, 50))
+        recorder.record('summary', 'gpt-4o-mini', make_response(20, 10))
+
+        usage = recorder.to_dict()
+
+        assert usage['prompt_tokens'] == 120
+        assert usage['completion_tokens'] == 60
+        assert usage['total_tokens'] == 180
+        assert usage['deployments'] == ['gpt-4o', 'gpt-4o-mini']
+        assert len(usage['stages']) == 2
+
+
+class TestChatCompletion:
+    """Test the chat completion wrapper"""
+
+    def test_chat_completion_records_stage(self, monkeypatch):
+        """Test that chat_completion records usage under the given stage"""
+        monkeypatch.setenv('AZURE_OPENAI_DEPLOYMENT', 'test-deployment')
+        client = MagicMock()
+        client.chat.completions.create.return_value = make_response(10, 5)
+        recorder = UsageRecorder()
+
+        chat_completion(client, 'summary', [{"role": "user", "content": "hi"}], usage=recorder, temperature=0.7)
+
+        client.chat.completions.create.assert_called_once()
+        assert client.chat.completions.create.call_args.kwargs['model'] == 'test-deployment'
+        assert recorder.records[0]['stage'] == 'summary'
+        assert recorder.records[0]['total_tokens'] == 15
+
+    def test_image_generation_counts_images(self, monkeypatch):
+        """Test that image_generation records the number of images returned"""
+        monkeypatch.setenv('AZURE_DALLE_DEPLOYMENT', 'test-dalle')
+        client = MagicMock()
+        client.images.generate.return_value = Mock(data=[Mock(url='https://example.com/a.png')], usage=None)
+        recorder = UsageRecorder()
+
+        image_generation(client, 'a prompt', usage=recorder, n=1)
+
+        assert recorder.records[0]['stage'] == 'image'
+        assert recorder.records[0]['deployment'] == 'test-dalle'
+        assert recorder.records[0]['images'] == 1
@@ -0,0 +1,145 @@
+"""
+Per-process cache of the article catalog shown on the dashboard.
+
+Building the catalog takes two database queries, a directory listing and
+parsing metadata.json. It only changes when articles are uploaded or the
+article files are edited, so it is built once per process and rebuilt when
+its version stamp changes. The stamp is the modification times of:
+
+- a version file bumped by the app after writing to the articles table
+  (so every worker process notices an upload)
+- the DOCX directory (articles added or removed)
+- metadata.json
+
+The stamp is checked at most every ARTICLE_CATALOG_CHECK_SECONDS, so in
+steady state a dashboard render does no I/O for the listing. Database edits
+made outside the app are picked up after ARTICLE_CATALOG_MAX_AGE_SECONDS.
+"""
+import os
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Catalog = Tuple[List[str], Dict[str, Dict[str, Any]]]
+
+
+class ArticleCatalog:
+    """Article list and metadata, cached until the version stamp changes."""
+
+    def __init__(self, loader: Callable[[], Catalog], version_path: str, watched_paths: List[str],
+                 check_seconds: Optional[float] = None, max_age_seconds: Optional[float] = None):
+        """
+        Args:
+            loader: Builds (article filenames, metadata by filename) from the sources
+            version_path: File bumped by bump_version() after writes
+            watched_paths: Files or directories whose modification time is part of the stamp
+            check_seconds: Minimum interval between stamp checks
+            max_age_seconds: Rebuild at least this often
+        """
+        self.loader = loader
+        self.version_path = version_path
+        self.watched_paths = watched_paths
+        self.check_seconds = check_seconds if check_seconds is not None else \
+            float(os.getenv("ARTICLE_CATALOG_CHECK_SECONDS", "30"))
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else \
+            float(os.getenv("ARTICLE_CATALOG_MAX_AGE_SECONDS", "3600"))
+        self._lock = threading.Lock()
+        # Called (without arguments) whenever the stamp changes, e.g. to clear derived caches
+        self._listeners: List[Callable[[], None]] = []
+        self._catalog: Optional[Catalog] = None
+        self._stamp = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._counts = {'hits': 0, 'checks': 0, 'rebuilds': 0}
+
+    def _current_stamp(self) -> Tuple[Optional[int], ...]:
+        stamp = []
+        for path in [self.version_path] + self.watched_paths:
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Call ``callback`` whenever the articles change."""
+        self._listeners.append(callback)
+
+    def check(self) -> bool:
+        """
+        Compare the version stamp with the one the catalog was built from.
+
+        Checks at most every check_seconds; a changed stamp drops the catalog
+        and notifies listeners.
+
+        Returns:
+            True if the articles changed
+        """
+        now = time.time()
+        with self._lock:
+            if now - self._checked_at < self.check_seconds:
+                return False
+            stamp = self._current_stamp()
+            self._checked_at = now
+            self._counts['checks'] += 1
+            changed = stamp != self._stamp or now - self._loaded_at >= self.max_age_seconds
+            if changed:
+                self._catalog = None
+                self._stamp = stamp
+                self._loaded_at = now
+        if changed:
+            self._notify()
+        return changed
+
+    def get(self) -> Catalog:
+        """
+        The catalog, rebuilt first if its stamp changed.
+
+        Returns:
+            Tuple of (article filenames, metadata by filename); treat as read-only
+        """
+        self.check()
+        with self._lock:
+            if self._catalog is not None:
+                self._counts['hits'] += 1
+                return self._catalog
+
+            # Rebuild under the lock so concurrent requests wait for one load
+            self._catalog = self.loader()
+            self._counts['rebuilds'] += 1
+            logger.info(f"Article catalog rebuilt: {len(self._catalog[0])} articles")
+            return self._catalog
+
+    def invalidate(self):
+        """Rebuild on the next get() in this process."""
+        with self._lock:
+            self._catalog = None
+        self._notify()
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Article catalog listener failed: {str(e)}")
+
+    def bump_version(self):
+        """Mark the catalog changed for every process (call after writing to the articles table)."""
+        try:
+            with open(self.version_path, 'w', encoding='utf-8') as f:
+                f.write(str(time.time_ns()))
+        except OSError as e:
+            logger.warning(f"Could not bump article catalog version: {str(e)}")
+        self.invalidate()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Catalog size, age and hit/check/rebuild counters."""
+        with self._lock:
+            return {
+                'articles': len(self._catalog[0]) if self._catalog else 0,
+                'age_seconds': round(time.time() - self._loaded_at, 1) if self._catalog else None,
+                **self._counts,
+            }
@@ -0,0 +1,175 @@
+"""
+Materialized projections of source articles.
+
+Request paths need an article in several forms: plain text for the
+generation prompt, markdown and HTML for the review and preview panes, and
+the preserved section offsets. These used to be derived from the stored
+markdown or the DOCX file on every request. They are now built once when
+an article is ingested (upload, DOCX sync, or the first read of an article
+that predates projections), stored next to the article, and served from a
+per-process LRU cache:
+
+- ``plain_text``: text sent for generation
+- ``markdown``: markdown shown in the review pane (None for DOCX-only files)
+- ``html``: sanitized HTML rendering of the markdown
+- ``word_count``
+- ``content_hash``: SHA-256 of the plain text and markdown
+- ``section_offsets``: preserved section offsets (see utils.article_sections)
+
+Stored projections carry PROJECTION_VERSION; bump it when the way a
+projection is built changes so stale ones are rebuilt on read.
+"""
+import os
+import re
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import markdown
+from bs4 import BeautifulSoup
+
+from .article_sections import compute_section_offsets, markdown_to_source_text
+
+logger = logging.getLogger(__name__)
+
+PROJECTION_VERSION = 1
+
+# Markup that must never reach the page from an article
+_UNSAFE_TAGS = ('script', 'style', 'iframe', 'object', 'embed', 'form', 'input', 'button', 'link', 'meta')
+_UNSAFE_URL_RE = re.compile(r'^\s*(javascript|vbscript|data):', re.IGNORECASE)
+
+
+def sanitize_html(html: str) -> str:
+    """
+    Remove active content from rendered article HTML.
+
+    Drops script-like elements, event handler attributes and javascript:/data:
+    URLs; everything markdown produces for an article is kept.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup.find_all(_UNSAFE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        for attribute in list(tag.attrs):
+            value = tag.attrs[attribute]
+            if attribute.lower().startswith('on'):
+                del tag.attrs[attribute]
+            elif attribute.lower() in ('href', 'src') and isinstance(value, str) and _UNSAFE_URL_RE.match(value):
+                del tag.attrs[attribute]
+    return str(soup)
+
+
+def build_projections(markdown_content: Optional[str], plain_text: Optional[str] = None,
+                      section_offsets: Optional[Any] = None, markers: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    Build every projection of an article.
+
+    Args:
+        markdown_content: Stored markdown (None for DOCX files without a markdown copy)
+        plain_text: Text sent for generation; derived from the markdown when omitted
+        section_offsets: Offsets already indexed for the article; computed when omitted
+        markers: Section markers (defaults to utils.article_sections.SECTION_MARKERS)
+
+    Returns:
+        Dict of projections (see module docstring)
+    """
+    if plain_text is None:
+        if markdown_content is None:
+            raise ValueError("An article needs markdown or plain text")
+        plain_text = markdown_to_source_text(markdown_content)
+    if section_offsets is None:
+        section_offsets = compute_section_offsets(plain_text, markers)
+
+    digest = hashlib.sha256(plain_text.encode('utf-8'))
+    digest.update((markdown_content or '').encode('utf-8'))
+    return {
+        'version': PROJECTION_VERSION,
+        'plain_text': plain_text,
+        'markdown': markdown_content,
+        'html': sanitize_html(markdown.markdown(markdown_content if markdown_content is not None else plain_text)),
+        'word_count': len(plain_text.split()),
+        'content_hash': digest.hexdigest(),
+        'section_offsets': section_offsets,
+    }
+
+
+def is_current(projections: Optional[Dict[str, Any]]) -> bool:
+    """True if stored projections were built by this PROJECTION_VERSION."""
+    return bool(projections) and projections.get('version') == PROJECTION_VERSION
+
+
+class ProjectionCache:
+    """Per-process LRU of article projections, filled by a loader on miss."""
+
+    def __init__(self, loader: Callable[[str], Dict[str, Any]], max_entries: Optional[int] = None):
+        """
+        Args:
+            loader: Returns the stored projections for an article filename (raises FileNotFoundError)
+            max_entries: Articles kept in memory
+        """
+        self.loader = loader
+        self.max_entries = max_entries or int(os.getenv("ARTICLE_PROJECTION_CACHE_SIZE", "64"))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._counts = {'hits': 0, 'misses': 0, 'cleared': 0}
+        # Bumped by clear(); a load that started before a clear is not cached
+        self._generation = 0
+
+    def get(self, filename: str) -> Dict[str, Any]:
+        """Projections for an article; treat as read-only."""
+        with self._lock:
+            projections = self._entries.get(filename)
+            if projections is not None:
+                self._entries.move_to_end(filename)
+                self._counts['hits'] += 1
+                return projections
+            self._counts['misses'] += 1
+            generation = self._generation
+
+        projections = self.loader(filename)
+        with self._lock:
+            if generation != self._generation:
+                # The catalog changed while loading; the result may be stale
+                return projections
+            self._entries[filename] = projections
+            self._entries.move_to_end(filename)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return projections
+
+    def warm(self, filenames) -> int:
+        """
+        Load the projections of the first max_entries articles that are not yet cached
+        (building any that are missing); later articles are left to load on demand.
+
+        Args:
+            filenames: Article filenames, most important first
+
+        Returns:
+            Number of articles loaded
+        """
+        loaded = 0
+        for filename in list(filenames)[:self.max_entries]:
+            with self._lock:
+                if filename in self._entries:
+                    continue
+            try:
+                self.get(filename)
+                loaded += 1
+            except Exception as e:
+                logger.warning(f"Could not warm projections for {filename}: {str(e)}")
+        return loaded
+
+    def clear(self):
+        """Drop every cached article (e.g. when the article catalog changes)."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._counts['cleared'] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """Cache size and hit/miss counters."""
+        with self._lock:
+            return {'articles': len(self._entries), 'max_entries': self.max_entries, **self._counts}
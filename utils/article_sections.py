@@ -0,0 +1,200 @@
+"""
+Preserved section indexing for source articles.
+
+The generation pipeline keeps the hook, summary and disclaimer of a source
+article verbatim. Their boundaries are computed once when an article is
+uploaded or synced and stored as character offsets, so generation can slice
+them out directly instead of re-splitting the article on every request.
+
+Offsets are stamped with a version derived from the section markers and the
+length of the text they were computed on; a stale index is ignored and the
+sections are recomputed (see the ``reindex-sections`` CLI command).
+"""
+import re
+import json
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default section markers (paragraph indexes, can be updated based on client requirements)
+SECTION_MARKERS = {
+    'hook': {
+        'start': 0,  # First paragraph
+        'end': 1     # End of first paragraph
+    },
+    'summary': {
+        'start': 1,  # Second paragraph (2-3 lines ending with "read more...")
+        'end': 2     # End of second paragraph
+    },
+    'disclaimer': {
+        'start': -1,  # Last paragraph (disclaimer)
+        'end': None   # End of content
+    }
+}
+
+PARAGRAPH_SEPARATOR = '\n\n'
+
+# A preserved section is a short paragraph; anything longer means the paragraph
+# boundaries did not match the text (e.g. DOCX text joined with single newlines)
+MAX_SECTION_CHARS = 1200
+MAX_SECTION_SHARE = 0.2
+
+
+def markers_version(markers: Dict = None) -> str:
+    """
+    Short stable hash of the section markers.
+
+    Args:
+        markers: Section markers (defaults to SECTION_MARKERS)
+
+    Returns:
+        12 character hex digest; changes whenever the markers change
+    """
+    payload = json.dumps(markers or SECTION_MARKERS, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def markdown_to_source_text(markdown_content: str) -> str:
+    """
+    Convert stored article markdown to the plain text sent for generation.
+
+    Args:
+        markdown_content: Markdown from the articles table
+
+    Returns:
+        Text with headers, bold and italic markers removed
+    """
+    text = re.sub(r'#+\s*', '', markdown_content)  # Remove headers
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Remove bold
+    text = re.sub(r'\*(.*?)\*', r'\1', text)  # Remove italic
+    return text.strip()
+
+
+def paragraph_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Character spans of each paragraph, equivalent to ``text.split('\\n\\n')``.
+
+    Returns:
+        List of (start, end) offsets into ``text``
+    """
+    spans = []
+    start = 0
+    while True:
+        end = text.find(PARAGRAPH_SEPARATOR, start)
+        if end == -1:
+            spans.append((start, len(text)))
+            return spans
+        spans.append((start, end))
+        start = end + len(PARAGRAPH_SEPARATOR)
+
+
+def _paragraph_range(count: int, marker: Dict) -> Optional[Tuple[int, int]]:
+    start = marker['start']
+    end = marker.get('end')
+    if start < 0:
+        start += count
+        end = start + 1 if end is None else end
+    elif end is None:
+        end = start + 1
+    if start < 0 or start >= count:
+        return None
+    return start, min(end, count)
+
+
+def compute_section_offsets(text: str, markers: Dict = None) -> Dict:
+    """
+    Compute the character offsets of each preserved section.
+
+    Args:
+        text: Source article text (as sent to the generation pipeline)
+        markers: Section markers (defaults to SECTION_MARKERS)
+
+    Returns:
+        Dict with ``version``, ``text_length`` and ``sections`` mapping each
+        section name to ``[start, end]`` (or None if the article has no such section)
+    """
+    markers = markers or SECTION_MARKERS
+    spans = paragraph_spans(text)
+    sections = {}
+    for name, marker in markers.items():
+        paragraph_range = _paragraph_range(len(spans), marker)
+        if paragraph_range is None:
+            sections[name] = None
+            continue
+        first, last = paragraph_range
+        sections[name] = [spans[first][0], spans[last - 1][1]]
+
+    return {
+        'version': markers_version(markers),
+        'text_length': len(text),
+        'sections': sections,
+    }
+
+
+def extract_sections(text: str, markers: Dict = None) -> Dict[str, str]:
+    """
+    Extract the preserved sections of an article.
+
+    Returns:
+        Dict mapping each section name to its text ("" if missing)
+    """
+    offsets = compute_section_offsets(text, markers)
+    return _slice(text, offsets['sections'])
+
+
+def sections_from_offsets(text: str, offsets, markers: Dict = None) -> Optional[Dict[str, str]]:
+    """
+    Slice preserved sections out of an article using stored offsets.
+
+    Args:
+        text: Source article text the offsets were computed on
+        offsets: Stored offsets (dict or JSON string) from compute_section_offsets
+        markers: Current section markers (defaults to SECTION_MARKERS)
+
+    Returns:
+        Dict mapping section name to text, or None if the offsets are missing,
+        invalid or stale (markers changed or the text differs)
+    """
+    if not offsets:
+        return None
+    try:
+        if isinstance(offsets, str):
+            offsets = json.loads(offsets)
+        if offsets.get('version') != markers_version(markers):
+            logger.debug("Stored section offsets are stale (markers changed)")
+            return None
+        if offsets.get('text_length') != len(text):
+            logger.debug("Stored section offsets do not match the article text")
+            return None
+        return _slice(text, offsets['sections'])
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid section offsets: {e}")
+        return None
+
+
+def usable_sections(text: str, sections: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """
+    Keep preserved sections only when every one of them is a short paragraph of the text.
+
+    Args:
+        text: Article text the sections were sliced from
+        sections: Sections from extract_sections/sections_from_offsets
+
+    Returns:
+        The sections, or None if any is longer than MAX_SECTION_CHARS or
+        MAX_SECTION_SHARE of the text (the caller then uses the full text)
+    """
+    if not sections:
+        return None
+    limit = min(MAX_SECTION_CHARS, len(text) * MAX_SECTION_SHARE)
+    oversized = {name: len(section) for name, section in sections.items() if len(section.strip()) > limit}
+    if oversized:
+        logger.info(f"Not preserving sections that are not short paragraphs: {oversized} of {len(text)} chars")
+        return None
+    return sections
+
+
+def _slice(text: str, sections: Dict) -> Dict[str, str]:
+    return {name: text[span[0]:span[1]] if span else "" for name, span in sections.items()}
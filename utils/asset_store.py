@@ -0,0 +1,377 @@
+"""
+Store for generated assets (post text and images) with per-user references.
+
+Assets are named after a hash of their content (``blog_<hash>.txt``), so
+two users never collide and saving the same content twice writes one file.
+A SQLite index records which users reference each asset:
+
+- a reference is added when an asset becomes part of a user's post and
+  released when the post moves on (new content, new image, new post)
+- each user's referenced bytes are capped by ASSET_USER_QUOTA_BYTES and the
+  whole store by ASSET_STORE_MAX_BYTES; beyond a cap the least recently
+  used references are released
+- collect_garbage() deletes assets without references once they are older
+  than ASSET_GC_GRACE_SECONDS (so an asset is not removed between being
+  written and referenced); it also runs every ASSET_GC_INTERVAL_SECONDS
+  from put()
+
+Files that predate the index (e.g. ``blog_<timestamp>.txt``) can still be
+read but are never collected.
+
+Bytes live in a pluggable backend selected with ASSET_STORE:
+
+- ``local`` (default): a directory on the web app's disk
+- ``blob``: an Azure Blob Storage container (ASSET_BLOB_CONTAINER), shared
+  by all web app instances
+"""
+import os
+import re
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+import logging
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Asset names are flat (no directories) so they are safe to use in URLs and paths
+_ASSET_NAME_RE = re.compile(r'^[A-Za-z0-9_][A-Za-z0-9_.-]*$')
+
+
+def asset_name(data: bytes, prefix: str, ext: str) -> str:
+    """Content-addressed name for ``data``."""
+    return f"{prefix}_{hashlib.sha256(data).hexdigest()[:24]}.{ext}"
+
+
+def valid_asset_name(name: str) -> bool:
+    """True if ``name`` is a flat file name (no path separators or '..')."""
+    return bool(name) and bool(_ASSET_NAME_RE.match(name)) and '..' not in name
+
+
+class LocalAssetBackend:
+    """Assets as files in a local directory."""
+
+    backend = 'local'
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self.path(name))
+
+    def size(self, name: str) -> int:
+        return os.path.getsize(self.path(name))
+
+    def read(self, name: str) -> bytes:
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def write(self, name: str, data: bytes):
+        # Write to a temporary name first so readers never see a partial file
+        temp_path = self.path(f".{name}.{uuid.uuid4().hex}.tmp")
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self.path(name))
+
+    def delete(self, name: str):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+
+class BlobAssetBackend:
+    """
+    Assets as blobs in an Azure Storage container.
+
+    Uses ASSET_STORE_CONNECTION_STRING (falling back to AzureWebJobsStorage)
+    and the ASSET_BLOB_CONTAINER container.
+    """
+
+    backend = 'blob'
+
+    def __init__(self, connection_string: Optional[str] = None, container: Optional[str] = None):
+        from azure.storage.blob import BlobServiceClient
+        from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+        self._not_found = ResourceNotFoundError
+
+        connection_string = connection_string or os.getenv("ASSET_STORE_CONNECTION_STRING") \
+            or os.getenv("AzureWebJobsStorage")
+        self.container_name = container or os.getenv("ASSET_BLOB_CONTAINER", "generated-assets")
+        self._container = BlobServiceClient.from_connection_string(connection_string) \
+            .get_container_client(self.container_name)
+        try:
+            self._container.create_container()
+        except ResourceExistsError:
+            pass
+
+    def exists(self, name: str) -> bool:
+        return self._container.get_blob_client(name).exists()
+
+    def size(self, name: str) -> int:
+        return self._container.get_blob_client(name).get_blob_properties().size
+
+    def read(self, name: str) -> bytes:
+        try:
+            return self._container.download_blob(name).readall()
+        except self._not_found:
+            raise FileNotFoundError(name)
+
+    def write(self, name: str, data: bytes):
+        self._container.upload_blob(name, data, overwrite=True)
+
+    def delete(self, name: str):
+        try:
+            self._container.delete_blob(name)
+        except self._not_found:
+            pass
+
+
+class AssetStore:
+    """Content-addressed assets of one kind with reference counting, quotas and GC."""
+
+    def __init__(self, kind: str, backend, index_path: str, user_quota_bytes: Optional[int] = None,
+                 max_bytes: Optional[int] = None, grace_seconds: Optional[int] = None,
+                 gc_interval_seconds: Optional[int] = None, on_delete: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            kind: Namespace in the index (e.g. "text", "image")
+            backend: LocalAssetBackend or BlobAssetBackend holding the bytes
+            index_path: SQLite file for the reference index (may be shared between kinds)
+            user_quota_bytes: Referenced bytes allowed per user
+            max_bytes: Referenced bytes allowed in total
+            grace_seconds: Minimum age before an unreferenced asset is deleted
+            gc_interval_seconds: How often put() runs collect_garbage()
+            on_delete: Called with the name of each deleted asset (e.g. to remove derived files)
+        """
+        self.kind = kind
+        self.backend = backend
+        self.index_path = index_path
+        self.user_quota_bytes = user_quota_bytes or int(os.getenv("ASSET_USER_QUOTA_BYTES", str(200 * 1024 * 1024)))
+        self.max_bytes = max_bytes or int(os.getenv("ASSET_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+        self.grace_seconds = grace_seconds if grace_seconds is not None else \
+            int(os.getenv("ASSET_GC_GRACE_SECONDS", "3600"))
+        self.gc_interval_seconds = gc_interval_seconds if gc_interval_seconds is not None else \
+            int(os.getenv("ASSET_GC_INTERVAL_SECONDS", "3600"))
+        self.on_delete = on_delete
+        self._lock = threading.Lock()
+        self._last_gc = time.time()
+        self._counts = {'written': 0, 'deduplicated': 0, 'quota_released': 0, 'collected': 0}
+
+        index_dir = os.path.dirname(index_path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS assets (
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (kind, name)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS asset_refs (
+                    kind TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (kind, owner, name)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_asset_refs_name ON asset_refs (kind, name)")
+
+    def _connect(self):
+        return sqlite3.connect(self.index_path, timeout=10)
+
+    def put(self, owner: Any, data: bytes, prefix: str, ext: str) -> str:
+        """
+        Store ``data`` (once per content) and reference it for ``owner``.
+
+        Returns:
+            The asset name
+        """
+        name = asset_name(data, prefix, ext)
+        with self._lock:
+            with closing(self._connect()) as conn:
+                indexed = conn.execute("SELECT 1 FROM assets WHERE kind = ? AND name = ?",
+                                       (self.kind, name)).fetchone()
+            if indexed and self.backend.exists(name):
+                self._counts['deduplicated'] += 1
+            else:
+                self.backend.write(name, data)
+                self._counts['written'] += 1
+            self._add_ref(owner, name, len(data))
+
+        if time.time() - self._last_gc >= self.gc_interval_seconds:
+            self.collect_garbage()
+        return name
+
+    def add_ref(self, owner: Any, name: str):
+        """Reference an asset written outside the store (e.g. a cached image) for ``owner``."""
+        if not self.backend.exists(name):
+            logger.warning(f"Asset store ({self.kind}): cannot reference missing asset {name}")
+            return
+        size = self.backend.size(name)
+        with self._lock:
+            self._add_ref(owner, name, size)
+
+    def _add_ref(self, owner: Any, name: str, size: int):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR IGNORE INTO assets (kind, name, size, created) VALUES (?, ?, ?, ?)",
+                         (self.kind, name, size, now))
+            conn.execute("INSERT OR REPLACE INTO asset_refs (kind, owner, name, last_used) VALUES (?, ?, ?, ?)",
+                         (self.kind, str(owner), name, now))
+            self._enforce_quota(conn, str(owner), name)
+
+    def _enforce_quota(self, conn, owner: str, keep: str):
+        """Release least recently used references beyond the user and total quotas."""
+        for scope, limit in ((owner, self.user_quota_bytes), (None, self.max_bytes)):
+            owner_filter = "AND r.owner = ?" if scope is not None else ""
+            params = (self.kind, scope) if scope is not None else (self.kind,)
+            # Total counts each asset once, however many users reference it
+            used = conn.execute(f"""
+                SELECT COALESCE(SUM(size), 0) FROM assets a WHERE a.kind = ? AND EXISTS (
+                    SELECT 1 FROM asset_refs r WHERE r.kind = a.kind AND r.name = a.name {owner_filter})
+            """, params).fetchone()[0]
+            if used <= limit:
+                continue
+            rows = conn.execute(f"""
+                SELECT r.owner, r.name, a.size FROM asset_refs r JOIN assets a ON a.kind = r.kind AND a.name = r.name
+                WHERE r.kind = ? {owner_filter} ORDER BY r.last_used
+            """, params).fetchall()
+            for ref_owner, name, size in rows:
+                if used <= limit:
+                    break
+                if name == keep:
+                    continue
+                conn.execute("DELETE FROM asset_refs WHERE kind = ? AND owner = ? AND name = ?",
+                             (self.kind, ref_owner, name))
+                self._counts['quota_released'] += 1
+                # A user's usage drops with their own reference; the store's only once nobody references it
+                if scope is not None or not conn.execute("SELECT 1 FROM asset_refs WHERE kind = ? AND name = ?",
+                                                         (self.kind, name)).fetchone():
+                    used -= size
+            logger.info(f"Asset store ({self.kind}): released references over quota for "
+                        f"{'user ' + scope if scope is not None else 'the store'}")
+
+    def release(self, owner: Any, name: Optional[str]):
+        """Drop ``owner``'s reference to an asset; unreferenced assets are collected later."""
+        if not name:
+            return
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM asset_refs WHERE kind = ? AND owner = ? AND name = ?",
+                         (self.kind, str(owner), name))
+
+    def referenced(self, name: str) -> bool:
+        """True if any user references the asset."""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM asset_refs WHERE kind = ? AND name = ?",
+                                (self.kind, name)).fetchone() is not None
+
+    def usage(self, owner: Any) -> int:
+        """Bytes referenced by ``owner``."""
+        with closing(self._connect()) as conn:
+            return conn.execute("""
+                SELECT COALESCE(SUM(a.size), 0) FROM asset_refs r JOIN assets a ON a.kind = r.kind AND a.name = r.name
+                WHERE r.kind = ? AND r.owner = ?
+            """, (self.kind, str(owner))).fetchone()[0]
+
+    def read(self, name: str) -> bytes:
+        """
+        Read an asset.
+
+        Raises:
+            ValueError: If the name is not a flat asset name
+            FileNotFoundError: If the asset does not exist
+        """
+        if not valid_asset_name(name):
+            raise ValueError(f"Invalid asset name: {name}")
+        return self.backend.read(name)
+
+    def read_text(self, name: str) -> str:
+        """Read a text asset (UTF-8)."""
+        return self.read(name).decode('utf-8')
+
+    def collect_garbage(self) -> List[str]:
+        """
+        Delete assets nobody references that are older than the grace period.
+
+        Returns:
+            Names of the deleted assets
+        """
+        cutoff = time.time() - self.grace_seconds
+        with self._lock:
+            self._last_gc = time.time()
+            with closing(self._connect()) as conn:
+                names = [row[0] for row in conn.execute("""
+                    SELECT name FROM assets a WHERE kind = ? AND created < ? AND NOT EXISTS (
+                        SELECT 1 FROM asset_refs r WHERE r.kind = a.kind AND r.name = a.name)
+                """, (self.kind, cutoff))]
+            deleted = []
+            for name in names:
+                try:
+                    self.backend.delete(name)
+                except Exception as e:
+                    logger.warning(f"Asset store ({self.kind}): could not delete {name}: {str(e)}")
+                    continue
+                with closing(self._connect()) as conn, conn:
+                    conn.execute("DELETE FROM assets WHERE kind = ? AND name = ?", (self.kind, name))
+                deleted.append(name)
+            self._counts['collected'] += len(deleted)
+
+        for name in deleted:
+            if self.on_delete:
+                self.on_delete(name)
+        if deleted:
+            logger.info(f"Asset store ({self.kind}): collected {len(deleted)} unreferenced assets")
+        return deleted
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Asset and reference counts, sizes and counters."""
+        with closing(self._connect()) as conn:
+            assets, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM assets WHERE kind = ?",
+                                         (self.kind,)).fetchone()
+            references, owners = conn.execute("SELECT COUNT(*), COUNT(DISTINCT owner) FROM asset_refs WHERE kind = ?",
+                                              (self.kind,)).fetchone()
+        return {
+            'backend': self.backend.backend,
+            'assets': assets,
+            'bytes': total,
+            'references': references,
+            'owners': owners,
+            'user_quota_bytes': self.user_quota_bytes,
+            'max_bytes': self.max_bytes,
+            **self._counts,
+        }
+
+
+def create_asset_backend(directory: str, backend: Optional[str] = None):
+    """
+    Create the configured asset backend.
+
+    Args:
+        directory: Directory for the local backend
+        backend: "local" or "blob" (defaults to ASSET_STORE)
+
+    Returns:
+        The backend; falls back to local if the backend cannot be created
+    """
+    backend = (backend or os.getenv("ASSET_STORE", "local")).lower()
+    if backend == 'blob':
+        try:
+            return BlobAssetBackend()
+        except Exception as e:
+            logger.error(f"Could not create blob asset backend, using local: {str(e)}")
+    elif backend != 'local':
+        logger.warning(f"Unknown ASSET_STORE '{backend}', using local")
+    return LocalAssetBackend(directory)
@@ -0,0 +1,116 @@
+"""
+Background jobs for slow, user-triggered work.
+
+Image generation takes two model calls and a download (often 20-60 s).
+Instead of holding a web worker for that long, the request submits a job
+and returns its id; the page polls the job until it is done.
+
+Jobs run on a small thread pool and are kept in memory, so a job id is
+only valid on the instance that created it. While a job for the same
+(owner, key) is pending or running, submitting again returns that job
+instead of starting a second one. Finished jobs are dropped after
+JOB_TTL_SECONDS.
+"""
+import os
+import time
+import uuid
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_ERROR = 'error'
+
+
+class Job:
+    """State of one background job."""
+
+    def __init__(self, owner: Any, key: str):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.key = key
+        self.status = JOB_PENDING
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JOB_PENDING, JOB_RUNNING)
+
+
+class JobManager:
+    """Runs jobs on a thread pool and tracks their status by id."""
+
+    def __init__(self, max_workers: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("IMAGE_JOB_WORKERS", "4"))
+        self.ttl_seconds = ttl_seconds or int(os.getenv("JOB_TTL_SECONDS", "3600"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='background-jobs')
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[Tuple[Any, str], Job] = {}
+
+    def submit(self, owner: Any, key: str, fn: Callable[[], Any]) -> Job:
+        """
+        Start ``fn`` in the background unless the same work is already in progress.
+
+        Args:
+            owner: Who the job belongs to (only they may read it)
+            key: Identifies the work, e.g. a content hash
+            fn: Callable run on the pool; its return value becomes the result
+
+        Returns:
+            The new job, or the active job for (owner, key)
+        """
+        with self._lock:
+            self._expire()
+            job = self._active.get((owner, key))
+            if job is not None:
+                return job
+            job = Job(owner, key)
+            self._jobs[job.id] = job
+            self._active[(owner, key)] = job
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Job by id, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, fn: Callable[[], Any]):
+        job.status = JOB_RUNNING
+        try:
+            job.result = fn()
+            job.status = JOB_DONE
+        except Exception as e:
+            logger.error(f"Background job {job.id} failed: {str(e)}", exc_info=True)
+            job.error = e
+            job.status = JOB_ERROR
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get((job.owner, job.key)) is job:
+                    del self._active[(job.owner, job.key)]
+
+    def _expire(self):
+        """Drop finished jobs older than the TTL (caller holds the lock)."""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Number of tracked jobs by status."""
+        with self._lock:
+            counts = {JOB_PENDING: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_ERROR: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
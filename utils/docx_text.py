@@ -0,0 +1,185 @@
+"""
+Streaming text extraction from DOCX files.
+
+python-docx builds an object model of the whole document (lxml tree plus
+proxy objects for every paragraph and run) even when all we want is the
+text. This module streams the main document part straight out of the zip
+with an incremental XML parser and yields each top-level paragraph with its
+style name and runs, discarding the XML as it goes.
+
+The output matches what the python-docx calls used before gave:
+
+- ``Paragraph.text`` is ``paragraph.text``: the text of its runs and
+  hyperlinks, with tabs, line breaks and non-breaking hyphens translated
+- ``Paragraph.runs`` are ``paragraph.runs``: direct runs only (not the
+  runs inside hyperlinks), with their direct bold/italic formatting
+- ``Paragraph.style`` is ``paragraph.style.name``
+- only body paragraphs are yielded, not those in tables (``doc.paragraphs``)
+"""
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Union
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_PACKAGE_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+_STYLES = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles'
+
+_BODY, _P, _R, _HYPERLINK = W + 'body', W + 'p', W + 'r', W + 'hyperlink'
+_OFF_VALUES = ('0', 'false', 'off')
+
+# Built-in style names stored lowercase in styles.xml (python-docx's BabelFish)
+_UI_STYLE_NAMES = {'caption': 'Caption', 'footer': 'Footer', 'header': 'Header',
+                   **{f'heading {n}': f'Heading {n}' for n in range(1, 10)}}
+
+
+class Run(NamedTuple):
+    """A run of text with its direct formatting (None when not set on the run)."""
+    text: str
+    bold: Optional[bool]
+    italic: Optional[bool]
+
+
+class Paragraph(NamedTuple):
+    """A body paragraph."""
+    style: str
+    text: str
+    runs: List[Run]
+
+
+def _on_off(element: Optional[ET.Element]) -> Optional[bool]:
+    if element is None:
+        return None
+    return element.get(W + 'val', 'true').lower() not in _OFF_VALUES
+
+
+def _run_text(run: ET.Element) -> str:
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == W + 't':
+            parts.append(child.text or '')
+        elif tag in (W + 'tab', W + 'ptab'):
+            parts.append('\t')
+        elif tag == W + 'br':
+            parts.append('\n' if child.get(W + 'type', 'textWrapping') == 'textWrapping' else '')
+        elif tag == W + 'cr':
+            parts.append('\n')
+        elif tag == W + 'noBreakHyphen':
+            parts.append('-')
+    return ''.join(parts)
+
+
+def _relationship_targets(archive: zipfile.ZipFile, rels_path: str, base: str) -> Dict[str, str]:
+    """Part names of the relationships in a .rels file, keyed by type."""
+    try:
+        root = ET.fromstring(archive.read(rels_path))
+    except KeyError:
+        return {}
+    return {rel.get('Type'): posixpath.normpath(posixpath.join(base, rel.get('Target', '')).lstrip('/'))
+            for rel in root.iter(_PACKAGE_RELS + 'Relationship') if rel.get('TargetMode') != 'External'}
+
+
+def _document_parts(archive: zipfile.ZipFile):
+    """Names of the main document part and its styles part."""
+    document = _relationship_targets(archive, '_rels/.rels', '').get(_OFFICE_DOCUMENT, 'word/document.xml')
+    directory, name = posixpath.split(document)
+    styles = _relationship_targets(archive, posixpath.join(directory, '_rels', name + '.rels'), directory)
+    return document, styles.get(_STYLES)
+
+
+def _paragraph_styles(archive: zipfile.ZipFile, styles_part: Optional[str]):
+    """Paragraph style names by style id, and the default paragraph style name."""
+    names, default = {}, 'Normal'
+    if not styles_part:
+        return names, default
+    try:
+        root = ET.fromstring(archive.read(styles_part))
+    except KeyError:
+        return names, default
+    for style in root.iter(W + 'style'):
+        if style.get(W + 'type') != 'paragraph':
+            continue
+        name_element = style.find(W + 'name')
+        name = name_element.get(W + 'val') if name_element is not None else None
+        name = _UI_STYLE_NAMES.get(name, name)
+        if name is None:
+            continue
+        names[style.get(W + 'styleId')] = name
+        if style.get(W + 'default') in ('1', 'true', 'on'):
+            default = name
+    return names, default
+
+
+def iter_paragraphs(source: Union[str, BinaryIO]) -> Iterator[Paragraph]:
+    """
+    Stream the body paragraphs of a DOCX file.
+
+    Args:
+        source: Path or binary file-like object
+
+    Yields:
+        Paragraph tuples in document order
+    """
+    with zipfile.ZipFile(source) as archive:
+        document_part, styles_part = _document_parts(archive)
+        style_names, default_style = _paragraph_styles(archive, styles_part)
+
+        with archive.open(document_part) as stream:
+            # Tags of the open elements; a body paragraph is the one directly under w:body
+            stack: List[str] = []
+            body = None
+            style_id = None
+            text: List[str] = []
+            runs: List[Run] = []
+
+            for event, element in ET.iterparse(stream, events=('start', 'end')):
+                if event == 'start':
+                    stack.append(element.tag)
+                    if element.tag == _BODY:
+                        body = element
+                    elif element.tag == _P and len(stack) >= 2 and stack[-2] == _BODY:
+                        style_id, text, runs = None, [], []
+                    continue
+
+                stack.pop()
+                tag = element.tag
+                depth = len(stack)
+                in_body_paragraph = depth >= 2 and stack[-1] == _P and stack[-2] == _BODY
+
+                if tag == _R and in_body_paragraph:
+                    properties = element.find(W + 'rPr')
+                    run_text = _run_text(element)
+                    text.append(run_text)
+                    runs.append(Run(
+                        run_text,
+                        _on_off(properties.find(W + 'b')) if properties is not None else None,
+                        _on_off(properties.find(W + 'i')) if properties is not None else None
+                    ))
+                elif tag == _HYPERLINK and in_body_paragraph:
+                    text.extend(_run_text(run) for run in element.findall(_R))
+                elif tag == W + 'pPr' and in_body_paragraph:
+                    style_element = element.find(W + 'pStyle')
+                    if style_element is not None:
+                        style_id = style_element.get(W + 'val')
+                elif tag == _P and depth >= 1 and stack[-1] == _BODY:
+                    yield Paragraph(style_names.get(style_id, default_style), ''.join(text), runs)
+
+                if body is not None and depth >= 1 and stack[-1] == _BODY:
+                    # Drop each finished body child (paragraph, table, ...) so memory stays flat
+                    body.clear()
+                elif depth >= 2 and stack[-2] == _BODY:
+                    element.clear()
+
+
+def docx_text(source: Union[str, BinaryIO]) -> str:
+    """Plain text of a DOCX file: its body paragraphs joined by newlines."""
+    return "\n".join(paragraph.text for paragraph in iter_paragraphs(source))
+
+
+def heading_level(style: str) -> int:
+    """Heading level of a paragraph style name ("Heading 2" -> 2), 0 for other styles."""
+    if style.startswith('Heading') and style[-1:].isdigit():
+        return int(style[-1])
+    return 0
@@ -0,0 +1,175 @@
+"""
+Responsive variants for generated images.
+
+Generated images arrive as 1024x1024 PNGs (1.5-3 MB). After an image is
+saved, a worker pool produces smaller variants next to it with Pillow:
+
+- WebP and optimized progressive JPEG at each of VARIANT_WIDTHS
+- a square WebP thumbnail
+
+Variant names are derived from the original (``image_<hash>-640.webp``) so
+they are as immutable as the content-addressed original and can be served
+with long-lived cache headers. Until the variants exist, pages fall back to
+the original PNG.
+"""
+import os
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1024)
+THUMBNAIL_SIZE = 160
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'options': {'quality': WEBP_QUALITY, 'method': 4}},
+    'jpeg': {'format': 'JPEG', 'options': {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}},
+}
+
+
+def variant_filename(filename: str, width: int, fmt: str) -> str:
+    """Name of the ``fmt`` variant of ``filename`` at ``width`` pixels."""
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}-{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def thumbnail_filename(filename: str) -> str:
+    """Name of the thumbnail of ``filename``."""
+    return f"{os.path.splitext(filename)[0]}-thumb.webp"
+
+
+def variant_filenames(filename: str) -> List[str]:
+    """All variant and thumbnail names for ``filename``."""
+    names = [variant_filename(filename, width, fmt) for width in VARIANT_WIDTHS for fmt in FORMATS]
+    return names + [thumbnail_filename(filename)]
+
+
+def create_variants(directory: str, filename: str) -> List[str]:
+    """
+    Write the variants and thumbnail of an image.
+
+    Widths larger than the original are skipped. Files are written to a
+    temporary name first so a page never sees a partial variant.
+
+    Args:
+        directory: Directory containing the original
+        filename: Original image filename
+
+    Returns:
+        Names of the files written
+    """
+    written = []
+    with Image.open(os.path.join(directory, filename)) as original:
+        image = original.convert('RGB')
+
+    for width in VARIANT_WIDTHS:
+        if width > image.width:
+            continue
+        height = round(image.height * width / image.width)
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt, spec in FORMATS.items():
+            name = variant_filename(filename, width, fmt)
+            _save_atomic(resized, os.path.join(directory, name), spec['format'], spec['options'])
+            written.append(name)
+
+    thumbnail = ImageOps.fit(image, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+    name = thumbnail_filename(filename)
+    _save_atomic(thumbnail, os.path.join(directory, name), 'WEBP', FORMATS['webp']['options'])
+    written.append(name)
+    return written
+
+
+def _save_atomic(image: Image.Image, path: str, image_format: str, options: Dict):
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    image.save(temp_path, image_format, **options)
+    os.replace(temp_path, path)
+
+
+def remove_variants(directory: str, filename: str):
+    """Delete the variants of an image (e.g. when the original is evicted)."""
+    for name in variant_filenames(filename):
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove image variant {name}: {str(e)}")
+
+
+def image_sources(directory: str, filename: str, url_for_file: Callable[[str], str]) -> Optional[Dict[str, str]]:
+    """
+    Build ``srcset`` strings for the variants that exist.
+
+    Args:
+        directory: Directory containing the images
+        filename: Original image filename
+        url_for_file: Maps a filename in ``directory`` to its URL
+
+    Returns:
+        Dict with ``webp`` and ``jpeg`` srcsets, ``src`` (largest JPEG) and
+        ``thumbnail`` URLs, or None if the variants are not ready
+    """
+    sources = {}
+    for fmt in FORMATS:
+        entries = []
+        for width in VARIANT_WIDTHS:
+            name = variant_filename(filename, width, fmt)
+            if os.path.exists(os.path.join(directory, name)):
+                entries.append((width, name))
+        if not entries:
+            return None
+        sources[fmt] = ', '.join(f"{url_for_file(name)} {width}w" for width, name in entries)
+        if fmt == 'jpeg':
+            sources['src'] = url_for_file(entries[-1][1])
+
+    thumbnail = thumbnail_filename(filename)
+    if os.path.exists(os.path.join(directory, thumbnail)):
+        sources['thumbnail'] = url_for_file(thumbnail)
+    return sources
+
+
+class VariantPipeline:
+    """Creates image variants on a small thread pool, off the request thread."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='image-variants')
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+
+    def submit(self, directory: str, filename: str) -> Optional[Future]:
+        """
+        Queue variant creation for an image unless it is queued or already done.
+
+        Returns:
+            The Future for the job, or None if the variants already exist
+        """
+        path = os.path.join(directory, filename)
+        # The thumbnail is written last, so it marks a completed job
+        if os.path.exists(os.path.join(directory, thumbnail_filename(filename))):
+            return None
+        with self._lock:
+            future = self._pending.get(path)
+            if future is None:
+                future = self._pending[path] = self._executor.submit(self._run, directory, filename)
+            return future
+
+    def _run(self, directory: str, filename: str) -> List[str]:
+        try:
+            written = create_variants(directory, filename)
+            logger.info(f"Created {len(written)} variants for {filename}")
+            return written
+        except Exception as e:
+            logger.error(f"Image variant creation failed for {filename}: {str(e)}", exc_info=True)
+            return []
+        finally:
+            with self._lock:
+                self._pending.pop(os.path.join(directory, filename), None)
+
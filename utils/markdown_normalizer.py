@@ -0,0 +1,239 @@
+"""
+Local markdown normalizer for generated articles.
+
+Parses an article into a flat list of blocks (headings, paragraphs, lists,
+date line, rules) and renders them back with the house formatting rules in
+a single pass:
+
+- ATX headings with one space after the markers (setext headings converted),
+  levels capped at ###, and the first heading promoted to # if the article
+  has no title
+- exactly one blank line between blocks
+- ``__bold__`` -> ``**bold**``, ``_italic_`` -> ``*italic*``
+- bullets written as ``- item``, numbered lists renumbered
+- the date line written as ``**Date: Month DD, YYYY**``
+
+When the preserved sections are given, the article is also put in template
+order: hook, summary, date, heading and body (a repeated CTA paragraph is
+dropped), disclaimer.
+Preserved sections are emitted verbatim.
+"""
+import re
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CTA_PHRASES = ("Click here to schedule", "Book your Discovery Call", "Schedule your complimentary")
+
+DATE_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y", "%d %B %Y",
+                "%Y-%m-%d", "%m/%d/%Y", "%Y.%m.%d")
+DATE_OUTPUT_FORMAT = "%B %d, %Y"
+
+MAX_HEADING_LEVEL = 3
+
+_ATX_HEADING_RE = re.compile(r'^\s{0,3}(#{1,6})\s*(.*?)\s*#*\s*$')
+_SETEXT_RE = re.compile(r'^\s{0,3}(=+|-+)\s*$')
+_RULE_RE = re.compile(r'^\s{0,3}([-*_])(\s*\1){2,}\s*$')
+_LIST_ITEM_RE = re.compile(r'^(\s*)([-*+•–·]|\d+[.)])\s+(.*)$')
+_DATE_RE = re.compile(r'^[*_\s]*date\s*:\s*[*_\s]*(.+?)[*_\s]*$', re.IGNORECASE)
+_BOLD_UNDERSCORE_RE = re.compile(r'__(?=\S)(.+?)(?<=\S)__')
+_ITALIC_UNDERSCORE_RE = re.compile(r'(?<![\w*\\])_(?=\S)(.+?)(?<=\S)_(?![\w*])')
+
+
+class Block:
+    """One markdown block: heading, paragraph, list, date or rule."""
+
+    __slots__ = ('kind', 'lines', 'level', 'title', 'items', 'ordered', 'start')
+
+    def __init__(self, kind: str, lines: Optional[List[str]] = None, level: int = 0, title: str = ''):
+        self.kind = kind
+        self.lines = lines or []
+        self.level = level
+        self.title = title
+        self.items: List[List[str]] = []
+        self.ordered = False
+        self.start = 1
+
+    @property
+    def raw(self) -> str:
+        """Original source text of the block."""
+        return '\n'.join(self.lines).strip()
+
+
+def parse_blocks(content: str) -> List[Block]:
+    """
+    Parse markdown into a flat list of blocks.
+
+    Args:
+        content: Markdown text
+
+    Returns:
+        Blocks in document order
+    """
+    blocks: List[Block] = []
+    current: Optional[Block] = None
+
+    for line in content.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        line = line.rstrip()
+        if not line.strip():
+            current = None
+            continue
+
+        # Setext heading underline turns a one-line paragraph into a heading
+        setext = _SETEXT_RE.match(line)
+        if setext and current is not None and current.kind == 'paragraph' and len(current.lines) == 1:
+            current.kind = 'heading'
+            current.level = 1 if setext.group(1).startswith('=') else 2
+            current.title = current.lines[0].strip()
+            current.lines.append(line)
+            current = None
+            continue
+
+        heading = _ATX_HEADING_RE.match(line)
+        if heading and heading.group(2):
+            blocks.append(Block('heading', [line], level=len(heading.group(1)), title=heading.group(2)))
+            current = None
+            continue
+
+        if _RULE_RE.match(line) and (current is None or current.kind != 'paragraph'):
+            blocks.append(Block('rule', [line]))
+            current = None
+            continue
+
+        item = _LIST_ITEM_RE.match(line)
+        if item:
+            ordered = item.group(2)[0].isdigit()
+            if current is None or current.kind != 'list' or current.ordered != ordered:
+                current = Block('list', [])
+                current.ordered = ordered
+                if ordered:
+                    current.start = int(item.group(2)[:-1])
+                blocks.append(current)
+            current.lines.append(line)
+            current.items.append([item.group(3).strip()])
+            continue
+
+        if current is not None and current.kind == 'list' and line.startswith((' ', '\t')):
+            # Continuation of the previous list item
+            current.lines.append(line)
+            current.items[-1].append(line.strip())
+            continue
+
+        if current is None or current.kind != 'paragraph':
+            current = Block('paragraph', [])
+            blocks.append(current)
+        current.lines.append(line)
+
+    for block in blocks:
+        if block.kind == 'paragraph' and len(block.lines) == 1 and _DATE_RE.match(block.lines[0]):
+            block.kind = 'date'
+    return blocks
+
+
+def normalize_inline(text: str) -> str:
+    """Normalize emphasis markers to ``**bold**`` and ``*italic*``."""
+    text = _BOLD_UNDERSCORE_RE.sub(r'**\1**', text)
+    return _ITALIC_UNDERSCORE_RE.sub(r'*\1*', text)
+
+
+def format_date_line(value: Optional[str] = None, today: Optional[datetime] = None) -> str:
+    """
+    Build the ``**Date: Month DD, YYYY**`` line.
+
+    Args:
+        value: Existing date text; unparseable values are kept as written
+        today: Date to use when no value is given (defaults to now)
+    """
+    if value:
+        for date_format in DATE_FORMATS:
+            try:
+                return f"**Date: {datetime.strptime(value.strip(), date_format).strftime(DATE_OUTPUT_FORMAT)}**"
+            except ValueError:
+                continue
+        return f"**Date: {value.strip()}**"
+    return f"**Date: {(today or datetime.now()).strftime(DATE_OUTPUT_FORMAT)}**"
+
+
+def render_block(block: Block) -> str:
+    """Render a block with the house formatting rules."""
+    if block.kind == 'heading':
+        level = min(block.level, MAX_HEADING_LEVEL)
+        return f"{'#' * level} {normalize_inline(block.title)}"
+    if block.kind == 'list':
+        rendered = []
+        for index, item in enumerate(block.items):
+            marker = f"{block.start + index}." if block.ordered else '-'
+            rendered.append(f"{marker} {normalize_inline(' '.join(item))}")
+        return '\n'.join(rendered)
+    if block.kind == 'date':
+        return format_date_line(_DATE_RE.match(block.lines[0]).group(1))
+    if block.kind == 'rule':
+        return '---'
+    return '\n'.join(normalize_inline(line.strip()) for line in block.lines)
+
+
+def _promote_title(blocks: List[Block]):
+    headings = [b for b in blocks if b.kind == 'heading']
+    if headings and not any(b.level == 1 for b in headings):
+        headings[0].level = 1
+
+
+def normalize_markdown(content: str, preserved_sections: Optional[Dict[str, str]] = None,
+                       today: Optional[datetime] = None) -> str:
+    """
+    Normalize an article's markdown formatting (and structure, if sections are given).
+
+    Args:
+        content: Article markdown
+        preserved_sections: Optional hook/summary/disclaimer to place verbatim
+            in template order around the body
+        today: Date used when the article has no date line
+
+    Returns:
+        Normalized markdown
+    """
+    if preserved_sections is None:
+        blocks = parse_blocks(content)
+        _promote_title(blocks)
+        return '\n\n'.join(render_block(b) for b in blocks)
+
+    hook = (preserved_sections.get('hook') or '').strip()
+    summary = (preserved_sections.get('summary') or '').strip()
+    disclaimer = (preserved_sections.get('disclaimer') or '').strip()
+    preserved = {text for text in (hook, summary, disclaimer) if text}
+
+    # Drop the preserved paragraphs before parsing; they are re-inserted verbatim
+    remaining = '\n\n'.join(p for p in content.split('\n\n') if p.strip() not in preserved)
+
+    date_line = None
+    body: List[Block] = []
+    ctas = set()
+    for block in parse_blocks(remaining):
+        if block.kind == 'date':
+            date_line = date_line or render_block(block)
+            continue
+        if 'weekly blog preview' in block.raw.lower():
+            continue
+        if block.kind == 'paragraph' and any(phrase in block.raw for phrase in CTA_PHRASES):
+            # Text after the CTA is kept; only a repeated CTA is dropped
+            cta = ' '.join(block.raw.split())
+            if cta in ctas:
+                continue
+            ctas.add(cta)
+        body.append(block)
+    cta_found = bool(ctas)
+
+    if not any(b.kind == 'heading' for b in body):
+        logger.warning("No heading found in content")
+    if not cta_found:
+        logger.warning("No CTA found in content")
+    _promote_title(body)
+
+    output = [text for text in (hook, summary) if text]
+    output.append(date_line or format_date_line(today=today))
+    output.extend(render_block(b) for b in body)
+    if disclaimer:
+        output.append(disclaimer)
+    return '\n\n'.join(output)
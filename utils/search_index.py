@@ -0,0 +1,245 @@
+"""
+In-memory full-text search over the article library.
+
+An inverted index maps each term to the articles containing it, with term
+frequencies weighted by field (a title match counts more than a body
+match). Queries are ranked with BM25. The last query term is also matched
+as a prefix so results update while the user types, and suggest() offers
+prefix completions from the vocabulary.
+
+Documents are added, replaced and removed one at a time, so an upload only
+re-indexes the new article. The index holds a few hundred KB per thousand
+articles; queries touch only the postings of their terms.
+"""
+import re
+import math
+import bisect
+import threading
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Field weights for BM25F-style term frequencies
+FIELD_WEIGHTS = {'title': 3.0, 'description': 2.0, 'body': 1.0}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Completions of the last (partial) query term included in a search
+PREFIX_EXPANSIONS = 20
+
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+    you your
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_APOSTROPHES_RE = re.compile(r"['’]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords ("Don't" -> "dont")."""
+    text = _APOSTROPHES_RE.sub('', (text or '').lower())
+    return [token for token in _TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+
+class SearchIndex:
+    """BM25-ranked inverted index with prefix autocomplete."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # term -> {doc_id: weighted term frequency}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0.0
+        self._vocabulary: Optional[List[str]] = None
+        # doc_id -> version the document was indexed at (see sync)
+        self._versions: Dict[str, Any] = {}
+        self._source = None
+        self._sync_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def add_document(self, doc_id: str, title: str = '', description: str = '', body: str = '',
+                     version: Any = None, **stored: Any):
+        """
+        Index a document, replacing any earlier version with the same id.
+
+        Args:
+            doc_id: Document id (the article filename)
+            title, description, body: Indexed fields
+            version: Version of the source, so sync() skips the document while it is unchanged
+            stored: Extra fields returned with results
+        """
+        frequencies = Counter()
+        length = 0.0
+        for field, text in (('title', title), ('description', description), ('body', body)):
+            tokens = tokenize(text)
+            weight = FIELD_WEIGHTS[field]
+            length += weight * len(tokens)
+            for token in tokens:
+                frequencies[token] += weight
+
+        with self._lock:
+            self._remove(doc_id)
+            for term, frequency in frequencies.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+            self._doc_terms[doc_id] = list(frequencies)
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+            self._docs[doc_id] = {'title': title, 'description': description, **stored}
+            self._versions[doc_id] = version
+            self._vocabulary = None
+
+    def remove_document(self, doc_id: str):
+        """Remove a document from the index (no-op if absent)."""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        if doc_id not in self._docs:
+            return
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        del self._docs[doc_id]
+        self._versions.pop(doc_id, None)
+        self._vocabulary = None
+
+    def sync(self, source: Any, versions: Callable[[], Dict[str, Any]], load: Callable[[str], Dict[str, str]]) -> int:
+        """
+        Bring the index in step with a document source, re-indexing only what changed.
+
+        Args:
+            source: Object identifying the source state (e.g. the cached catalog);
+                nothing is done while it is the same object as on the last sync
+            versions: Returns {doc_id: version} for every document in the source
+            load: Returns the title/description/body fields of a document
+
+        Returns:
+            Number of documents indexed or removed
+        """
+        if source is self._source:
+            return 0
+        # Concurrent callers wait for one sync instead of loading the same documents
+        with self._sync_lock:
+            if source is self._source:
+                return 0
+            current = versions()
+            with self._lock:
+                removed = [doc_id for doc_id in self._docs if doc_id not in current]
+                for doc_id in removed:
+                    self._remove(doc_id)
+            changed = len(removed)
+            for doc_id, version in current.items():
+                if doc_id in self._docs and self._versions.get(doc_id) == version:
+                    continue
+                try:
+                    self.add_document(doc_id, version=version, **load(doc_id))
+                    changed += 1
+                except Exception as e:
+                    logger.warning(f"Could not index {doc_id}: {str(e)}")
+            self._source = source
+        if changed:
+            logger.info(f"Search index synced: {changed} document(s) updated, {len(self._docs)} indexed")
+        return changed
+
+    def stored(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Stored fields of a document, or None."""
+        return self._docs.get(doc_id)
+
+    def _sorted_vocabulary(self) -> List[str]:
+        # Rebuilt lazily after changes (caller holds the lock)
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        return self._vocabulary
+
+    def _completions(self, prefix: str, limit: int) -> List[str]:
+        """Terms starting with prefix, most common first (caller holds the lock)."""
+        vocabulary = self._sorted_vocabulary()
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + '\uffff')
+        terms = vocabulary[start:end]
+        terms.sort(key=lambda term: (-len(self._postings[term]), term))
+        return terms[:limit]
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True) -> List[Dict[str, Any]]:
+        """
+        Rank documents for a query with BM25.
+
+        Args:
+            query: Free text
+            limit: Maximum number of results
+            prefix: Also match the last query term as a prefix (search as you type)
+
+        Returns:
+            Results (id, score and stored fields), best first
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores: Dict[str, float] = {}
+        with self._lock:
+            count = len(self._docs)
+            if not count:
+                return []
+            average_length = self._total_length / count or 1.0
+
+            # Each query term contributes its best-scoring expansion (itself, or a completion)
+            groups = [[term] for term in terms]
+            if prefix:
+                groups[-1] = list(dict.fromkeys([terms[-1]] + self._completions(terms[-1], PREFIX_EXPANSIONS)))
+
+            for group in groups:
+                group_scores: Dict[str, float] = {}
+                for term in group:
+                    postings = self._postings.get(term)
+                    if not postings:
+                        continue
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, frequency in postings.items():
+                        norm = K1 * (1 - B + B * self._doc_lengths[doc_id] / average_length)
+                        score = idf * frequency * (K1 + 1) / (frequency + norm)
+                        if score > group_scores.get(doc_id, 0.0):
+                            group_scores[doc_id] = score
+                for doc_id, score in group_scores.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            return [{'id': doc_id, 'score': round(score, 4), **self._docs[doc_id]} for doc_id, score in ranked]
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[str]:
+        """
+        Complete the last word of ``prefix`` from the indexed vocabulary.
+
+        Returns:
+            Completed queries (earlier words kept), most common terms first
+        """
+        words = (prefix or '').rstrip().split()
+        if not words:
+            return []
+        tokens = tokenize(words[-1])
+        if not tokens:
+            return []
+        head = ' '.join(words[:-1])
+        with self._lock:
+            completions = self._completions(tokens[-1], limit)
+        return [f"{head} {term}".strip() for term in completions]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Index size."""
+        with self._lock:
+            return {'documents': len(self._docs), 'terms': len(self._postings)}
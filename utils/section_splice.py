@@ -0,0 +1,139 @@
+"""
+Split a generated article into regenerable sections and splice edits back.
+
+Section-level regeneration sends only one section (the title, a ``##``
+section or the CTA) plus a compact outline of the rest of the article to
+the model, then replaces that section locally. The hook, summary, date and
+disclaimer are never offered for regeneration.
+"""
+import re
+import logging
+from typing import Any, Dict, List, Optional
+
+from utils.article_sections import paragraph_spans
+from utils.markdown_normalizer import CTA_PHRASES
+
+logger = logging.getLogger(__name__)
+
+DISCLAIMER_PHRASES = ("This article is a service of", "The content is sourced from")
+
+# Words of neighbouring text included as context on each side
+CONTEXT_WORDS = 60
+
+_CODE_FENCE_RE = re.compile(r'^```[a-z]*\n(.*?)\n```$', re.DOTALL)
+
+
+def _is_disclaimer(paragraph: str) -> bool:
+    return any(phrase in paragraph for phrase in DISCLAIMER_PHRASES)
+
+
+def _is_cta(paragraph: str) -> bool:
+    return any(phrase in paragraph for phrase in CTA_PHRASES)
+
+
+def split_sections(content: str) -> List[Dict[str, Any]]:
+    """
+    Find the regenerable sections of an article.
+
+    Args:
+        content: Article markdown
+
+    Returns:
+        List of dicts with ``id`` (position), ``kind`` ("title", "section"
+        or "cta"), ``heading``, ``start`` and ``end`` offsets and ``text``
+    """
+    sections: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+
+    for start, end in paragraph_spans(content):
+        paragraph = content[start:end].strip()
+        if not paragraph:
+            continue
+        if _is_disclaimer(paragraph):
+            break
+
+        if paragraph.startswith('# ') and not sections:
+            # Only the title line; text before the first ## belongs to no section
+            first_line = content[start:end].split('\n')[0]
+            sections.append({'kind': 'title', 'heading': first_line[2:].strip(),
+                             'start': start, 'end': start + len(first_line)})
+            current = None
+            continue
+        if paragraph.startswith('## '):
+            current = {'kind': 'section', 'heading': paragraph[3:].split('\n')[0].strip(),
+                       'start': start, 'end': end}
+            sections.append(current)
+            continue
+        if _is_cta(paragraph) and sections:
+            sections.append({'kind': 'cta', 'heading': 'Call to action', 'start': start, 'end': end})
+            break
+        if current is not None:
+            current['end'] = end
+
+    for index, section in enumerate(sections):
+        section['id'] = index
+        section['text'] = content[section['start']:section['end']]
+    return sections
+
+
+def get_section(content: str, section_id: int) -> Optional[Dict[str, Any]]:
+    """Get one section by id, or None if it does not exist."""
+    sections = split_sections(content)
+    if 0 <= section_id < len(sections):
+        return sections[section_id]
+    return None
+
+
+def section_context(content: str, section: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Compact context for regenerating a section.
+
+    Args:
+        content: Article markdown
+        section: Section from split_sections
+
+    Returns:
+        Dict with ``outline`` (title and section headings), ``before`` and
+        ``after`` (the neighbouring text, trimmed to CONTEXT_WORDS words)
+    """
+    outline = []
+    for other in split_sections(content):
+        marker = {'title': '#', 'section': '##', 'cta': '[CTA]'}[other['kind']]
+        current = '  <-- this section' if other['start'] == section['start'] else ''
+        outline.append(f"{marker} {other['heading']}{current}")
+
+    before_words = content[:section['start']].split()
+    after_words = content[section['end']:].split()
+    return {
+        'outline': '\n'.join(outline),
+        'before': ' '.join(before_words[-CONTEXT_WORDS:]),
+        'after': ' '.join(after_words[:CONTEXT_WORDS]),
+    }
+
+
+def clean_section_output(section: Dict[str, Any], generated: str) -> str:
+    """
+    Normalize a regenerated section so it splices cleanly.
+
+    Strips code fences and surrounding blank lines, and keeps the expected
+    heading marker (the original heading is kept if the model dropped it).
+    """
+    text = generated.strip()
+    fenced = _CODE_FENCE_RE.match(text)
+    if fenced:
+        text = fenced.group(1).strip()
+
+    if section['kind'] == 'title':
+        title = text.split('\n')[0].lstrip('#').strip()
+        return f"# {title}"
+    if section['kind'] == 'section':
+        heading = re.match(r'^#{1,6}\s*', text)
+        if heading:
+            return '## ' + text[heading.end():]
+        return f"## {section['heading']}\n\n{text}"
+    return text
+
+
+def splice_section(content: str, section: Dict[str, Any], new_text: str) -> str:
+    """Replace a section's text in the article."""
+    return content[:section['start']] + new_text + content[section['end']:]
@@ -0,0 +1,157 @@
+"""
+Local change metrics between a source article and its rewrite.
+
+The rewrite prompts require a minimum amount of change from the original.
+These metrics measure it locally in a few milliseconds instead of relying on
+the model's own estimate:
+
+- change percentage: share of the rewrite's words not carried over from the
+  source (token-level diff, or word shingles for long texts)
+- retained sentences: sentences copied verbatim (ignoring case/punctuation)
+- paragraph alignment: the closest source paragraph for each rewritten one
+"""
+import re
+import time
+import difflib
+import logging
+from typing import Any, Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prompts ask for at least this much change from the original
+MIN_CHANGE_PERCENTAGE = 40
+
+# Above this many tokens (either side) switch from difflib to shingling
+TOKEN_DIFF_LIMIT = 5000
+
+# Shorter runs of matching words are coincidental ("your loved ones") and don't count as retained
+MIN_MATCH_RUN = 3
+
+SHINGLE_SIZE = 5
+ALIGNMENT_SHINGLE_SIZE = 3
+
+# Paragraph pairs at or above this similarity are reported as near copies
+NEAR_COPY_THRESHOLD = 0.6
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)?")
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+_MARKDOWN_RE = re.compile(r'[#*_>`\[\]()]|!\[')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with markdown and punctuation removed."""
+    return _WORD_RE.findall(_MARKDOWN_RE.sub(' ', (text or '').lower()))
+
+
+def shingles(tokens: List[str], size: int) -> Set[Tuple[str, ...]]:
+    """Set of ``size``-word shingles (the whole text if it is shorter)."""
+    if len(tokens) < size:
+        return {tuple(tokens)} if tokens else set()
+    return {tuple(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _paragraphs(text: str) -> List[str]:
+    return [p for p in re.split(r'\n\s*\n', text or '') if tokenize(p)]
+
+
+def _sentences(text: str) -> List[str]:
+    sentences = []
+    for paragraph in _paragraphs(text):
+        sentences.extend(s for s in _SENTENCE_RE.split(paragraph.replace('\n', ' ')) if s.strip())
+    return sentences
+
+
+def _retained_sentences(original: str, generated: str, min_words: int = 5) -> List[str]:
+    original_keys = {' '.join(tokenize(s)) for s in _sentences(original)}
+    retained = []
+    for sentence in _sentences(generated):
+        key = ' '.join(tokenize(sentence))
+        if len(key.split()) >= min_words and key in original_keys:
+            retained.append(sentence.strip())
+    return retained
+
+
+def _jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def align_paragraphs(original: str, generated: str) -> List[Dict[str, Any]]:
+    """
+    Match each generated paragraph to its most similar source paragraph.
+
+    Returns:
+        List of dicts with ``generated_index``, ``original_index`` (None if
+        nothing overlaps) and ``similarity`` (shingle Jaccard, 0-1)
+    """
+    original_sets = [shingles(tokenize(p), ALIGNMENT_SHINGLE_SIZE) for p in _paragraphs(original)]
+    alignment = []
+    for index, paragraph in enumerate(_paragraphs(generated)):
+        generated_set = shingles(tokenize(paragraph), ALIGNMENT_SHINGLE_SIZE)
+        best_index, best_score = None, 0.0
+        for original_index, original_set in enumerate(original_sets):
+            score = _jaccard(generated_set, original_set)
+            if score > best_score:
+                best_index, best_score = original_index, score
+        alignment.append({
+            'generated_index': index,
+            'original_index': best_index,
+            'similarity': round(best_score, 3),
+        })
+    return alignment
+
+
+def change_metrics(original: str, generated: str) -> Dict[str, Any]:
+    """
+    Compute change metrics between a source article and its rewrite.
+
+    Args:
+        original: Source article text
+        generated: Generated article
+
+    Returns:
+        Dict with change_percentage (0-100), similarity (0-1), method,
+        token counts, retained sentence count and samples, paragraph
+        alignment, near-copy paragraph count, meets_minimum and elapsed_ms
+    """
+    started = time.perf_counter()
+    original_tokens = tokenize(original)
+    generated_tokens = tokenize(generated)
+
+    if not generated_tokens:
+        change, similarity, method = 0.0, 0.0, 'empty'
+    elif max(len(original_tokens), len(generated_tokens)) <= TOKEN_DIFF_LIMIT:
+        method = 'tokens'
+        matcher = difflib.SequenceMatcher(None, original_tokens, generated_tokens, autojunk=False)
+        matched = sum(block.size for block in matcher.get_matching_blocks() if block.size >= MIN_MATCH_RUN)
+        change = 100.0 * (1 - matched / len(generated_tokens))
+        similarity = 2.0 * matched / (len(original_tokens) + len(generated_tokens))
+    else:
+        method = 'shingles'
+        original_set = shingles(original_tokens, SHINGLE_SIZE)
+        generated_set = shingles(generated_tokens, SHINGLE_SIZE)
+        contained = len(generated_set & original_set) / len(generated_set)
+        change = 100.0 * (1 - contained)
+        similarity = _jaccard(original_set, generated_set)
+
+    retained = _retained_sentences(original, generated)
+    alignment = align_paragraphs(original, generated)
+    change = round(change, 1)
+
+    metrics = {
+        'change_percentage': change,
+        'similarity': round(similarity, 3),
+        'method': method,
+        'original_tokens': len(original_tokens),
+        'generated_tokens': len(generated_tokens),
+        'retained_sentences': len(retained),
+        'retained_sentence_samples': retained[:5],
+        'paragraph_alignment': alignment,
+        'near_copy_paragraphs': sum(1 for a in alignment if a['similarity'] >= NEAR_COPY_THRESHOLD),
+        'meets_minimum': change >= MIN_CHANGE_PERCENTAGE,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.debug(f"Change metrics: {change}% changed ({method}), {len(retained)} retained sentences, "
+                 f"{metrics['elapsed_ms']}ms")
+    return metrics